@@ -1,22 +1,11 @@
-from moviepy import (
-    VideoFileClip,
-    ImageClip,
-    TextClip,
-    CompositeVideoClip,
-    AudioFileClip,
-    concatenate_videoclips
-)
+import os
+import sys
 
-# Load the video
-clip = VideoFileClip("no_chance_behara_do_it.mp4")  # Use relative or full path
+# The trimming utilities live with the visual pipeline
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trial_2'))
+from video_trimming import trim_video
 
-# Cut the first 5 seconds
-short_clip = clip.subclipped(0, 5)
-
-# Save the trimmed clip
-short_clip.write_videofile(
-    "output_video.mp4",
-    codec="libx264",
-    audio_codec="aac",
-    fps=24  # Optional: force frame rate if needed
-)
+# Cut the first 5 seconds: a stream copy (no decode or re-encode) since
+# the cut starts on a keyframe; pass exact=True to force frame-exact cuts
+clip = trim_video("no_chance_behara_do_it.mp4", "output_video.mp4", 0, 5)
+print(clip)
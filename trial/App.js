@@ -15,6 +15,7 @@ function App() {
   });
   const [summaryData, setSummaryData] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [stage, setStage] = useState(null);
 
   const handleVideoUpload = (videoData) => {
     setUploadedVideo(videoData);
@@ -29,9 +30,12 @@ function App() {
 
   const processVideo = async (preferences) => {
     setLoading(true);
+    setStage(null);
 
     try {
-      const response = await fetch('http://localhost:5000/process', {
+      // Queue the job, then follow it over Server-Sent Events instead of
+      // holding one long request open
+      const response = await fetch('http://localhost:5000/jobs', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -42,18 +46,54 @@ function App() {
         })
       });
 
-      const data = await response.json();
+      const job = await response.json();
 
-      if (data.success) {
-        setSummaryData(data);
-      } else {
+      if (!job.success) {
+        console.error('Processing failed:', job.error);
+        alert('Processing failed: ' + job.error);
+        setLoading(false);
+        return;
+      }
+
+      // EventSource reconnects by itself and resumes from the last event
+      const events = new EventSource(`http://localhost:5000/jobs/${job.job_id}/events`);
+
+      events.addEventListener('stage', (event) => {
+        setStage(JSON.parse(event.data).stage);
+      });
+
+      events.addEventListener('completed', (event) => {
+        events.close();
+        setSummaryData(JSON.parse(event.data).result);
+        setLoading(false);
+      });
+
+      events.addEventListener('failed', (event) => {
+        events.close();
+        const data = JSON.parse(event.data);
         console.error('Processing failed:', data.error);
         alert('Processing failed: ' + data.error);
-      }
+        setLoading(false);
+      });
+
+      // Dropped connections reconnect by themselves; give up once the job
+      // itself is gone (expired, or the server restarted)
+      events.onerror = async () => {
+        try {
+          const status = await fetch(`http://localhost:5000/jobs/${job.job_id}`);
+          if (status.ok && events.readyState !== EventSource.CLOSED) {
+            return;
+          }
+        } catch (error) {
+          // Server unreachable
+        }
+        events.close();
+        alert('Lost track of the processing job. Please try again.');
+        setLoading(false);
+      };
     } catch (error) {
       console.error('Error processing video:', error);
       alert('Error processing video: ' + error.message);
-    } finally {
       setLoading(false);
     }
   };
@@ -109,9 +149,9 @@ function App() {
                 <h3>Processing your video...</h3>
                 <p>This may take a few minutes depending on video length</p>
                 <div className="processing-steps">
-                  <div className="processing-step">📝 Extracting transcript...</div>
-                  <div className="processing-step">👁️ Analyzing visual content...</div>
-                  <div className="processing-step">🤖 Generating summary...</div>
+                  <div className={`processing-step ${stage === 'transcript' ? 'active' : ''}`}>📝 Extracting transcript...</div>
+                  <div className={`processing-step ${stage === 'visual_analysis' ? 'active' : ''}`}>👁️ Analyzing visual content...</div>
+                  <div className={`processing-step ${stage === 'summary' ? 'active' : ''}`}>🤖 Generating summary...</div>
                 </div>
               </div>
             ) : (
@@ -1,5 +1,5 @@
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 from flask_cors import CORS
 import os
 import cv2
@@ -7,10 +7,17 @@ import numpy as np
 from werkzeug.utils import secure_filename
 import tempfile
 import json
-from utils.transcription import transcribe_video
-from utils.visual_analysis import analyze_frames
-from utils.summarization import create_final_summary
-from utils.video_processing import extract_frames
+from utils.transcription import transcribe_video_with_segments, TRANSCRIPTION_VERSION
+from utils.visual_analysis import analyze_frames, ANALYSIS_VERSION
+from utils.summarization import create_final_summary, SUMMARIZER_VERSION
+from utils.video_processing import iter_frames, get_cached_analysis_proxy, ANALYSIS_PROXY_SIZE, ANALYSIS_PROXY_FPS
+from utils.rate_limiting import get_api_usage
+from utils.model_registry import warm_whisper_models, get_model_metrics
+from utils.result_cache import ResultCache, make_cache_key
+from utils.media_probe import get_content_hash
+from utils.job_queue import JobQueue, QueueFullError, format_sse
+from utils.upload_store import UploadStore, UploadError, UploadOffsetError
+from config import Config
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
@@ -23,6 +30,29 @@ ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm'}
 # Create upload directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Uploads stored once per content hash, written and hashed chunk by chunk
+upload_store = UploadStore(
+    app.config['UPLOAD_FOLDER'],
+    max_bytes=app.config['MAX_CONTENT_LENGTH'],
+    chunk_size=Config.UPLOAD_CHUNK_SIZE,
+    session_ttl=Config.UPLOAD_SESSION_TTL,
+    upload_ttl=Config.UPLOAD_TTL
+)
+
+# Transcript, visual analysis and summary results keyed by video content + parameters
+result_cache = ResultCache(
+    Config.RESULT_CACHE_DIR,
+    max_bytes=Config.RESULT_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=Config.RESULT_CACHE_TTL_HOURS * 3600
+)
+
+# Background processing for /jobs
+job_queue = JobQueue(
+    max_workers=Config.JOB_WORKERS,
+    max_queue_depth=Config.JOB_QUEUE_DEPTH,
+    result_ttl=Config.JOB_RESULT_TTL
+)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -30,6 +60,16 @@ def allowed_file(filename):
 def index():
     return render_template('index.html')
 
+def stored_upload_response(stored):
+    # Return file info for processing
+    return jsonify({
+        'message': 'Video uploaded successfully',
+        'filename': stored['filename'],
+        'filepath': stored['filepath'],
+        'content_hash': stored['content_hash'],
+        'deduplicated': stored['deduplicated']
+    }), 200
+
 @app.route('/upload', methods=['POST'])
 def upload_video():
     try:
@@ -43,21 +83,189 @@ def upload_video():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Please upload a video file.'}), 400
 
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # Save uploaded file (hashed and sniffed while it is written)
+        stored = upload_store.save_stream(file.stream, secure_filename(file.filename))
+        return stored_upload_response(stored)
 
-        # Return file info for processing
-        return jsonify({
-            'message': 'Video uploaded successfully',
-            'filename': filename,
-            'filepath': filepath
-        }), 200
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/stream', methods=['POST', 'PUT'])
+def upload_video_stream():
+    """Upload a video sent as the raw request body (no multipart buffering)
+
+    The file name comes from the 'filename' query argument or the
+    X-Filename header.
+    """
+    try:
+        filename = secure_filename(request.args.get('filename') or request.headers.get('X-Filename', ''))
+        if not filename:
+            return jsonify({'error': 'No file name given'}), 400
+
+        if not allowed_file(filename):
+            return jsonify({'error': 'Invalid file type. Please upload a video file.'}), 400
+
+        stored = upload_store.save_stream(request.stream, filename)
+        return stored_upload_response(stored)
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/uploads', methods=['POST'])
+def start_resumable_upload():
+    """Open a resumable upload: {filename, size} -> upload_id to PUT chunks to"""
+    try:
+        data = request.json
+        filename = secure_filename(data.get('filename', ''))
+
+        if not filename or not allowed_file(filename):
+            return jsonify({'error': 'Invalid file type. Please upload a video file.'}), 400
+
+        session = upload_store.start_session(filename, int(data.get('size', 0)))
+        return jsonify(dict(session.to_dict(), upload_url=f'/uploads/{session.id}', success=True)), 201
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def get_resumable_upload(upload_id):
+    """Bytes received so far; a client resumes by sending the rest from 'offset'"""
+    session = upload_store.get_session(upload_id)
+    if session is None:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    return jsonify(session.to_dict()), 200
 
+@app.route('/uploads/<upload_id>', methods=['PUT', 'PATCH'])
+def append_resumable_upload(upload_id):
+    """Append the request body at the Upload-Offset header (or 'offset' argument)
+
+    Returns the new offset, or the usual /upload response once the last
+    chunk has arrived. A wrong offset gets 409 with the expected one.
+    """
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.args.get('offset', 0)))
+        session, stored = upload_store.append_chunk(upload_id, offset, request.stream)
+
+        if stored is None:
+            return jsonify(session.to_dict()), 200
+        return stored_upload_response(stored)
+
+    except KeyError:
+        return jsonify({'error': 'Upload not found'}), 404
+    except UploadOffsetError as e:
+        return jsonify(dict(upload_store.get_session(upload_id).to_dict(), error=str(e))), 409
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def abort_resumable_upload(upload_id):
+    if not upload_store.abort_session(upload_id):
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify({'success': True}), 200
+
+PIPELINE_STAGES = ['transcript', 'visual_analysis', 'summary']
+
+def run_pipeline(filepath, user_preferences, job=None):
+    """Transcribe, analyze and summarize a video (shared by /process and /jobs)
+
+    With a job, stage transitions, transcript segments and each frame's
+    result are published on it as they are produced. Returns the response
+    payload.
+    """
+    upload_store.touch(filepath)  # Keep the upload through processing
+
+    # Each stage is cached separately, so e.g. new preferences only re-run the summary
+    # Stored uploads are named by their hash, so only other files get hashed (once)
+    content_hash = get_content_hash(filepath, upload_store.content_hash(filepath))
+    cache_status = {}
+
+    # Step 1: Extract transcript using free transcription API
+    print("Step 1: Extracting transcript...")
+    if job:
+        job.start_stage('transcript')
+    transcript_key = make_cache_key(content_hash, whisper_model=Config.WHISPER_MODEL_SIZE,
+                                    version=TRANSCRIPTION_VERSION)
+    transcription = result_cache.get('transcript', transcript_key)
+    cache_status['transcript'] = 'hit' if transcription is not None else 'miss'
+    if transcription is None:
+        transcription = transcribe_video_with_segments(filepath)
+        if not transcription.get('error'):
+            result_cache.set('transcript', transcript_key, transcription)
+    transcript = transcription['text']
+    if job:
+        for segment in transcription['segments']:
+            job.publish('transcript_segment', segment)
+        job.finish_stage('transcript', segments=len(transcription['segments']))
+
+    # Step 2: Extract and analyze frames using free computer vision API
+    print("Step 2: Analyzing video frames...")
+    if job:
+        job.start_stage('visual_analysis')
+    proxy_settings = [ANALYSIS_PROXY_SIZE, ANALYSIS_PROXY_FPS] if Config.ANALYSIS_PROXY else None
+    analysis_key = make_cache_key(content_hash, max_frames=Config.MAX_FRAMES_TO_ANALYZE,
+                                  proxy=proxy_settings, version=ANALYSIS_VERSION)
+    visual_analysis = result_cache.get('visual_analysis', analysis_key)
+    cache_status['visual_analysis'] = 'hit' if visual_analysis is not None else 'miss'
+    if visual_analysis is None:
+        def report_frame(index, analysis):
+            if job:
+                job.publish('frame', {'index': index, 'analysis': analysis})
+                job.update_stage('visual_analysis', (index + 1) / Config.MAX_FRAMES_TO_ANALYZE,
+                                 frames_analyzed=index + 1)
+
+        # Frames come from the low-res proxy (the transcript above used the original's audio)
+        source_path = filepath
+        if proxy_settings:
+            source_path = get_cached_analysis_proxy(filepath, content_hash, result_cache) or filepath
+
+        frames_data = iter_frames(source_path, max_frames=Config.MAX_FRAMES_TO_ANALYZE, segments=Config.DECODE_SEGMENTS)
+        visual_analysis = analyze_frames(frames_data, on_frame=report_frame)
+        if 'error' not in visual_analysis:
+            result_cache.set('visual_analysis', analysis_key, visual_analysis)
+    if job:
+        job.finish_stage('visual_analysis')
+
+    # Step 3: Combine both analyses and create final summary
+    print("Step 3: Creating final summary...")
+    if job:
+        job.start_stage('summary')
+    summary_key = make_cache_key(content_hash, transcript_key=transcript_key, analysis_key=analysis_key,
+                                 preferences=user_preferences, version=SUMMARIZER_VERSION)
+    final_summary = result_cache.get('summary', summary_key)
+    cache_status['summary'] = 'hit' if final_summary is not None else 'miss'
+    if final_summary is None:
+        final_summary = create_final_summary(
+            transcript, 
+            visual_analysis, 
+            user_preferences,
+            transcription['segments']
+        )
+        if not final_summary.get('error'):
+            result_cache.set('summary', summary_key, final_summary)
+    if job:
+        job.finish_stage('summary')
+
+    # The upload is content-addressed and may be shared with other requests,
+    # so it stays until the upload store expires it
+
+    return {
+        'transcript': transcript,
+        'transcript_segments': transcription['segments'],
+        'visual_analysis': visual_analysis,
+        'final_summary': final_summary,
+        'cache': cache_status,
+        'success': True
+    }
+
 @app.route('/process', methods=['POST'])
 def process_video():
     try:
@@ -68,40 +276,89 @@ def process_video():
         if not filepath or not os.path.exists(filepath):
             return jsonify({'error': 'Video file not found'}), 400
 
-        # Step 1: Extract transcript using free transcription API
-        print("Step 1: Extracting transcript...")
-        transcript = transcribe_video(filepath)
+        return jsonify(run_pipeline(filepath, user_preferences)), 200
 
-        # Step 2: Extract and analyze frames using free computer vision API
-        print("Step 2: Analyzing video frames...")
-        frames_data = extract_frames(filepath)
-        visual_analysis = analyze_frames(frames_data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # Step 3: Combine both analyses and create final summary
-        print("Step 3: Creating final summary...")
-        final_summary = create_final_summary(
-            transcript, 
-            visual_analysis, 
-            user_preferences
-        )
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a processing job and return its ID immediately"""
+    try:
+        data = request.json
+        filepath = data.get('filepath')
+        user_preferences = data.get('preferences', {})
+
+        if not filepath or not os.path.exists(filepath):
+            return jsonify({'error': 'Video file not found'}), 400
+
+        job = job_queue.submit(run_pipeline,
+                               {'filepath': filepath, 'user_preferences': user_preferences},
+                               PIPELINE_STAGES)
 
-        # Clean up uploaded file
-        if os.path.exists(filepath):
-            os.remove(filepath)
- 
         return jsonify({
-            'transcript': transcript,
-            'visual_analysis': visual_analysis,
-            'final_summary': final_summary,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/jobs/{job.id}',
             'success': True
-        }), 200
+        }), 202
 
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, per-stage progress and (once finished) the result of a job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify(job.to_dict()), 200
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-Sent Events stream of a job's progress; replays from Last-Event-ID on reconnect"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0
+    try:
+        last_event_id = int(last_event_id)
+    except ValueError:
+        last_event_id = 0
+
+    def generate():
+        for event in job.iter_events(last_event_id):
+            yield format_sse(event)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let a proxy hold events back
+    })
+
+@app.route('/api-usage', methods=['GET'])
+def api_usage():
+    """Monthly free-tier consumption per remote vision API"""
+    return jsonify({'usage': get_api_usage()}), 200
+
+@app.route('/model-metrics', methods=['GET'])
+def model_metrics():
+    """Load time and memory of the cached transcription models"""
+    return jsonify({'models': get_model_metrics()}), 200
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters and size of the stage result cache"""
+    return jsonify({'cache': result_cache.stats()}), 200
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy'}), 200
+    return jsonify({'status': 'healthy', 'jobs': job_queue.stats()}), 200
 
 if __name__ == '__main__':
+    if Config.WHISPER_PRELOAD:
+        warm_whisper_models([Config.WHISPER_MODEL_SIZE])
     app.run(debug=True, host='0.0.0.0', port=5000)
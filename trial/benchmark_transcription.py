@@ -0,0 +1,42 @@
+# benchmark_transcription.py - Timing script for the audio/transcription stages
+
+import os
+import sys
+import time
+from transcription import extract_audio_samples, extract_audio_from_video
+
+def time_call(func, *args, **kwargs):
+    """Run func once and return (result, seconds)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def benchmark_audio_extraction(video_path, repeats=3):
+    """Compare the ffmpeg pipe with the MoviePy WAV round-trip"""
+    print(f"🔊 Audio extraction: {os.path.basename(video_path)}")
+
+    samples, pipe_time = min((time_call(extract_audio_samples, video_path) for _ in range(repeats)), key=lambda r: r[1])
+    if samples is None:
+        print("❌ ffmpeg pipe failed (is ffmpeg installed and does the file have audio?)")
+        return
+    print(f"{'ffmpeg pipe':>16}: {pipe_time:6.2f}s  ({len(samples) / 16000:.1f}s of 16 kHz mono, nothing on disk)")
+
+    audio_path, moviepy_time = time_call(extract_audio_from_video, video_path)
+    if not audio_path:
+        print(f"{'moviepy wav':>16}: failed")
+        return
+
+    # The old path also has to read the WAV back before transcribing
+    start = time.perf_counter()
+    with open(audio_path, 'rb') as f:
+        wav_size = len(f.read())
+    moviepy_time += time.perf_counter() - start
+    os.remove(audio_path)
+
+    print(f"{'moviepy wav':>16}: {moviepy_time:6.2f}s  ({wav_size / (1024 * 1024):.1f}MB written and read back)")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark_transcription.py <video_file>")
+        sys.exit(1)
+    benchmark_audio_extraction(sys.argv[1])
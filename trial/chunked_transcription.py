@@ -0,0 +1,142 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+if __package__:
+    from .model_registry import transcribe_with_whisper
+else:
+    from model_registry import transcribe_with_whisper
+
+# Energy-based voice activity detection settings
+VAD_FRAME_MS = 30             # Analysis window
+VAD_MIN_SILENCE_MS = 500      # Shorter pauses stay inside a speech segment
+VAD_MIN_SPEECH_MS = 250       # Shorter bursts (clicks, bumps) are dropped
+VAD_PADDING_MS = 200          # Kept around each segment so words aren't clipped
+VAD_NOISE_MULTIPLIER = 3.0    # Speech must be this much louder than the noise floor
+VAD_MIN_ENERGY = 0.005        # Absolute RMS floor for near-silent recordings
+
+# Whisper decodes 30 s windows; chunks are packed up to this length
+MAX_CHUNK_SECONDS = 30
+
+def frame_energies(samples, sample_rate, frame_ms=VAD_FRAME_MS):
+    """RMS energy of consecutive frame_ms windows"""
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    num_frames = len(samples) // frame_length
+    if num_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    frames = samples[:num_frames * frame_length].reshape(num_frames, frame_length)
+    return np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+def detect_speech_segments(samples, sample_rate):
+    """Find speech regions with a simple energy VAD
+
+    Returns a list of (start_seconds, end_seconds) tuples. The threshold
+    adapts to the recording: a multiple of its quietest 10% of frames.
+    """
+    energies = frame_energies(samples, sample_rate)
+    if len(energies) == 0:
+        return []
+
+    noise_floor = np.percentile(energies, 10)
+    threshold = max(VAD_MIN_ENERGY, noise_floor * VAD_NOISE_MULTIPLIER)
+    is_speech = energies > threshold
+
+    frame_seconds = VAD_FRAME_MS / 1000
+    segments = []
+    start = None
+
+    for i, speech in enumerate(is_speech):
+        if speech and start is None:
+            start = i
+        elif not speech and start is not None:
+            segments.append([start * frame_seconds, i * frame_seconds])
+            start = None
+    if start is not None:
+        segments.append([start * frame_seconds, len(is_speech) * frame_seconds])
+
+    # Bridge short pauses, then drop blips
+    merged = []
+    for segment in segments:
+        if merged and segment[0] - merged[-1][1] < VAD_MIN_SILENCE_MS / 1000:
+            merged[-1][1] = segment[1]
+        else:
+            merged.append(segment)
+
+    duration = len(samples) / sample_rate
+    padding = VAD_PADDING_MS / 1000
+
+    return [(round(max(0.0, start - padding), 3), round(min(duration, end + padding), 3))
+            for start, end in merged
+            if end - start >= VAD_MIN_SPEECH_MS / 1000]
+
+def build_chunks(segments, max_chunk_seconds=MAX_CHUNK_SECONDS):
+    """Pack speech segments into chunks of at most max_chunk_seconds
+
+    Neighbouring segments share a chunk while it fits (Whisper pads every
+    input to 30 s anyway, so packing keeps the number of decodes down);
+    silence outside the segments is never sent. Long segments are split.
+    """
+    chunks = []
+
+    for start, end in segments:
+        # Split segments longer than one chunk
+        while end - start > max_chunk_seconds:
+            chunks.append([(start, start + max_chunk_seconds)])
+            start += max_chunk_seconds
+
+        if chunks and end - chunks[-1][0][0] <= max_chunk_seconds:
+            chunks[-1].append((start, end))
+        else:
+            chunks.append([(start, end)])
+
+    return chunks
+
+def transcribe_chunk(samples, sample_rate, chunk):
+    """Transcribe one chunk and return segments on the original timeline"""
+    chunk_start = chunk[0][0]
+    chunk_end = chunk[-1][1]
+
+    # Silence between the chunk's speech segments is zeroed, not transcribed
+    audio = np.zeros(int((chunk_end - chunk_start) * sample_rate), dtype=np.float32)
+    for start, end in chunk:
+        src_start, src_end = int(start * sample_rate), int(end * sample_rate)
+        dst_start = src_start - int(chunk_start * sample_rate)
+        piece = samples[src_start:src_end]
+        audio[dst_start:dst_start + len(piece)] = piece[:len(audio) - dst_start]
+
+    result = transcribe_with_whisper(audio, Config.WHISPER_MODEL_SIZE, condition_on_previous_text=False)
+
+    segments = []
+    for segment in result.get('segments', []):
+        text = segment['text'].strip()
+        if text:
+            segments.append({
+                'start': round(chunk_start + segment['start'], 2),
+                'end': round(min(chunk_end, chunk_start + segment['end']), 2),
+                'text': text
+            })
+
+    if not segments and result.get('text', '').strip():
+        segments.append({'start': round(chunk_start, 2), 'end': round(chunk_end, 2), 'text': result['text'].strip()})
+
+    return segments
+
+def transcribe_in_chunks(samples, sample_rate=16000, workers=None):
+    """Transcribe only the speech in a sample buffer, chunks in parallel
+
+    Returns timestamped segments ({'start', 'end', 'text'}) sorted by time;
+    an empty list means no speech was detected.
+    """
+    workers = workers or Config.TRANSCRIPTION_WORKERS
+    speech_segments = detect_speech_segments(samples, sample_rate)
+    chunks = build_chunks(speech_segments)
+
+    speech_seconds = sum(end - start for start, end in speech_segments)
+    print(f"VAD: {speech_seconds:.1f}s of speech in {len(samples) / sample_rate:.1f}s of audio, {len(chunks)} chunks")
+
+    if not chunks:
+        return []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        chunk_results = executor.map(lambda chunk: transcribe_chunk(samples, sample_rate, chunk), chunks)
+        return [segment for segments in chunk_results for segment in segments]
@@ -9,6 +9,9 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-here'
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
     UPLOAD_FOLDER = 'uploads'
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 1024 * 1024))  # Bytes written (and hashed) per read
+    UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', 24 * 3600))  # Seconds an idle resumable upload is kept
+    UPLOAD_TTL = int(os.environ.get('UPLOAD_TTL', 24 * 3600))  # Seconds a stored upload is kept after its last use
 
     # API Keys (sign up for free accounts to get these)
     ASSEMBLYAI_API_KEY = os.environ.get('ASSEMBLYAI_API_KEY') or 'your_assemblyai_api_key'
@@ -20,9 +23,34 @@ class Config:
     # Processing Configuration
     MAX_FRAMES_TO_ANALYZE = 10
     MAX_VIDEO_DURATION = 600  # 10 minutes max
+    ANALYSIS_PROXY = os.environ.get('ANALYSIS_PROXY', 'false').lower() == 'true'  # Analyze a small ffmpeg proxy (quality scores then rate the proxy)
+    DECODE_SEGMENTS = int(os.environ.get('DECODE_SEGMENTS', 1))  # Parallel decode ranges for long videos
     SUPPORTED_FORMATS = ['mp4', 'avi', 'mov', 'mkv', 'webm']
 
     # Free API Limits (adjust based on your accounts)
     ASSEMBLYAI_FREE_HOURS = 416  # Free tier limit
     IMAGGA_FREE_REQUESTS = 1000  # Free tier limit per month
     GOOGLE_VISION_FREE_REQUESTS = 1000  # Free tier limit per month
+
+    # Remote API rate limits (requests per second) and concurrency
+    IMAGGA_REQUESTS_PER_SECOND = float(os.environ.get('IMAGGA_REQUESTS_PER_SECOND', 1))
+    GOOGLE_VISION_REQUESTS_PER_SECOND = float(os.environ.get('GOOGLE_VISION_REQUESTS_PER_SECOND', 10))
+    VISION_API_CONCURRENCY = int(os.environ.get('VISION_API_CONCURRENCY', 4))
+    API_USAGE_FILE = os.environ.get('API_USAGE_FILE', 'api_usage.json')  # Monthly quota counts
+
+    # Local transcription model and audio decoding
+    WHISPER_MODEL_SIZE = os.environ.get('WHISPER_MODEL_SIZE', 'base')
+    WHISPER_PRELOAD = os.environ.get('WHISPER_PRELOAD', 'false').lower() == 'true'  # Load at server start
+    FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+    TRANSCRIPTION_WORKERS = int(os.environ.get('TRANSCRIPTION_WORKERS', 2))  # Parallel speech chunks
+    WHISPER_REPLICAS = int(os.environ.get('WHISPER_REPLICAS', TRANSCRIPTION_WORKERS))  # Model copies per size
+
+    # Stage result cache (keyed by video content hash + parameters)
+    RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', 'cache')
+    RESULT_CACHE_MAX_MB = int(os.environ.get('RESULT_CACHE_MAX_MB', 500))
+    RESULT_CACHE_TTL_HOURS = int(os.environ.get('RESULT_CACHE_TTL_HOURS', 7 * 24))
+
+    # Background job queue (/jobs)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))  # Videos processed at once
+    JOB_QUEUE_DEPTH = int(os.environ.get('JOB_QUEUE_DEPTH', 16))  # Waiting jobs before 503
+    JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 3600))  # Seconds finished jobs are kept
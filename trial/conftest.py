@@ -0,0 +1,59 @@
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+
+class StubServer:
+    """Local HTTP server standing in for a remote API
+
+    Each POST is recorded (arrival time and JSON body, if any) and answered
+    by handler(request) -> (status, headers, body dict); by default 200 {}.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.handler = lambda request: (200, {}, {})
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    payload = None
+
+                with stub.lock:
+                    request = {'time': time.monotonic(), 'path': self.path, 'json': payload}
+                    stub.requests.append(request)
+                status, headers, response = stub.handler(request)
+
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
@@ -0,0 +1,135 @@
+import time
+import queue
+import threading
+from datetime import datetime
+from config import Config
+
+# Process-wide Whisper models keyed by size ("tiny", "base", "small", ...)
+_models = {}
+_metrics = {}
+_registry_lock = threading.Lock()
+_load_locks = {}
+
+# Idle instances per size; at most Config.WHISPER_REPLICAS exist per size
+_idle_replicas = {}
+_replica_counts = {}
+
+def _get_load_lock(size):
+    with _registry_lock:
+        if size not in _load_locks:
+            _load_locks[size] = threading.Lock()
+            _idle_replicas[size] = queue.LifoQueue()
+            _replica_counts[size] = 0
+        return _load_locks[size]
+
+def model_memory_bytes(model):
+    """Bytes held by a torch model's parameters and buffers"""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return None
+
+def _load_instance(size):
+    """Load one model instance and record its load time and memory"""
+    import whisper
+
+    print(f"Loading Whisper '{size}' model...")
+    start = time.perf_counter()
+    model = whisper.load_model(size)
+    load_seconds = time.perf_counter() - start
+    print(f"Whisper '{size}' loaded in {load_seconds:.1f}s")
+
+    memory_bytes = model_memory_bytes(model)
+    with _registry_lock:
+        metrics = _metrics.setdefault(size, {
+            'load_seconds': load_seconds,
+            'memory_bytes': memory_bytes,
+            'loaded_at': datetime.now().isoformat(),
+            'replicas': 0,
+            'transcriptions': 0
+        })
+        metrics['replicas'] += 1
+
+    return model
+
+def get_whisper_model(size="base"):
+    """Return the shared Whisper model for this size, loading it on first use
+
+    Concurrent callers asking for a size that is still loading wait for
+    that one load instead of starting their own.
+    """
+    model = _models.get(size)
+    if model is not None:
+        return model
+
+    with _get_load_lock(size):
+        # Another thread may have finished loading while we waited
+        if size in _models:
+            return _models[size]
+
+        model = _load_instance(size)
+        _models[size] = model
+        _replica_counts[size] += 1
+        _idle_replicas[size].put(model)
+
+        return model
+
+def _acquire_replica(size):
+    """Take an idle instance, loading another one if under the replica limit"""
+    get_whisper_model(size)
+
+    try:
+        return _idle_replicas[size].get_nowait()
+    except queue.Empty:
+        pass
+
+    with _load_locks[size]:
+        if _replica_counts[size] < max(1, Config.WHISPER_REPLICAS):
+            _replica_counts[size] += 1
+            try:
+                return _load_instance(size)
+            except Exception:
+                _replica_counts[size] -= 1
+                raise
+
+    # All replicas busy: wait for one to come back
+    return _idle_replicas[size].get()
+
+def transcribe_with_whisper(audio, size="base", **options):
+    """Transcribe with a shared model instance for this size
+
+    Whisper installs decoding hooks on the model while it runs, so each
+    instance serves one call at a time. Up to Config.WHISPER_REPLICAS
+    instances are loaded per size so parallel callers (e.g. chunked
+    transcription) don't queue behind a single model.
+    """
+    model = _acquire_replica(size)
+
+    try:
+        result = model.transcribe(audio, **options)
+        # Chunked transcription calls this from several threads at once
+        with _registry_lock:
+            _metrics[size]['transcriptions'] += 1
+        return result
+    finally:
+        _idle_replicas[size].put(model)
+
+def warm_whisper_models(sizes=("base",), background=True):
+    """Load models ahead of the first request (optionally in a background thread)"""
+    def load_all():
+        for size in sizes:
+            try:
+                get_whisper_model(size)
+            except Exception as e:
+                print(f"Error warming Whisper '{size}' model: {e}")
+
+    if background:
+        threading.Thread(target=load_all, name="whisper-warmup", daemon=True).start()
+    else:
+        load_all()
+
+def get_model_metrics():
+    """Load time, memory, replica and use counts for every loaded model"""
+    with _registry_lock:
+        return {size: dict(metrics) for size, metrics in _metrics.items()}
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from collections import deque
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+
+# Retries of a request the provider answered with 429, and the longest pause honoured
+MAX_RATE_LIMIT_RETRIES = 3
+MAX_RETRY_AFTER_SECONDS = 60
+
+class TokenBucket:
+    """Thread-safe token bucket: refills `rate` tokens/second up to `capacity`"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available right now"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available; False if timeout runs out first"""
+        deadline = None if timeout is None else self.clock() + timeout
+
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
+
+    def defer(self, seconds):
+        """Empty the bucket so no token is handed out for the next `seconds`"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+# Every provider's counts live in one usage file
+_usage_file_lock = threading.Lock()
+
+class MonthlyQuota:
+    """Counts requests per calendar month against a free-tier limit
+
+    With usage_path the counts survive restarts; the file holds
+    {"provider": {"YYYY-MM": count}} and is shared by all providers.
+    """
+
+    def __init__(self, provider, limit, usage_path=None):
+        self.provider = provider
+        self.limit = limit
+        self.usage_path = usage_path
+        self.lock = threading.Lock()
+        self.usage = self._load()
+
+    def _month(self):
+        return datetime.now().strftime('%Y-%m')
+
+    def _load(self):
+        try:
+            if self.usage_path and os.path.exists(self.usage_path):
+                with open(self.usage_path) as f:
+                    return json.load(f).get(self.provider, {})
+        except Exception as e:
+            print(f"Error reading API usage file: {e}")
+        return {}
+
+    def _save(self):
+        if not self.usage_path:
+            return
+        try:
+            # Read-modify-write of the shared file, so other providers' counts are kept
+            with _usage_file_lock:
+                data = {}
+                if os.path.exists(self.usage_path):
+                    with open(self.usage_path) as f:
+                        data = json.load(f)
+                data[self.provider] = self.usage
+
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.usage_path)), suffix='.tmp')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.usage_path)
+        except Exception as e:
+            print(f"Error writing API usage file: {e}")
+
+    def used(self):
+        with self.lock:
+            return self.usage.get(self._month(), 0)
+
+    def remaining(self):
+        return max(0, self.limit - self.used())
+
+    def try_consume(self, count=1):
+        """Record usage; False (and nothing recorded) if it would exceed the limit"""
+        with self.lock:
+            month = self._month()
+            if self.usage.get(month, 0) + count > self.limit:
+                return False
+            self.usage[month] = self.usage.get(month, 0) + count
+            self._save()
+            return True
+
+class ProviderLimiter:
+    """Request rate and monthly quota guard for one remote API provider"""
+
+    def __init__(self, name, requests_per_second, monthly_limit, burst=None, usage_path=None):
+        self.name = name
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.quota = MonthlyQuota(name, monthly_limit, usage_path)
+
+    def acquire(self, count=1, timeout=None):
+        """Wait for a rate-limit token for one HTTP request and record quota use
+
+        count is the number of quota units the request consumes (e.g. images
+        in a batched call). Returns False without waiting if the monthly
+        quota cannot cover it, or after `timeout` seconds if no token became
+        available.
+        """
+        if self.quota.remaining() < count:
+            return False
+        if not self.bucket.acquire(1, timeout):
+            return False
+        return self.quota.try_consume(count)
+
+    def backoff(self, seconds):
+        """Hold back every request to this provider for `seconds` (after a 429)"""
+        self.bucket.defer(seconds)
+
+    def stats(self):
+        return {
+            'provider': self.name,
+            'requests_per_second': self.bucket.rate,
+            'monthly_limit': self.quota.limit,
+            'used_this_month': self.quota.used(),
+            'remaining_this_month': self.quota.remaining()
+        }
+
+def get_provider_settings():
+    """Rate/quota settings per provider, taken from Config"""
+    return {
+        'imagga': {
+            'requests_per_second': Config.IMAGGA_REQUESTS_PER_SECOND,
+            'monthly_limit': Config.IMAGGA_FREE_REQUESTS
+        },
+        'google_vision': {
+            'requests_per_second': Config.GOOGLE_VISION_REQUESTS_PER_SECOND,
+            'monthly_limit': Config.GOOGLE_VISION_FREE_REQUESTS
+        }
+    }
+
+# Process-wide limiters, shared by every request thread
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_provider_limiter(provider):
+    """Return the shared limiter for a provider ('imagga', 'google_vision')"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            settings = get_provider_settings()[provider]
+            _limiters[provider] = ProviderLimiter(
+                provider,
+                settings['requests_per_second'],
+                settings['monthly_limit'],
+                usage_path=Config.API_USAGE_FILE
+            )
+        return _limiters[provider]
+
+def get_api_usage():
+    """Current quota consumption for every provider"""
+    return {provider: get_provider_limiter(provider).stats() for provider in get_provider_settings()}
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_http_session():
+    """Pooled keep-alive session sized for the remote API concurrency"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Config.VISION_API_CONCURRENCY)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+def parse_retry_after(value, default):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if value:
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = default
+    else:
+        seconds = default
+    return min(MAX_RETRY_AFTER_SECONDS, max(0.0, seconds))
+
+def post_with_backoff(limiter, url, max_wait=None, max_retries=MAX_RATE_LIMIT_RETRIES, **kwargs):
+    """POST on the pooled session, backing off when the provider answers 429
+
+    Call after limiter.acquire() has admitted the request (the quota is
+    charged there, once). A 429 pauses the provider's whole bucket for
+    the Retry-After time (doubling from 1s when the header is missing), so
+    concurrent requests back off too, and the request is retried up to
+    max_retries times, each retry waiting up to max_wait seconds for a
+    token. Returns the last response, or None if no token came in time.
+    """
+    for attempt in range(max_retries + 1):
+        response = get_http_session().post(url, **kwargs)
+        if response.status_code != 429 or attempt == max_retries:
+            return response
+
+        delay = parse_retry_after(response.headers.get('Retry-After'), 2 ** attempt)
+        print(f"{limiter.name} rate limited, retrying in {delay:.1f}s")
+        limiter.backoff(delay)
+        if not limiter.bucket.acquire(1, max_wait):
+            return None
+
+def dispatch_concurrently(func, items, max_workers=None):
+    """Apply func to items on a bounded thread pool, yielding results in order
+
+    items may be a lazy iterator; at most 2 * max_workers items are in
+    flight at once. Rate limiting is left to func (via ProviderLimiter).
+    """
+    max_workers = max_workers or Config.VISION_API_CONCURRENCY
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in items:
+            pending.append((item, executor.submit(func, item)))
+            if len(pending) >= 2 * max_workers:
+                item, future = pending.popleft()
+                yield item, future.result()
+
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
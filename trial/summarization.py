@@ -3,6 +3,9 @@ import requests
 import json
 from datetime import datetime
 
+# Bump when summary wording/structure changes (invalidates cached summaries)
+SUMMARIZER_VERSION = '1'
+
 def summarize_with_huggingface_free(text, max_length=150):
     """Use Hugging Face free inference API"""
     try:
@@ -83,8 +86,12 @@ def summarize_local_simple(text, max_length=150):
     except Exception as e:
         return text[:max_length] + "..." if len(text) > max_length else text
 
-def create_final_summary(transcript, visual_analysis, user_preferences):
-    """Combine transcript and visual analysis into final summary"""
+def create_final_summary(transcript, visual_analysis, user_preferences, transcript_segments=None):
+    """Combine transcript and visual analysis into final summary
+
+    transcript_segments are optional timestamped {'start', 'end', 'text'}
+    entries; when present, key points and key moments carry timestamps.
+    """
     try:
         # Extract user preferences
         summary_length = user_preferences.get('length', 'medium')
@@ -118,7 +125,8 @@ def create_final_summary(transcript, visual_analysis, user_preferences):
             base_summary, 
             visual_analysis, 
             transcript,
-            user_preferences
+            user_preferences,
+            transcript_segments
         )
 
         # Add metadata
@@ -138,7 +146,7 @@ def create_final_summary(transcript, visual_analysis, user_preferences):
             'error': str(e)
         }
 
-def apply_user_preferences(base_summary, visual_analysis, transcript, preferences):
+def apply_user_preferences(base_summary, visual_analysis, transcript, preferences, transcript_segments=None):
     """Customize summary based on user preferences"""
     try:
         focus_areas = preferences.get('focus', [])
@@ -148,7 +156,10 @@ def apply_user_preferences(base_summary, visual_analysis, transcript, preference
 
         # Add focus area specific content
         if 'key_points' in focus_areas:
-            key_points = extract_key_points(transcript)
+            if transcript_segments:
+                key_points = extract_key_points_from_segments(transcript_segments)
+            else:
+                key_points = extract_key_points(transcript)
             enhanced_summary += f"\n\nKey Points:\n{key_points}"
 
         if 'visual_elements' in focus_areas and visual_analysis:
@@ -164,6 +175,11 @@ def apply_user_preferences(base_summary, visual_analysis, transcript, preference
                     timestamp = format_timestamp(scene.get('timestamp', 0))
                     enhanced_summary += f"\n- {timestamp}: Scene change detected"
 
+        if 'timestamps' in focus_areas and transcript_segments:
+            enhanced_summary += "\n\nSpoken Timeline:"
+            for segment in transcript_segments[:5]:
+                enhanced_summary += f"\n- {format_timestamp(segment['start'])}: {segment['text'][:80]}"
+
         # Apply style formatting
         if style == 'bullet_points':
             enhanced_summary = convert_to_bullet_points(enhanced_summary)
@@ -192,6 +208,19 @@ def extract_key_points(transcript):
     except Exception as e:
         return "Unable to extract key points"
 
+def extract_key_points_from_segments(transcript_segments):
+    """Extract key points from timestamped transcript segments"""
+    try:
+        key_indicators = ['important', 'key', 'main', 'first', 'second', 'finally', 'conclusion']
+
+        key_segments = [segment for segment in transcript_segments
+                        if any(indicator in segment['text'].lower() for indicator in key_indicators)]
+
+        return '\n'.join([f"• [{format_timestamp(segment['start'])}] {segment['text']}" for segment in key_segments[:5]])
+
+    except Exception as e:
+        return "Unable to extract key points"
+
 def format_timestamp(seconds):
     """Format seconds to MM:SS"""
     try:
@@ -0,0 +1,94 @@
+import json
+import time
+import threading
+import rate_limiting
+from rate_limiting import TokenBucket, MonthlyQuota, ProviderLimiter, post_with_backoff, parse_retry_after, dispatch_concurrently
+
+def limited_post(limiter, url, count=1):
+    """One remote call the way visual_analysis makes it: limiter first, then the POST"""
+    if not limiter.acquire(count, timeout=5):
+        return None
+    return post_with_backoff(limiter, url, max_wait=5, json={})
+
+def test_token_bucket_paces_requests(stub_server, tmp_path):
+    limiter = ProviderLimiter('stub', requests_per_second=20, monthly_limit=100, burst=1, usage_path=str(tmp_path / 'usage.json'))
+
+    results = list(dispatch_concurrently(lambda i: limited_post(limiter, stub_server.url), range(6), max_workers=4))
+
+    assert all(response.status_code == 200 for _, response in results)
+    times = sorted(request['time'] for request in stub_server.requests)
+    # Burst of 1, then one request every 50ms
+    assert times[-1] - times[0] >= 5 * 0.05 * 0.9
+
+def test_token_bucket_try_acquire_refills():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=1, clock=lambda: now[0])
+
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    now[0] += 0.5
+    assert bucket.try_acquire()
+
+def test_retry_after_backs_off_and_retries(stub_server, tmp_path):
+    def handler(request):
+        if len(stub_server.requests) == 1:
+            return 429, {'Retry-After': '1'}, {}
+        return 200, {}, {'ok': True}
+    stub_server.handler = handler
+    limiter = ProviderLimiter('stub', requests_per_second=100, monthly_limit=100, usage_path=str(tmp_path / 'usage.json'))
+
+    start = time.monotonic()
+    response = limited_post(limiter, stub_server.url)
+
+    assert response.status_code == 200
+    assert len(stub_server.requests) == 2
+    assert stub_server.requests[1]['time'] - stub_server.requests[0]['time'] >= 0.95
+    assert time.monotonic() - start >= 0.95
+    # The retry is not charged against the quota again
+    assert limiter.quota.used() == 1
+
+def test_retry_gives_up_after_max_retries(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_limiting, 'MAX_RETRY_AFTER_SECONDS', 0)
+    stub_server.handler = lambda request: (429, {'Retry-After': '0'}, {})
+    limiter = ProviderLimiter('stub', requests_per_second=100, monthly_limit=100, usage_path=str(tmp_path / 'usage.json'))
+
+    response = post_with_backoff(limiter, stub_server.url, max_wait=5, max_retries=2, json={})
+
+    assert response.status_code == 429
+    assert len(stub_server.requests) == 3
+
+def test_parse_retry_after():
+    assert parse_retry_after('3', 1) == 3
+    assert parse_retry_after(None, 2) == 2
+    assert parse_retry_after('not a date', 2) == 2
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT', 2) == 0  # Already passed
+    assert parse_retry_after('100000', 1) == rate_limiting.MAX_RETRY_AFTER_SECONDS
+
+def test_quota_exhaustion_stops_requests(stub_server, tmp_path):
+    usage_path = str(tmp_path / 'usage.json')
+    limiter = ProviderLimiter('stub', requests_per_second=100, monthly_limit=2, usage_path=usage_path)
+
+    responses = [limited_post(limiter, stub_server.url) for _ in range(3)]
+
+    assert [response is not None for response in responses] == [True, True, False]
+    assert len(stub_server.requests) == 2
+    # Counts survive a restart
+    assert ProviderLimiter('stub', 100, 2, usage_path=usage_path).quota.remaining() == 0
+
+def test_providers_share_usage_file_without_losing_counts(tmp_path):
+    usage_path = str(tmp_path / 'usage.json')
+    quotas = [MonthlyQuota('imagga', 1000, usage_path), MonthlyQuota('google_vision', 1000, usage_path)]
+
+    def consume(quota):
+        for _ in range(50):
+            quota.try_consume()
+
+    threads = [threading.Thread(target=consume, args=(quota,)) for quota in quotas for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(usage_path) as f:
+        data = json.load(f)
+    assert [sum(data[provider].values()) for provider in ('imagga', 'google_vision')] == [100, 100]
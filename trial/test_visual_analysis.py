@@ -0,0 +1,72 @@
+import numpy as np
+import rate_limiting
+import visual_analysis
+from rate_limiting import ProviderLimiter
+
+def make_frame(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+def use_stub_vision(monkeypatch, stub_server, tmp_path):
+    monkeypatch.setattr(visual_analysis, 'GOOGLE_VISION_API_KEY', 'test-key')
+    monkeypatch.setattr(visual_analysis, 'GOOGLE_VISION_ANNOTATE_URL', f"{stub_server.url}/v1/images:annotate")
+    limiter = ProviderLimiter('google_vision', requests_per_second=100, monthly_limit=1000,
+                              usage_path=str(tmp_path / 'usage.json'))
+    monkeypatch.setitem(rate_limiting._limiters, 'google_vision', limiter)
+    return limiter
+
+def test_google_vision_batch_maps_responses_and_falls_back_per_entry(monkeypatch, stub_server, tmp_path):
+    limiter = use_stub_vision(monkeypatch, stub_server, tmp_path)
+    frames = [make_frame(i) for i in range(20)]
+
+    def handler(request):
+        # Label each entry with its position in the whole video; entry 3 fails
+        offset = 16 * (len(stub_server.requests) - 1)
+        responses = []
+        for i in range(len(request['json']['requests'])):
+            if offset + i == 3:
+                responses.append({'error': {'code': 3, 'message': 'Bad image data'}})
+            else:
+                responses.append({'labelAnnotations': [{'description': f"frame {offset + i}", 'score': 0.9}]})
+        return 200, {}, {'responses': responses}
+    stub_server.handler = handler
+
+    analyses = visual_analysis.analyze_with_google_vision_batch(frames)
+
+    # 20 frames -> batches of 16 and 4
+    assert [len(request['json']['requests']) for request in stub_server.requests] == [16, 4]
+    assert stub_server.requests[0]['path'] == '/v1/images:annotate?key=test-key'
+    assert limiter.quota.used() == 20
+
+    assert len(analyses) == 20
+    for i, analysis in enumerate(analyses):
+        if i == 3:
+            assert 'scene_type' in analysis  # Local OpenCV fallback for the failed entry only
+        else:
+            assert analysis['labels'] == [f"frame {i}"]
+
+def test_google_vision_failed_batch_falls_back_for_its_frames(monkeypatch, stub_server, tmp_path):
+    use_stub_vision(monkeypatch, stub_server, tmp_path)
+    stub_server.handler = lambda request: (500, {}, {'error': 'unavailable'})
+
+    analyses = visual_analysis.analyze_with_google_vision_batch([make_frame(0), make_frame(255)])
+
+    assert len(stub_server.requests) == 1
+    assert [analysis['brightness_level'] for analysis in analyses] == ['dark', 'bright']
+
+def test_analyze_frames_batches_and_keeps_timestamps(monkeypatch, stub_server, tmp_path):
+    use_stub_vision(monkeypatch, stub_server, tmp_path)
+    monkeypatch.setattr(visual_analysis, 'IMAGGA_API_KEY', 'your_imagga_api_key')
+    stub_server.handler = lambda request: (200, {}, {'responses': [
+        {'labelAnnotations': [{'description': f"label {i}", 'score': 0.8}]}
+        for i in range(len(request['json']['requests']))
+    ]})
+    seen = []
+
+    result = visual_analysis.analyze_frames([(make_frame(i), i * 0.5) for i in range(10)],
+                                            on_frame=lambda index, analysis: seen.append((index, analysis['labels'])))
+
+    # 10 frames, one round trip
+    assert len(stub_server.requests) == 1
+    assert seen == [(i, [f"label {i}"]) for i in range(10)]
+    assert [(change['timestamp'], change['scene_info']['labels']) for change in result['scene_changes']] == \
+        [(i * 0.5, [f"label {i}"]) for i in range(10)]
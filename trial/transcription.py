@@ -4,13 +4,74 @@ import tempfile
 import os
 import subprocess
 import json
-from moviepy.editor import VideoFileClip
+import io
+import wave
+import numpy as np
+from config import Config
+if __package__:
+    from .model_registry import transcribe_with_whisper
+    from .chunked_transcription import transcribe_in_chunks
+else:
+    from model_registry import transcribe_with_whisper
+    from chunked_transcription import transcribe_in_chunks
+
+# AssemblyAI API key, read from the environment (see env.example)
+ASSEMBLYAI_API_KEY = Config.ASSEMBLYAI_API_KEY
+
+# Whisper and SpeechRecognition both work on 16 kHz mono audio
+AUDIO_SAMPLE_RATE = 16000
+
+# Bump when transcript output changes (invalidates cached transcripts)
+TRANSCRIPTION_VERSION = '1'
+
+def extract_audio_samples(video_path, sample_rate=AUDIO_SAMPLE_RATE):
+    """Decode the audio track straight into memory as 16 kHz mono float32
+
+    ffmpeg resamples and downmixes while decoding and streams raw PCM over
+    a pipe, so nothing is written to disk. Returns None if the file has no
+    audio or ffmpeg fails.
+    """
+    try:
+        command = [
+            Config.FFMPEG_BINARY, '-nostdin', '-v', 'error',
+            '-i', video_path,
+            '-vn', '-ac', '1', '-ar', str(sample_rate),
+            '-f', 's16le', '-acodec', 'pcm_s16le', '-'
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+
+        if result.returncode != 0 or not result.stdout:
+            print(f"Error extracting audio: {result.stderr.decode(errors='ignore').strip() or 'no audio stream'}")
+            return None
+
+        return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+    except Exception as e:
+        print(f"Error extracting audio: {e}")
+        return None
+
+def audio_to_wav_bytes(audio, sample_rate=AUDIO_SAMPLE_RATE):
+    """WAV file bytes for an audio path or a float32 sample buffer"""
+    if isinstance(audio, str):
+        with open(audio, 'rb') as f:
+            return f.read()
+
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return buffer.getvalue()
 
 def extract_audio_from_video(video_path):
-    """Extract audio from video file"""
+    """Extract audio from video file to a WAV next to it (MoviePy fallback)"""
     try:
+        from moviepy.editor import VideoFileClip
+
         video = VideoFileClip(video_path)
-        audio_path = video_path.replace('.mp4', '.wav').replace('.avi', '.wav').replace('.mov', '.wav')
+        audio_path = os.path.splitext(video_path)[0] + '.wav'
         video.audio.write_audiofile(audio_path, verbose=False, logger=None)
         video.close()
         return audio_path
@@ -18,16 +79,17 @@ def extract_audio_from_video(video_path):
         print(f"Error extracting audio: {e}")
         return None
 
-def transcribe_with_assemblyai_free(audio_path):
-    """Use AssemblyAI free tier (416 free hours)"""
+def transcribe_with_assemblyai_free(audio):
+    """Use AssemblyAI free tier (416 free hours)
+
+    audio is a file path or a 16 kHz float32 sample buffer.
+    """
     try:
-        # You need to sign up for AssemblyAI free account and get API key
-        # Replace 'your_assemblyai_api_key' with actual key
-        API_KEY = "your_assemblyai_api_key"  
+        API_KEY = ASSEMBLYAI_API_KEY
 
         if API_KEY == "your_assemblyai_api_key":
             # Fallback to local Whisper if no API key
-            return transcribe_with_local_whisper(audio_path)
+            return transcribe_with_local_whisper(audio)
 
         headers = {
             "authorization": API_KEY,
@@ -35,12 +97,11 @@ def transcribe_with_assemblyai_free(audio_path):
         }
 
         # Upload audio file
-        with open(audio_path, 'rb') as f:
-            upload_response = requests.post(
-                "https://api.assemblyai.com/v2/upload",
-                files={'file': f},
-                headers={"authorization": API_KEY}
-            )
+        upload_response = requests.post(
+            "https://api.assemblyai.com/v2/upload",
+            files={'file': ('audio.wav', audio_to_wav_bytes(audio))},
+            headers={"authorization": API_KEY}
+        )
 
         audio_url = upload_response.json()['upload_url']
 
@@ -75,18 +136,16 @@ def transcribe_with_assemblyai_free(audio_path):
 
     except Exception as e:
         print(f"AssemblyAI error: {e}")
-        return transcribe_with_local_whisper(audio_path)
-
-def transcribe_with_local_whisper(audio_path):
-    """Fallback to local Whisper model (free)"""
-    try:
-        import whisper
+        return transcribe_with_local_whisper(audio)
 
-        # Load the base model (free)
-        model = whisper.load_model("base")
+def transcribe_with_local_whisper(audio):
+    """Fallback to local Whisper model (free)
 
-        # Transcribe
-        result = model.transcribe(audio_path)
+    Whisper takes either a file path or the 16 kHz float32 buffer directly.
+    """
+    try:
+        # Shared model, loaded once per process (free)
+        result = transcribe_with_whisper(audio, Config.WHISPER_MODEL_SIZE)
         return result["text"]
 
     except ImportError:
@@ -94,15 +153,16 @@ def transcribe_with_local_whisper(audio_path):
     except Exception as e:
         return f"Local whisper error: {e}"
 
-def transcribe_with_speechrecognition_free(audio_path):
+def transcribe_with_speechrecognition_free(audio):
     """Use Google Speech Recognition free tier"""
     try:
         import speech_recognition as sr
 
         r = sr.Recognizer()
 
-        # Convert to wav if needed
-        with sr.AudioFile(audio_path) as source:
+        # AudioFile reads WAV from a path or an in-memory file
+        source_file = audio if isinstance(audio, str) else io.BytesIO(audio_to_wav_bytes(audio))
+        with sr.AudioFile(source_file) as source:
             audio = r.record(source)
 
         # Use Google's free service (has daily limits)
@@ -114,33 +174,65 @@ def transcribe_with_speechrecognition_free(audio_path):
     except Exception as e:
         return f"Speech recognition error: {e}"
 
-def transcribe_video(video_path):
-    """Main transcription function"""
-    try:
-        # Extract audio from video
-        audio_path = extract_audio_from_video(video_path)
-        if not audio_path:
-            return "Failed to extract audio from video"
+def transcribe_audio(audio):
+    """Run audio through the free transcription services, best first"""
+    # Method 1: Try AssemblyAI free tier first (most accurate)
+    transcript = transcribe_with_assemblyai_free(audio)
 
-        # Try different free transcription services
-        transcript = None
+    # Method 2: Fallback to local Whisper
+    if not transcript or "error" in transcript.lower():
+        transcript = transcribe_with_local_whisper(audio)
 
-        # Method 1: Try AssemblyAI free tier first (most accurate)
-        transcript = transcribe_with_assemblyai_free(audio_path)
+    # Method 3: Final fallback to Google Speech Recognition
+    if not transcript or "error" in transcript.lower():
+        transcript = transcribe_with_speechrecognition_free(audio)
 
-        # Method 2: Fallback to local Whisper
-        if not transcript or "error" in transcript.lower():
-            transcript = transcribe_with_local_whisper(audio_path)
+    return transcript
 
-        # Method 3: Final fallback to Google Speech Recognition
-        if not transcript or "error" in transcript.lower():
-            transcript = transcribe_with_speechrecognition_free(audio_path)
+def transcription_failure(message):
+    return {'text': message, 'segments': [], 'error': message}
 
-        # Clean up audio file
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
+def transcribe_video_with_segments(video_path):
+    """Transcribe a video into {'text', 'segments'}
 
-        return transcript or "Failed to transcribe audio"
+    Without an AssemblyAI key the audio is split on silence, only speech
+    chunks are transcribed (in parallel) and 'segments' holds timestamped
+    {'start', 'end', 'text'} entries. Other paths return a flat transcript
+    with an empty 'segments' list. Failures also set 'error' (the same
+    message as 'text') so callers can tell them from a transcript.
+    """
+    audio = None
+    try:
+        # Extract audio from video (in memory, 16 kHz mono)
+        audio = extract_audio_samples(video_path)
+        if audio is None:
+            # ffmpeg unavailable or failed: fall back to a temporary WAV
+            audio = extract_audio_from_video(video_path)
+        if audio is None:
+            return transcription_failure("Failed to extract audio from video")
+
+        # Local path: VAD-chunked parallel Whisper on the sample buffer
+        if ASSEMBLYAI_API_KEY == "your_assemblyai_api_key" and not isinstance(audio, str):
+            try:
+                segments = transcribe_in_chunks(audio)
+                return {'text': ' '.join(segment['text'] for segment in segments), 'segments': segments}
+            except Exception as e:
+                print(f"Chunked transcription error: {e}")
+
+        # Try different free transcription services
+        transcript = transcribe_audio(audio)
+        if not transcript or "error" in transcript.lower() or transcript.startswith("Please install"):
+            return transcription_failure(transcript or "Failed to transcribe audio")
+        return {'text': transcript, 'segments': []}
 
     except Exception as e:
-        return f"Transcription failed: {e}"
+        return transcription_failure(f"Transcription failed: {e}")
+
+    finally:
+        # Clean up audio file (only the MoviePy fallback writes one)
+        if isinstance(audio, str) and os.path.exists(audio):
+            os.remove(audio)
+
+def transcribe_video(video_path):
+    """Main transcription function"""
+    return transcribe_video_with_segments(video_path)['text']
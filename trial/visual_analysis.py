@@ -6,44 +6,126 @@ import json
 import numpy as np
 from io import BytesIO
 import time
+from config import Config
+if __package__:
+    from .rate_limiting import get_provider_limiter, post_with_backoff, dispatch_concurrently
+else:
+    from rate_limiting import get_provider_limiter, post_with_backoff, dispatch_concurrently
+
+# Imagga / Google Cloud credentials, read from the environment (see env.example)
+IMAGGA_API_KEY = Config.IMAGGA_API_KEY
+IMAGGA_API_SECRET = Config.IMAGGA_API_SECRET
+GOOGLE_VISION_API_KEY = Config.GOOGLE_VISION_API_KEY
+
+# API endpoints (override to point at a local stub server when testing)
+IMAGGA_TAGS_URL = "https://api.imagga.com/v2/tags"
+GOOGLE_VISION_ANNOTATE_URL = "https://vision.googleapis.com/v1/images:annotate"
+
+# images:annotate limits: images per request and total JSON body size
+GOOGLE_VISION_MAX_BATCH_IMAGES = 16
+GOOGLE_VISION_MAX_BATCH_BYTES = 8 * 1024 * 1024  # API limit is 10MB; keep headroom
+
+GOOGLE_VISION_FEATURES = [
+    {"type": "LABEL_DETECTION", "maxResults": 10},
+    {"type": "OBJECT_LOCALIZATION", "maxResults": 10}
+]
+
+# Longest a frame waits for a rate-limit token before falling back to local analysis
+RATE_LIMIT_WAIT_SECONDS = 30
+
+# Above this many frames between samples, seeking is cheaper than decoding
+# every frame in between (seeks land on the previous keyframe)
+SEEK_SAMPLING_MIN_INTERVAL = 120
+
+# Bump when frame analysis output changes (invalidates cached results)
+ANALYSIS_VERSION = '1'
+
+def iter_key_frames(video_path, max_frames=10, sampling='auto'):
+    """Lazily yield key frames as dicts, one decoded frame at a time
+
+    Items carry 'frame', 'timestamp', 'frame_number' and 'type', the same
+    shape as video_processing.iter_frames. sampling: 'seek' jumps to each
+    target frame, 'grab' skips frames with grab() and only retrieves the
+    targets, 'sequential' reads every frame, 'auto' picks 'seek' for wide
+    intervals and 'grab' otherwise.
+    """
+    cap = cv2.VideoCapture(video_path)
 
-def extract_key_frames(video_path, max_frames=10):
-    """Extract key frames from video for analysis"""
     try:
-        cap = cv2.VideoCapture(video_path)
-
         if not cap.isOpened():
-            return []
+            return
 
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         fps = cap.get(cv2.CAP_PROP_FPS)
-        duration = total_frames / fps
 
         # Extract frames at regular intervals
         interval = max(1, total_frames // max_frames)
-        frames = []
-        frame_times = []
 
+        if sampling == 'auto':
+            sampling = 'seek' if interval >= SEEK_SAMPLING_MIN_INTERVAL else 'grab'
+
+        if sampling == 'seek':
+            for frame_number in range(0, total_frames, interval)[:max_frames]:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                ret, frame = cap.read()
+                if not ret:
+                    break
+
+                yield {
+                    'frame': cv2.resize(frame, (640, 480)),
+                    'timestamp': frame_number / fps,
+                    'frame_number': frame_number,
+                    'type': 'regular'
+                }
+            return
+
+        emitted = 0
         frame_count = 0
-        while cap.isOpened():
+        while cap.isOpened() and emitted < max_frames:
+            is_target = frame_count % interval == 0
+
+            if sampling == 'grab' and not is_target:
+                # Skip the frame without retrieving/converting it
+                if not cap.grab():
+                    break
+                frame_count += 1
+                continue
+
             ret, frame = cap.read()
             if not ret:
                 break
 
-            if frame_count % interval == 0 and len(frames) < max_frames:
+            if is_target:
                 # Resize frame to reduce API payload
-                frame_resized = cv2.resize(frame, (640, 480))
-                frames.append(frame_resized)
-                frame_times.append(frame_count / fps)
+                yield {
+                    'frame': cv2.resize(frame, (640, 480)),
+                    'timestamp': frame_count / fps,
+                    'frame_number': frame_count,
+                    'type': 'regular'
+                }
+                emitted += 1
 
             frame_count += 1
 
+    except Exception as e:
+        print(f"Error extracting frames: {e}")
+
+    finally:
         cap.release()
-        return list(zip(frames, frame_times))
 
+def extract_key_frames(video_path, max_frames=10, sampling='auto'):
+    """Extract key frames from video for analysis"""
+    return [(frame_info['frame'], frame_info['timestamp'])
+            for frame_info in iter_key_frames(video_path, max_frames, sampling)]
+
+def frame_to_jpeg(frame):
+    """Encode frame as JPEG bytes for upload APIs"""
+    try:
+        _, buffer = cv2.imencode('.jpg', frame)
+        return buffer.tobytes()
     except Exception as e:
-        print(f"Error extracting frames: {e}")
-        return []
+        print(f"Error encoding frame as JPEG: {e}")
+        return None
 
 def frame_to_base64(frame):
     """Convert frame to base64 for API calls"""
@@ -55,25 +137,40 @@ def frame_to_base64(frame):
         print(f"Error converting frame to base64: {e}")
         return None
 
-def analyze_with_imagga_free(frame_base64):
-    """Use Imagga free tier (1000 requests/month)"""
+def base64_to_frame(frame_base64):
+    """Decode a base64 JPEG back into a BGR array"""
+    img_data = base64.b64decode(frame_base64)
+    nparr = np.frombuffer(img_data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def analyze_with_imagga_free(frame):
+    """Use Imagga free tier (1000 requests/month)
+
+    Takes the raw frame array; it is only JPEG-encoded if the API is called.
+    """
     try:
-        # You need to sign up for Imagga and get API credentials
-        API_KEY = "your_imagga_api_key"
-        API_SECRET = "your_imagga_api_secret"
+        API_KEY = IMAGGA_API_KEY
+        API_SECRET = IMAGGA_API_SECRET
 
         if API_KEY == "your_imagga_api_key":
-            return analyze_with_opencv_local(frame_base64)
+            return analyze_with_opencv_local(frame)
 
-        url = "https://api.imagga.com/v2/tags"
+        # Respect the per-second rate and the monthly free quota
+        limiter = get_provider_limiter('imagga')
+        if not limiter.acquire(timeout=RATE_LIMIT_WAIT_SECONDS):
+            return analyze_with_opencv_local(frame)
 
-        response = requests.post(
+        url = IMAGGA_TAGS_URL
+
+        response = post_with_backoff(
+            limiter,
             url,
+            max_wait=RATE_LIMIT_WAIT_SECONDS,
             auth=(API_KEY, API_SECRET),
-            files={'image': base64.b64decode(frame_base64)}
+            files={'image': frame_to_jpeg(frame)}
         )
 
-        if response.status_code == 200:
+        if response is not None and response.status_code == 200:
             data = response.json()
             tags = [tag['tag']['en'] for tag in data['result']['tags'][:10]]
             return {
@@ -81,61 +178,162 @@ def analyze_with_imagga_free(frame_base64):
                 'confidence': [tag['confidence'] for tag in data['result']['tags'][:10]]
             }
         else:
-            return analyze_with_opencv_local(frame_base64)
+            return analyze_with_opencv_local(frame)
 
     except Exception as e:
         print(f"Imagga API error: {e}")
-        return analyze_with_opencv_local(frame_base64)
+        return analyze_with_opencv_local(frame)
+
+def analyze_with_google_vision_free(frame):
+    """Use Google Cloud Vision free tier (1000 requests/month)
 
-def analyze_with_google_vision_free(frame_base64):
-    """Use Google Cloud Vision free tier (1000 requests/month)"""
+    Takes the raw frame array; it is only base64-encoded if the API is called.
+    """
     try:
         # You need Google Cloud credentials
         # This is a simplified example - you'd need proper auth setup
-        API_KEY = "your_google_vision_api_key"
+        API_KEY = GOOGLE_VISION_API_KEY
 
         if API_KEY == "your_google_vision_api_key":
-            return analyze_with_opencv_local(frame_base64)
+            return analyze_with_opencv_local(frame)
 
-        url = f"https://vision.googleapis.com/v1/images:annotate?key={API_KEY}"
+        # Respect the per-second rate and the monthly free quota
+        limiter = get_provider_limiter('google_vision')
+        if not limiter.acquire(timeout=RATE_LIMIT_WAIT_SECONDS):
+            return analyze_with_opencv_local(frame)
+
+        url = f"{GOOGLE_VISION_ANNOTATE_URL}?key={API_KEY}"
+        frame_base64 = frame_to_base64(frame)
 
         payload = {
             "requests": [{
                 "image": {"content": frame_base64},
-                "features": [
-                    {"type": "LABEL_DETECTION", "maxResults": 10},
-                    {"type": "OBJECT_LOCALIZATION", "maxResults": 10}
-                ]
+                "features": GOOGLE_VISION_FEATURES
             }]
         }
 
-        response = requests.post(url, json=payload)
+        response = post_with_backoff(limiter, url, max_wait=RATE_LIMIT_WAIT_SECONDS, json=payload)
 
-        if response.status_code == 200:
+        if response is not None and response.status_code == 200:
             data = response.json()
             if 'responses' in data and len(data['responses']) > 0:
-                labels = data['responses'][0].get('labelAnnotations', [])
-                objects = data['responses'][0].get('localizedObjectAnnotations', [])
+                analysis = parse_google_vision_response(data['responses'][0])
+                if analysis:
+                    return analysis
 
-                return {
-                    'labels': [label['description'] for label in labels],
-                    'objects': [obj['name'] for obj in objects],
-                    'confidence': [label['score'] for label in labels]
-                }
+        return analyze_with_opencv_local(frame)
+
+    except Exception as e:
+        print(f"Google Vision API error: {e}")
+        return analyze_with_opencv_local(frame)
+
+def parse_google_vision_response(entry):
+    """Turn one images:annotate response entry into an analysis (None if it failed)"""
+    if 'error' in entry:
+        return None
+
+    labels = entry.get('labelAnnotations', [])
+    objects = entry.get('localizedObjectAnnotations', [])
+
+    return {
+        'labels': [label['description'] for label in labels],
+        'objects': [obj['name'] for obj in objects],
+        'confidence': [label['score'] for label in labels]
+    }
+
+def split_google_vision_batches(encoded_frames):
+    """Group base64 frames into batches within the image-count and size limits
+
+    Returns lists of indices into encoded_frames.
+    """
+    batches = []
+    current, current_bytes = [], 0
 
-        return analyze_with_opencv_local(frame_base64)
+    for i, frame_base64 in enumerate(encoded_frames):
+        if frame_base64 is None:
+            continue
+
+        size = len(frame_base64)
+        if current and (len(current) >= GOOGLE_VISION_MAX_BATCH_IMAGES or
+                        current_bytes + size > GOOGLE_VISION_MAX_BATCH_BYTES):
+            batches.append(current)
+            current, current_bytes = [], 0
+
+        current.append(i)
+        current_bytes += size
+
+    if current:
+        batches.append(current)
+    return batches
+
+def analyze_with_google_vision_batch(frames):
+    """Annotate many frames with as few images:annotate calls as possible
+
+    Returns one analysis per input frame, in order. Entries the API could
+    not annotate (and whole batches whose call failed) fall back to
+    analyze_with_opencv_local for just those frames.
+    """
+    analyses = [None] * len(frames)
+
+    try:
+        if GOOGLE_VISION_API_KEY == "your_google_vision_api_key":
+            return [analyze_with_opencv_local(frame) for frame in frames]
+
+        url = f"{GOOGLE_VISION_ANNOTATE_URL}?key={GOOGLE_VISION_API_KEY}"
+        encoded_frames = [frame_to_base64(frame) for frame in frames]
+        limiter = get_provider_limiter('google_vision')
+
+        for batch in split_google_vision_batches(encoded_frames):
+            # One request, len(batch) images against the monthly quota
+            if not limiter.acquire(count=len(batch), timeout=RATE_LIMIT_WAIT_SECONDS):
+                continue
+
+            payload = {
+                "requests": [{
+                    "image": {"content": encoded_frames[i]},
+                    "features": GOOGLE_VISION_FEATURES
+                } for i in batch]
+            }
+
+            try:
+                response = post_with_backoff(limiter, url, max_wait=RATE_LIMIT_WAIT_SECONDS, json=payload)
+                if response is None:
+                    continue
+                if response.status_code != 200:
+                    print(f"Google Vision batch failed with status {response.status_code}")
+                    continue
+
+                # Responses come back in request order
+                for i, entry in zip(batch, response.json().get('responses', [])):
+                    analyses[i] = parse_google_vision_response(entry)
+
+            except Exception as e:
+                print(f"Google Vision batch error: {e}")
 
     except Exception as e:
         print(f"Google Vision API error: {e}")
-        return analyze_with_opencv_local(frame_base64)
 
-def analyze_with_opencv_local(frame_base64):
-    """Fallback local analysis using OpenCV (completely free)"""
+    return [analysis or analyze_with_opencv_local(frame) for frame, analysis in zip(frames, analyses)]
+
+def iter_batches(items, size):
+    """Group an iterable into lists of up to size items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def analyze_with_opencv_local(frame):
+    """Fallback local analysis using OpenCV (completely free)
+
+    Works on the frame array directly; a base64 string is still accepted.
+    """
     try:
-        # Decode base64 back to image
-        img_data = base64.b64decode(frame_base64)
-        nparr = np.frombuffer(img_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        if isinstance(frame, str):
+            frame = base64_to_frame(frame)
 
         # Simple color analysis
         avg_color = np.mean(frame, axis=(0, 1))
@@ -196,35 +394,57 @@ def classify_scene_simple(brightness, edge_density):
     else:
         return 'standard'
 
-def analyze_frames(frames_with_times):
-    """Main function to analyze all extracted frames"""
-    try:
-        if not frames_with_times:
-            return {"error": "No frames to analyze"}
+def analyze_single_frame(frame):
+    """Run one frame through the free API chain, falling back to OpenCV"""
+    # Try different free APIs in order of preference
+    # (frames are only encoded by backends that actually upload them)
+    analysis = None
 
-        frame_analysis = []
+    # Method 1: Try Imagga free tier
+    analysis = analyze_with_imagga_free(frame)
 
-        for i, (frame, timestamp) in enumerate(frames_with_times):
-            print(f"Analyzing frame {i+1}/{len(frames_with_times)}...")
+    # Method 2: Try Google Vision free tier  
+    if not analysis or 'error' in analysis:
+        analysis = analyze_with_google_vision_free(frame)
 
-            # Convert frame to base64
-            frame_base64 = frame_to_base64(frame)
-            if not frame_base64:
-                continue
+    # Method 3: Fallback to local OpenCV
+    if not analysis or 'error' in analysis:
+        analysis = analyze_with_opencv_local(frame)
 
-            # Try different free APIs in order of preference
-            analysis = None
+    return analysis
 
-            # Method 1: Try Imagga free tier
-            analysis = analyze_with_imagga_free(frame_base64)
+def analyze_frames(frames_with_times, on_frame=None):
+    """Main function to analyze all extracted frames
 
-            # Method 2: Try Google Vision free tier  
-            if not analysis or 'error' in analysis:
-                analysis = analyze_with_google_vision_free(frame_base64)
+    Accepts (frame, timestamp) pairs or frame dicts from a lazy frame
+    source such as iter_key_frames(); frames are analyzed as they arrive.
+    With Imagga configured, frames are sent concurrently and the shared
+    per-provider rate limiters pace the requests. With only Google Vision
+    configured, frames are annotated in batches (one call per batch).
+    on_frame(index, analysis) is called as each frame's result is ready.
+    """
+    try:
+        frame_analysis = []
+
+        def split_frame(frame_item):
+            if isinstance(frame_item, dict):
+                return frame_item['frame'], frame_item['timestamp']
+            return frame_item
 
-            # Method 3: Fallback to local OpenCV
-            if not analysis or 'error' in analysis:
-                analysis = analyze_with_opencv_local(frame_base64)
+        frames = (split_frame(frame_item) for frame_item in frames_with_times)
+
+        if IMAGGA_API_KEY != "your_imagga_api_key":
+            results = dispatch_concurrently(lambda item: analyze_single_frame(item[0]), frames)
+        elif GOOGLE_VISION_API_KEY != "your_google_vision_api_key":
+            # One images:annotate round trip per batch instead of per frame
+            results = ((item, analysis)
+                       for batch in iter_batches(frames, GOOGLE_VISION_MAX_BATCH_IMAGES)
+                       for item, analysis in zip(batch, analyze_with_google_vision_batch([frame for frame, _ in batch])))
+        else:
+            results = ((item, analyze_with_opencv_local(item[0])) for item in frames)
+
+        for i, ((frame, timestamp), analysis) in enumerate(results):
+            print(f"Analyzed frame {i+1}")
 
             frame_analysis.append({
                 'timestamp': timestamp,
@@ -232,8 +452,11 @@ def analyze_frames(frames_with_times):
                 'analysis': analysis
             })
 
-            # Rate limiting for free APIs
-            time.sleep(0.5)
+            if on_frame:
+                on_frame(i, analysis)
+
+        if not frame_analysis:
+            return {"error": "No frames to analyze"}
 
         # Aggregate analysis across all frames
         return aggregate_frame_analysis(frame_analysis)
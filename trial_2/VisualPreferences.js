@@ -16,6 +16,10 @@ const VisualPreferences = ({ onPreferencesSet, currentPreferences }) => {
     setPreferences(prev => ({ ...prev, detail_level: parseInt(detail_level) }));
   };
 
+  const handleSceneSensitivityChange = (scene_sensitivity) => {
+    setPreferences(prev => ({ ...prev, scene_sensitivity: parseFloat(scene_sensitivity) }));
+  };
+
   const handleFocusChange = (focusArea) => {
     setPreferences(prev => {
       const newFocus = prev.focus.includes(focusArea)
@@ -62,6 +66,28 @@ const VisualPreferences = ({ onPreferencesSet, currentPreferences }) => {
         </p>
       </div>
 
+      {/* Scene Change Sensitivity */}
+      <div className="preference-section">
+        <h3>🎞️ Scene Change Sensitivity</h3>
+        <div className="slider-container">
+          <label>Sensitivity: <strong>{preferences.scene_sensitivity ?? 0.5}</strong></label>
+          <input
+            type="range"
+            min="0"
+            max="1"
+            step="0.1"
+            value={preferences.scene_sensitivity ?? 0.5}
+            onChange={(e) => handleSceneSensitivityChange(e.target.value)}
+            className="detail-slider"
+          />
+          <div className="slider-labels">
+            <span>Hard cuts only</span>
+            <span>Balanced</span>
+            <span>Subtle changes</span>
+          </div>
+        </div>
+      </div>
+
       {/* Summary Length */}
       <div className="preference-section">
         <h3>📏 Summary Length</h3>
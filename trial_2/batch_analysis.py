@@ -0,0 +1,112 @@
+import cv2
+import numpy as np
+
+# Rule-of-thirds regions in the same order analyze_composition reports them
+COMPOSITION_REGIONS = [
+    ('top_left', 0, 0), ('top_center', 0, 1), ('top_right', 0, 2),
+    ('center_left', 1, 0), ('center', 1, 1), ('center_right', 1, 2),
+    ('bottom_left', 2, 0), ('bottom_center', 2, 1), ('bottom_right', 2, 2)
+]
+
+def stack_frames(frames):
+    """Stack equally sized BGR frames into one (N, H, W, C) uint8 array"""
+    return np.ascontiguousarray(np.stack(frames), dtype=np.uint8)
+
+def convert_stack(stack, code):
+    """cv2.cvtColor over a whole stack in a single call
+
+    The stack is viewed as one tall (N*H, W, C) image, so the per-pixel
+    result is exactly what converting each frame separately would give.
+    """
+    n, h, w = stack.shape[:3]
+    converted = cv2.cvtColor(stack.reshape(n * h, w, stack.shape[3]), code)
+    return converted.reshape((n, h, w) + converted.shape[2:])
+
+def thirds_bounds(size, index):
+    third = size // 3
+    return (index * third, (index + 1) * third if index < 2 else size)
+
+def compute_batch_metrics(stack):
+    """Reduction metrics for every frame of an (N, H, W, C) stack at once
+
+    Returns a dict of length-N arrays (and a dict of per-region arrays).
+    All sums are over uint8 values, so means are exact and match the
+    per-frame analyzers bit for bit.
+    """
+    n, h, w = stack.shape[:3]
+    gray = convert_stack(stack, cv2.COLOR_BGR2GRAY)
+    saturation = convert_stack(stack, cv2.COLOR_BGR2HSV)[..., 1]
+
+    metrics = {
+        'brightness': gray.mean(axis=(1, 2)),
+        'contrast': gray.std(axis=(1, 2)),
+        'saturation': saturation.mean(axis=(1, 2)),
+        'overexposed': (gray > 250).sum(axis=(1, 2)) / (h * w),
+        'underexposed': (gray < 5).sum(axis=(1, 2)) / (h * w)
+    }
+
+    # Rule-of-thirds region means over all channels
+    regions = {}
+    for name, row, col in COMPOSITION_REGIONS:
+        top, bottom = thirds_bounds(h, row)
+        left, right = thirds_bounds(w, col)
+        regions[name] = stack[:, top:bottom, left:right].mean(axis=(1, 2, 3))
+    metrics['regions'] = regions
+
+    # Symmetry: left half vs mirrored right half, trimmed to equal width
+    half = w // 2
+    min_w = min(half, w - half)
+    left_half = stack[:, :, :min_w]
+    right_half = stack[:, :, half:][:, :, ::-1][:, :, :min_w]
+    difference = np.abs(left_half.astype(np.int16) - right_half.astype(np.int16))
+    metrics['symmetry'] = 1.0 - difference.mean(axis=(1, 2, 3)) / 255.0
+
+    return metrics
+
+def analyze_frames_batch(frames):
+    """Batch version of the reduction fields of analyze_frame_with_opencv_advanced
+
+    Takes a list of equally sized frames (or a stacked array) and returns
+    one dict per frame laid out like 'visual_elements', holding only the
+    fields these reductions produce: scene_type brightness/contrast, colors
+    saturation_level, quality brightness and exposure percentages, and
+    composition region brightness, focus area and symmetry.
+    """
+    try:
+        stack = frames if isinstance(frames, np.ndarray) else stack_frames(frames)
+        if stack.ndim != 4 or len(stack) == 0:
+            return []
+
+        metrics = compute_batch_metrics(stack)
+        results = []
+
+        for i in range(len(stack)):
+            regions = {name: float(values[i]) for name, values in metrics['regions'].items()}
+            symmetry_score = float(metrics['symmetry'][i])
+
+            results.append({
+                'scene_type': {
+                    'brightness': float(metrics['brightness'][i]),
+                    'contrast': float(metrics['contrast'][i])
+                },
+                'colors': {
+                    'saturation_level': float(metrics['saturation'][i])
+                },
+                'quality': {
+                    'brightness': float(metrics['brightness'][i]),
+                    'overexposed_percentage': float(metrics['overexposed'][i] * 100),
+                    'underexposed_percentage': float(metrics['underexposed'][i] * 100)
+                },
+                'composition': {
+                    'focus_area': max(regions, key=regions.get),
+                    'symmetry_score': symmetry_score,
+                    'composition_balance': 'balanced' if 0.4 < symmetry_score < 0.6 else 'asymmetric',
+                    'region_brightness': regions
+                }
+            })
+
+        return results
+
+    except Exception as e:
+        print(f"Error in batch analysis: {e}")
+        return []
@@ -0,0 +1,205 @@
+# benchmark_pipeline.py - Timing script for the video processing pipeline
+
+import os
+import sys
+import time
+import tempfile
+import cv2
+import numpy as np
+from video_processing import extract_frames, iter_frames
+import enhanced_visual_analysis as eva
+
+def create_synthetic_video(path, seconds, fps=30, size=(1280, 720)):
+    """Write a moving-gradient test video of the given length"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    w, h = size
+    horizontal = np.tile(np.linspace(0, 255, w, dtype=np.uint8), (h, 1))
+    vertical = np.tile(np.linspace(0, 255, h, dtype=np.uint8)[:, None], (1, w))
+
+    for i in range(int(seconds * fps)):
+        frame = np.dstack([np.roll(horizontal, i * 4, axis=1), vertical, np.full((h, w), i % 256, np.uint8)])
+        cv2.putText(frame, f"frame {i}", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+
+    writer.release()
+    return path
+
+def time_call(func, *args, **kwargs):
+    """Run func once and return (result, seconds)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def benchmark_frame_sampling(lengths=(10, 30, 60, 120), max_frames=10):
+    """Compare decode time of each sampling mode against video length"""
+    print("🎞️  Frame sampling: decode time vs video length")
+    print(f"{'length':>8} {'sequential':>12} {'grab':>12} {'seek':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for seconds in lengths:
+            path = create_synthetic_video(os.path.join(tmp_dir, f"bench_{seconds}s.mp4"), seconds)
+
+            timings = {}
+            for mode in ('sequential', 'grab', 'seek'):
+                frames, timings[mode] = time_call(extract_frames, path, max_frames=max_frames, sampling=mode)
+                if len(frames) != max_frames:
+                    print(f"⚠️  {mode} returned {len(frames)} frames for {seconds}s video")
+
+            print(f"{seconds:>7}s {timings['sequential']:>11.2f}s {timings['grab']:>11.2f}s {timings['seek']:>11.2f}s")
+
+def benchmark_frame_context(num_frames=20, repeats=5):
+    """Per-frame analyzer cost with and without a shared FrameContext"""
+    print("🧮 Per-frame analyzer cost (800x600)")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_synthetic_video(os.path.join(tmp_dir, "bench_ctx.mp4"), 10)
+        frames = [info['frame'] for info in iter_frames(path, num_frames, size=(800, 600))]
+
+    def uncached():
+        # Every analyzer derives its own grayscale/HSV/edges
+        for frame in frames:
+            for analyzer in eva.ANALYZERS.values():
+                analyzer(frame)
+
+    def shared():
+        for frame in frames:
+            ctx = eva.FrameContext(frame)
+            for analyzer in eva.ANALYZERS.values():
+                analyzer(ctx)
+
+    for label, func in (('uncached', uncached), ('shared context', shared)):
+        best = min(time_call(func)[1] for _ in range(repeats))
+        print(f"{label:>16}: {best / len(frames) * 1000:7.2f} ms/frame")
+
+def benchmark_parallel_analysis(num_frames=40):
+    """Frame analysis throughput, serial vs process pool"""
+    from parallel_analysis import get_default_workers, shutdown_analysis_pools
+
+    workers = max(2, get_default_workers())
+    print(f"⚙️  Frame analysis: serial vs {workers} workers")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_synthetic_video(os.path.join(tmp_dir, "bench_parallel.mp4"), 10)
+        frames = list(iter_frames(path, num_frames, size=(800, 600)))
+
+    # Warm the pool so process start-up is not counted
+    eva.analyze_frames(frames[:workers], workers=workers)
+
+    serial, serial_time = time_call(eva.analyze_frames, frames)
+    parallel, parallel_time = time_call(eva.analyze_frames, frames, workers=workers)
+    shutdown_analysis_pools()
+
+    print(f"{'serial':>16}: {len(frames) / serial_time:7.1f} frames/s")
+    print(f"{'parallel':>16}: {len(frames) / parallel_time:7.1f} frames/s")
+    print(f"{'identical':>16}: {serial == parallel}")
+
+def benchmark_batch_analysis(num_frames=32, repeats=3):
+    """Reduction metrics throughput, per-frame analyzers vs one stacked batch"""
+    from batch_analysis import analyze_frames_batch, stack_frames
+
+    print(f"📦 Reduction metrics: per-frame vs batched ({num_frames} frames, 800x600)")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_synthetic_video(os.path.join(tmp_dir, "bench_batch.mp4"), 10)
+        frames = [info['frame'] for info in iter_frames(path, num_frames, size=(800, 600))]
+
+    def per_frame():
+        # Only the analyzers whose fields the batch path covers
+        return [eva.analyze_frame_with_opencv_advanced(frame, 0, ['colors', 'scene_type', 'composition', 'quality'])
+                for frame in frames]
+
+    def batched():
+        return analyze_frames_batch(stack_frames(frames))
+
+    for label, func in (('per-frame', per_frame), ('batched', batched)):
+        best = min(time_call(func)[1] for _ in range(repeats))
+        print(f"{label:>16}: {len(frames) / best:7.1f} frames/s")
+
+    # Same values for every field the batch path computes
+    identical = all(full['visual_elements'][group][field] == value
+                    for full, batch in zip(per_frame(), batched())
+                    for group, fields in batch.items()
+                    for field, value in fields.items())
+    print(f"{'identical':>16}: {identical}")
+
+def benchmark_segmented_decoding(seconds=120, max_frames=20):
+    """Scene-change frame extraction, single pass vs parallel segments"""
+    from parallel_analysis import get_default_workers
+    from segmented_decoding import shutdown_decode_pool
+
+    segments = max(2, get_default_workers())
+    print(f"✂️  Frame extraction with scene detection: 1 vs {segments} segments ({seconds}s video)")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_synthetic_video(os.path.join(tmp_dir, "bench_segments.mp4"), seconds)
+
+        # Warm the pool so process start-up is not counted
+        list(iter_frames(path, 2, scene_changes=True, segments=segments))
+
+        single, single_time = time_call(lambda: list(iter_frames(path, max_frames, scene_changes=True)))
+        split, split_time = time_call(lambda: list(iter_frames(path, max_frames, scene_changes=True, segments=segments)))
+
+    shutdown_decode_pool()
+
+    key = lambda frames: [(info['frame_number'], info['type']) for info in frames]
+    identical = key(single) == key(split) and all(np.array_equal(a['frame'], b['frame']) for a, b in zip(single, split))
+    print(f"{'single pass':>16}: {single_time:7.2f}s")
+    print(f"{'segmented':>16}: {split_time:7.2f}s")
+    print(f"{'identical':>16}: {identical}")
+
+def benchmark_seeking(seconds=60, step_seconds=2.5):
+    """Frame server read latency across the file, with and without the keyframe index"""
+    from frame_server import FrameServer
+    from keyframe_index import save_keyframe_index
+
+    print(f"⏩ Frame server scrubbing every {step_seconds}s ({seconds}s video), mean ms per tenth of the file")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_synthetic_video(os.path.join(tmp_dir, "bench_seek.mp4"), seconds)
+        save_keyframe_index(path)
+        timestamps = np.arange(0, seconds - 1, step_seconds)
+
+        for use_index in (False, True):
+            server = FrameServer(max_captures=1)
+            _, capture = server._get_capture(path)
+            if not use_index:
+                capture.keyframes = None
+
+            latencies = [time_call(server.get_frame, path, t)[1] * 1000 for t in timestamps]
+            tenths = [np.mean(chunk) for chunk in np.array_split(latencies, 10)]
+            label = 'keyframe index' if use_index else 'no index'
+            print(f"{label:>16}: " + ' '.join(f"{ms:5.1f}" for ms in tenths) + f"  (max {max(latencies):.1f})")
+            server.close()
+
+def benchmark_trimming(seconds=60, clips=((5.5, 12), (20.3, 31), (44.1, 58))):
+    """Cutting several clips in one ffmpeg run: stream copy vs frame-exact re-encode"""
+    from video_trimming import cut_clips
+
+    print(f"✂️  Cutting {len(clips)} clips from a {seconds}s video in one pass")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_synthetic_video(os.path.join(tmp_dir, "bench_trim.mp4"), seconds)
+
+        copied, copy_time = time_call(cut_clips, path, clips, os.path.join(tmp_dir, 'copy'))
+        exact, exact_time = time_call(cut_clips, path, clips, os.path.join(tmp_dir, 'exact'), exact=True)
+
+    snapped = ', '.join(f"{clip['start']:.2f}" for clip in copied)
+    print(f"{'stream copy':>16}: {copy_time:7.2f}s  (starts snapped to {snapped})")
+    print(f"{'frame-exact':>16}: {exact_time:7.2f}s  ({sum(clip['mode'] == 'reencode' for clip in exact)} re-encoded)")
+
+BENCHMARKS = {
+    'sampling': benchmark_frame_sampling,
+    'analyzers': benchmark_frame_context,
+    'parallel': benchmark_parallel_analysis,
+    'batch': benchmark_batch_analysis,
+    'segmented': benchmark_segmented_decoding,
+    'seeking': benchmark_seeking,
+    'trimming': benchmark_trimming,
+}
+
+if __name__ == "__main__":
+    # Usage: python benchmark_pipeline.py [benchmark ...]
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
+        print()
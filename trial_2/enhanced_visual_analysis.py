@@ -5,115 +5,90 @@ import base64
 import json
 import numpy as np
 from io import BytesIO
-import time
-
-def extract_comprehensive_frames(video_path, max_frames=20):
+from functools import cached_property
+from collections import Counter
+if __package__:
+    from .video_processing import iter_frames
+    from .scene_detection import create_scene_detector
+else:
+    from video_processing import iter_frames
+    from scene_detection import create_scene_detector
+
+# Bump when per-frame analysis or aggregation output changes (invalidates cached results)
+ANALYSIS_VERSION = '3'
+
+class FrameContext:
+    """Per-frame cache of derived images shared by all analyzers
+
+    Each intermediate (grayscale, HSV, Canny edges) is computed on first use
+    and reused by every analyzer that asks for it afterwards.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    @cached_property
+    def gray(self):
+        return cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def hsv(self):
+        return cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV)
+
+    @cached_property
+    def edges(self):
+        return cv2.Canny(self.gray, 50, 150)
+
+    @cached_property
+    def edge_density(self):
+        return np.sum(self.edges > 0) / (self.edges.shape[0] * self.edges.shape[1])
+
+def as_frame_context(frame):
+    """Wrap a bare frame array in a FrameContext (no-op if already wrapped)"""
+    return frame if isinstance(frame, FrameContext) else FrameContext(frame)
+
+def iter_comprehensive_frames(video_path, max_frames=20, scene_method='adaptive', scene_sensitivity=0.5, segments=1):
+    """Lazily yield regular-interval and scene-change frames for analysis"""
+    detector = create_scene_detector(scene_method, scene_sensitivity)
+    return iter_frames(video_path, max_frames=max_frames, size=(800, 600), scene_changes=True, scene_detector=detector,
+                       segments=segments)
+
+def extract_comprehensive_frames(video_path, max_frames=20, scene_method='adaptive', scene_sensitivity=0.5):
     """Extract more frames for detailed visual analysis"""
-    try:
-        cap = cv2.VideoCapture(video_path)
-
-        if not cap.isOpened():
-            return []
-
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        duration = total_frames / fps
-
-        # Extract frames at regular intervals + scene changes
-        frames_data = []
-
-        # Method 1: Regular intervals
-        interval = max(1, total_frames // max_frames)
+    return list(iter_comprehensive_frames(video_path, max_frames, scene_method, scene_sensitivity))
 
-        frame_count = 0
-        prev_frame = None
+def analyze_frame_with_gemini_free(frame, timestamp):
+    """Use Google Gemini free tier for frame analysis
 
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            # Resize frame for analysis
-            frame_resized = cv2.resize(frame, (800, 600))
-            timestamp = frame_count / fps if fps > 0 else 0
-
-            # Add regular interval frames
-            if frame_count % interval == 0 and len(frames_data) < max_frames:
-                frames_data.append({
-                    'frame': frame_resized,
-                    'timestamp': timestamp,
-                    'frame_number': frame_count,
-                    'type': 'regular'
-                })
-
-            # Detect scene changes (significant visual differences)
-            if prev_frame is not None and len(frames_data) < max_frames:
-                # Calculate frame difference
-                diff = cv2.absdiff(cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY), 
-                                 cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY))
-                change_percentage = np.sum(diff > 30) / (diff.shape[0] * diff.shape[1])
-
-                # If significant change detected, add as scene change frame
-                if change_percentage > 0.3:  # 30% of pixels changed significantly
-                    frames_data.append({
-                        'frame': frame_resized,
-                        'timestamp': timestamp,
-                        'frame_number': frame_count,
-                        'type': 'scene_change',
-                        'change_percentage': change_percentage
-                    })
-
-            prev_frame = cv2.resize(frame, (800, 600))
-            frame_count += 1
-
-        cap.release()
-        return frames_data
-
-    except Exception as e:
-        print(f"Error extracting comprehensive frames: {e}")
-        return []
-
-def analyze_frame_with_gemini_free(frame_base64, timestamp):
-    """Use Google Gemini free tier for frame analysis"""
+    Takes the raw frame array; a real API call would encode it here with
+    frame_to_base64() right before sending.
+    """
     try:
         # This is a placeholder - you'd need actual Gemini API implementation
         # For now, we'll use local analysis as fallback
-        return analyze_frame_with_opencv_advanced(frame_base64, timestamp)
+        return analyze_frame_with_opencv_advanced(frame, timestamp)
 
     except Exception as e:
-        return analyze_frame_with_opencv_advanced(frame_base64, timestamp)
+        return analyze_frame_with_opencv_advanced(frame, timestamp)
+
+def analyze_frame_with_opencv_advanced(frame, timestamp, analyzers=None):
+    """Enhanced local OpenCV analysis for visual-only mode
 
-def analyze_frame_with_opencv_advanced(frame_base64, timestamp):
-    """Enhanced local OpenCV analysis for visual-only mode"""
+    Works on the decoded BGR array directly (no JPEG round-trip, so the
+    sharpness and noise metrics see the real pixels). A base64 string is
+    still accepted for older callers. analyzers is a list of ANALYZERS keys
+    to run; None runs all of them.
+    """
     try:
-        # Decode base64 back to image
-        img_data = base64.b64decode(frame_base64)
-        nparr = np.frombuffer(img_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        if isinstance(frame, str):
+            frame = base64_to_frame(frame)
 
-        # Enhanced visual analysis
+        # Enhanced visual analysis (grayscale/HSV/edges computed once)
         analysis = {}
+        ctx = FrameContext(frame)
 
-        # 1. Color Analysis
-        analysis['colors'] = analyze_colors(frame)
-
-        # 2. Object Detection (basic shapes)
-        analysis['shapes'] = detect_basic_shapes(frame)
-
-        # 3. Text Detection
-        analysis['text'] = detect_text_in_frame(frame)
-
-        # 4. Motion/Activity Analysis
-        analysis['activity'] = analyze_activity_level(frame)
-
-        # 5. Scene Classification
-        analysis['scene_type'] = classify_scene_advanced(frame)
-
-        # 6. Composition Analysis
-        analysis['composition'] = analyze_composition(frame)
-
-        # 7. Quality Assessment
-        analysis['quality'] = assess_frame_quality(frame)
+        for name in (ANALYZERS if analyzers is None else analyzers):
+            analysis[name] = ANALYZERS[name](ctx)
 
         return {
             'timestamp': timestamp,
@@ -133,14 +108,8 @@ def analyze_frame_with_opencv_advanced(frame_base64, timestamp):
 def analyze_colors(frame):
     """Analyze color distribution and dominant colors"""
     try:
-        # Convert to different color spaces
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-
-        # Calculate color histograms
-        hist_b = cv2.calcHist([frame], [0], None, [256], [0, 256])
-        hist_g = cv2.calcHist([frame], [1], None, [256], [0, 256])
-        hist_r = cv2.calcHist([frame], [2], None, [256], [0, 256])
+        ctx = as_frame_context(frame)
+        frame, hsv = ctx.frame, ctx.hsv
 
         # Dominant colors
         avg_b, avg_g, avg_r = np.mean(frame, axis=(0, 1))
@@ -164,10 +133,10 @@ def analyze_colors(frame):
 def detect_basic_shapes(frame):
     """Detect basic geometric shapes and patterns"""
     try:
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        ctx = as_frame_context(frame)
 
         # Edge detection
-        edges = cv2.Canny(gray, 50, 150)
+        edges = ctx.edges
 
         # Find contours
         contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -177,7 +146,7 @@ def detect_basic_shapes(frame):
             'circles': 0,
             'triangles': 0,
             'total_objects': len(contours),
-            'edge_density': np.sum(edges > 0) / (edges.shape[0] * edges.shape[1])
+            'edge_density': ctx.edge_density
         }
 
         # Classify shapes
@@ -207,7 +176,7 @@ def detect_basic_shapes(frame):
 def detect_text_in_frame(frame):
     """Detect text using basic image processing"""
     try:
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = as_frame_context(frame).gray
 
         # Simple text detection using morphological operations
         # Detect horizontal text regions
@@ -241,7 +210,7 @@ def detect_text_in_frame(frame):
 def analyze_activity_level(frame):
     """Analyze the activity/motion level in the frame"""
     try:
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = as_frame_context(frame).gray
 
         # Calculate image gradients to detect motion/activity
         grad_x = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
@@ -272,7 +241,8 @@ def classify_scene_advanced(frame):
     """Advanced scene classification"""
     try:
         # Analyze various visual features
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        ctx = as_frame_context(frame)
+        gray = ctx.gray
 
         # Brightness analysis
         brightness = np.mean(gray)
@@ -281,11 +251,10 @@ def classify_scene_advanced(frame):
         contrast = np.std(gray)
 
         # Edge density
-        edges = cv2.Canny(gray, 50, 150)
-        edge_density = np.sum(edges > 0) / (edges.shape[0] * edges.shape[1])
+        edge_density = ctx.edge_density
 
         # Color diversity
-        colors = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        colors = ctx.hsv
         color_diversity = np.std(colors[:, :, 1])  # Saturation std
 
         # Scene classification logic
@@ -322,6 +291,7 @@ def classify_scene_advanced(frame):
 def analyze_composition(frame):
     """Analyze visual composition of the frame"""
     try:
+        frame = as_frame_context(frame).frame
         h, w = frame.shape[:2]
 
         # Rule of thirds analysis
@@ -368,7 +338,7 @@ def analyze_composition(frame):
 def assess_frame_quality(frame):
     """Assess technical quality of the frame"""
     try:
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = as_frame_context(frame).gray
 
         # Sharpness (using Laplacian variance)
         sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
@@ -404,6 +374,17 @@ def assess_frame_quality(frame):
     except Exception as e:
         return {'error': str(e)}
 
+# Analyzer registry: visual_elements key -> analyzer, in execution order
+ANALYZERS = {
+    'colors': analyze_colors,                 # 1. Color Analysis
+    'shapes': detect_basic_shapes,            # 2. Object Detection (basic shapes)
+    'text': detect_text_in_frame,             # 3. Text Detection
+    'activity': analyze_activity_level,       # 4. Motion/Activity Analysis
+    'scene_type': classify_scene_advanced,    # 5. Scene Classification
+    'composition': analyze_composition,       # 6. Composition Analysis
+    'quality': assess_frame_quality,          # 7. Quality Assessment
+}
+
 def frame_to_base64(frame):
     """Convert frame to base64 for API calls"""
     try:
@@ -414,27 +395,40 @@ def frame_to_base64(frame):
         print(f"Error converting frame to base64: {e}")
         return None
 
-def analyze_frames(frames_data):
-    """Main function to analyze all extracted frames for visual-only mode"""
+def base64_to_frame(frame_base64):
+    """Decode a base64 JPEG back into a BGR array"""
+    img_data = base64.b64decode(frame_base64)
+    nparr = np.frombuffer(img_data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def analyze_frames(frames_data, analyzers=None, workers=1, on_frame=None, aggregator=None):
+    """Main function to analyze all extracted frames for visual-only mode
+
+    frames_data can be a list or a lazy frame source such as
+    iter_comprehensive_frames(); frames are analyzed as they arrive.
+    analyzers limits the per-frame work to those ANALYZERS keys. With
+    workers > 1 frames are spread across a process pool; results keep the
+    input order, so the aggregate is identical to the serial mode.
+    on_frame(index, analysis) is called as each frame's result is ready.
+    Frames are folded into a VisualAggregator as they arrive (pass one in
+    to take partial snapshots from on_frame) and not kept afterwards.
+    """
     try:
-        if not frames_data:
-            return {"error": "No frames to analyze"}
-
-        frame_analyses = []
-
-        for i, frame_info in enumerate(frames_data):
-            print(f"Analyzing frame {i+1}/{len(frames_data)} at {frame_info['timestamp']:.2f}s...")
+        aggregator = aggregator or VisualAggregator()
+
+        if workers and workers > 1:
+            if __package__:
+                from .parallel_analysis import analyze_frames_parallel
+            else:
+                from parallel_analysis import analyze_frames_parallel
+            results = analyze_frames_parallel(frames_data, analyzers, workers)
+        else:
+            results = ((frame_info, analyze_frame_with_opencv_advanced(frame_info['frame'], frame_info['timestamp'], analyzers))
+                       for frame_info in frames_data)
 
-            frame = frame_info['frame']
+        for i, (frame_info, analysis) in enumerate(results):
             timestamp = frame_info['timestamp']
-
-            # Convert frame to base64
-            frame_base64 = frame_to_base64(frame)
-            if not frame_base64:
-                continue
-
-            # Perform comprehensive visual analysis
-            analysis = analyze_frame_with_opencv_advanced(frame_base64, timestamp)
+            print(f"Analyzed frame {i+1} at {timestamp:.2f}s")
 
             # Add frame metadata
             analysis['frame_metadata'] = {
@@ -446,97 +440,142 @@ def analyze_frames(frames_data):
             if 'change_percentage' in frame_info:
                 analysis['frame_metadata']['scene_change_intensity'] = frame_info['change_percentage']
 
-            frame_analyses.append(analysis)
+            aggregator.add(analysis)
 
-            # Small delay to prevent overwhelming the system
-            time.sleep(0.1)
+            if on_frame:
+                on_frame(i, analysis)
+
+        if aggregator.total_frames == 0:
+            return {"error": "No frames to analyze"}
 
         # Aggregate analysis across all frames
-        return aggregate_visual_analysis(frame_analyses)
+        return aggregator.snapshot()
 
     except Exception as e:
         return {"error": f"Frame analysis failed: {e}"}
 
-def aggregate_visual_analysis(frame_analyses):
-    """Combine analysis from all frames into comprehensive visual summary"""
-    try:
-        # Collect data from all frames
-        all_scene_types = []
-        all_colors = []
-        activity_levels = []
-        quality_scores = []
-        composition_data = []
-        text_detections = []
+def build_timeline_event(analysis):
+    """Compact timeline entry for one analyzed frame (None if analysis failed)"""
+    if 'error' in analysis or 'visual_elements' not in analysis:
+        return None
 
-        timeline_events = []
+    elements = analysis['visual_elements']
+    timestamp = analysis['timestamp']
+
+    return {
+        'timestamp': timestamp,
+        'timestamp_formatted': format_timestamp(timestamp),
+        'scene_type': elements.get('scene_type', {}).get('scene_type', 'unknown'),
+        'activity_level': elements.get('activity', {}).get('activity_level', 'unknown'),
+        'quality_rating': elements.get('quality', {}).get('quality_rating', 'unknown'),
+        'has_text': elements.get('text', {}).get('likely_contains_text', False),
+        'frame_type': analysis.get('frame_metadata', {}).get('type', 'regular')
+    }
+
+class VisualAggregator:
+    """Incremental aggregate of per-frame analyses
+
+    add() folds one frame into running counters and a running quality
+    mean and keeps only its compact timeline entry, so the full per-frame
+    dicts (region brightness, text regions, ...) can be dropped as soon as
+    they are added. snapshot() can be called at any point for a partial
+    summary; after the last frame it equals aggregate_visual_analysis().
+    """
+
+    def __init__(self):
+        self.total_frames = 0
+        self.scene_types = Counter()
+        self.color_schemes = Counter()
+        self.activity_levels = Counter()
+        self.quality_count = 0
+        self.quality_mean = 0.0
+        self.composition_balance = Counter()
+        self.focus_areas = Counter()
+        self.symmetry_mean = 0.0
+        self.text_frames = 0
+        self.text_timestamps = []
+        self.timeline_events = []
+
+    def add(self, analysis):
+        """Fold one frame's analysis into the aggregate"""
+        self.total_frames += 1
+
+        if 'error' in analysis or 'visual_elements' not in analysis:
+            return
+
+        elements = analysis['visual_elements']
+
+        scene_info = elements.get('scene_type', {})
+        if 'scene_type' in scene_info:
+            self.scene_types[scene_info['scene_type']] += 1
+
+        color_info = elements.get('colors', {})
+        if 'dominant_rgb' in color_info:
+            self.color_schemes[color_info['color_scheme']] += 1
+
+        activity_info = elements.get('activity', {})
+        if 'activity_level' in activity_info:
+            self.activity_levels[activity_info['activity_level']] += 1
+
+        quality_info = elements.get('quality', {})
+        if 'overall_quality' in quality_info:
+            self.quality_count += 1
+            self.quality_mean += (quality_info['overall_quality'] - self.quality_mean) / self.quality_count
+
+        # Only present when the summary asked for the composition analyzer
+        composition_info = elements.get('composition', {})
+        if 'symmetry_score' in composition_info:
+            self.composition_balance[composition_info['composition_balance']] += 1
+            self.focus_areas[composition_info['focus_area']] += 1
+            composition_count = sum(self.composition_balance.values())
+            self.symmetry_mean += (composition_info['symmetry_score'] - self.symmetry_mean) / composition_count
+
+        if elements.get('text', {}).get('likely_contains_text', False):
+            self.text_frames += 1
+            if len(self.text_timestamps) < 5:
+                self.text_timestamps.append(analysis['timestamp'])
+
+        self.timeline_events.append(build_timeline_event(analysis))
+
+    def composition_summary(self):
+        if not self.composition_balance:
+            return None
+        return {
+            'balance': dict(self.composition_balance.most_common()),
+            'focus_areas': dict(self.focus_areas.most_common(3)),
+            'average_symmetry': float(self.symmetry_mean)
+        }
 
-        for analysis in frame_analyses:
-            if 'error' not in analysis and 'visual_elements' in analysis:
-                elements = analysis['visual_elements']
-                timestamp = analysis['timestamp']
-
-                # Collect scene types
-                scene_info = elements.get('scene_type', {})
-                if 'scene_type' in scene_info:
-                    all_scene_types.append(scene_info['scene_type'])
-
-                # Collect color information
-                color_info = elements.get('colors', {})
-                if 'dominant_rgb' in color_info:
-                    all_colors.append(color_info['color_scheme'])
-
-                # Collect activity levels
-                activity_info = elements.get('activity', {})
-                if 'activity_level' in activity_info:
-                    activity_levels.append(activity_info['activity_level'])
-
-                # Collect quality scores
-                quality_info = elements.get('quality', {})
-                if 'overall_quality' in quality_info:
-                    quality_scores.append(quality_info['overall_quality'])
-
-                # Collect text detection
-                text_info = elements.get('text', {})
-                if text_info.get('likely_contains_text', False):
-                    text_detections.append(timestamp)
-
-                # Create timeline events
-                timeline_events.append({
-                    'timestamp': timestamp,
-                    'timestamp_formatted': format_timestamp(timestamp),
-                    'scene_type': scene_info.get('scene_type', 'unknown'),
-                    'activity_level': activity_info.get('activity_level', 'unknown'),
-                    'quality_rating': quality_info.get('quality_rating', 'unknown'),
-                    'has_text': text_info.get('likely_contains_text', False),
-                    'frame_type': analysis.get('frame_metadata', {}).get('type', 'regular')
-                })
+    def snapshot(self):
+        """Summary of the frames added so far"""
+        try:
+            return {
+                'total_frames_analyzed': self.total_frames,
+                'video_characteristics': {
+                    'dominant_scene_types': dict(self.scene_types.most_common(3)),
+                    'color_schemes': dict(self.color_schemes.most_common(3)),
+                    'activity_levels': dict(self.activity_levels.most_common()),
+                    'average_quality_score': float(self.quality_mean),
+                    'text_presence': self.text_frames > 0,
+                    'text_timestamps': list(self.text_timestamps),  # First 5 text occurrences
+                    'composition': self.composition_summary()
+                },
+                'timeline_analysis': list(self.timeline_events),
+                'scene_changes': [event for event in self.timeline_events if event['frame_type'] == 'scene_change'],
+                'visual_summary': create_visual_narrative(self.scene_types, self.activity_levels, self.color_schemes, self.quality_mean),
+                'key_moments': identify_key_visual_moments(self.timeline_events)
+            }
 
-        # Calculate statistics
-        from collections import Counter
-        scene_distribution = Counter(all_scene_types)
-        color_distribution = Counter(all_colors)
-        activity_distribution = Counter(activity_levels)
-
-        avg_quality = np.mean(quality_scores) if quality_scores else 0
-
-        # Create comprehensive summary
-        summary = {
-            'total_frames_analyzed': len(frame_analyses),
-            'video_characteristics': {
-                'dominant_scene_types': dict(scene_distribution.most_common(3)),
-                'color_schemes': dict(color_distribution.most_common(3)),
-                'activity_levels': dict(activity_distribution.most_common()),
-                'average_quality_score': float(avg_quality),
-                'text_presence': len(text_detections) > 0,
-                'text_timestamps': text_detections[:5]  # First 5 text occurrences
-            },
-            'timeline_analysis': timeline_events,
-            'scene_changes': [event for event in timeline_events if event['frame_type'] == 'scene_change'],
-            'visual_summary': create_visual_narrative(scene_distribution, activity_distribution, color_distribution, avg_quality),
-            'key_moments': identify_key_visual_moments(timeline_events)
-        }
+        except Exception as e:
+            return {"error": f"Analysis aggregation failed: {e}"}
 
-        return summary
+def aggregate_visual_analysis(frame_analyses):
+    """Combine analysis from all frames into comprehensive visual summary"""
+    try:
+        aggregator = VisualAggregator()
+        for analysis in frame_analyses:
+            aggregator.add(analysis)
+        return aggregator.snapshot()
 
     except Exception as e:
         return {"error": f"Analysis aggregation failed: {e}"}
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+import cv2
+if __package__:
+    from .enhanced_visual_analysis import analyze_frame_with_opencv_advanced, format_timestamp
+    from .result_cache import to_json_value
+    from .media_probe import get_media_info
+    from .keyframe_index import load_keyframe_index, preceding_keyframe
+else:
+    from enhanced_visual_analysis import analyze_frame_with_opencv_advanced, format_timestamp
+    from result_cache import to_json_value
+    from media_probe import get_media_info
+    from keyframe_index import load_keyframe_index, preceding_keyframe
+
+# OpenCV's seek to frame N starts decoding at the keyframe before N - 16
+OPENCV_SEEK_BACKOFF = 16
+
+class OpenCapture:
+    """An open VideoCapture plus the index of the frame its next read() returns
+
+    keyframes (sorted frame numbers, or None when unknown) come from the
+    index stored beside the upload, else from the media probe. users counts
+    the requests that have it checked out; an evicted capture is only
+    released once the last of them returns it.
+    """
+
+    def __init__(self, video_path, keyframes=None):
+        self.cap = cv2.VideoCapture(video_path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.keyframes = keyframes
+        self.position = 0
+        self.users = 0
+        self.evicted = False
+        self.lock = threading.Lock()
+
+    def seek_start(self, frame_number):
+        """Frame a seek to frame_number starts decoding from"""
+        return preceding_keyframe(self.keyframes, max(0, frame_number - OPENCV_SEEK_BACKOFF))
+
+    def release(self):
+        with self.lock:
+            self.cap.release()
+
+class FrameServer:
+    """Serves single frames (and their analysis) from a pool of open captures
+
+    Up to max_captures videos stay open (least recently used is closed
+    first). With a keyframe index a frame is decoded forward from the
+    capture's current position whenever that is no more work than a seek
+    (which decodes from the preceding keyframe), so every read costs at
+    most one GOP of decoding wherever it is in the file. Without an index a
+    frame up to max_forward_frames ahead is decoded forward instead of
+    seeking. Analyses of recently requested frames are kept in an LRU of
+    cache_size entries.
+    """
+
+    def __init__(self, max_captures=4, max_forward_frames=90, cache_size=256):
+        self.max_captures = max_captures
+        self.max_forward_frames = max_forward_frames
+        self.cache_size = cache_size
+        self.captures = OrderedDict()
+        self.analyses = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats_counters = {'seeks': 0, 'forward_decodes': 0, 'analysis_hits': 0, 'analysis_misses': 0,
+                               'frame_reads': 0, 'read_seconds': 0.0, 'max_read_seconds': 0.0}
+
+    def _video_key(self, video_path):
+        # A replaced file under the same name gets a new key (and capture)
+        stat = os.stat(video_path)
+        return (os.path.abspath(video_path), stat.st_mtime_ns, stat.st_size)
+
+    def _load_keyframes(self, video_path):
+        index = load_keyframe_index(video_path)
+        if index is not None:
+            return index['keyframes']
+
+        info = get_media_info(video_path)
+        return info.keyframes if info else None
+
+    def _evict(self, capture, releasable):
+        # Caller holds self.lock and releases `releasable` after letting go of it
+        capture.evicted = True
+        if capture.users == 0:
+            releasable.append(capture)
+
+    @contextmanager
+    def _checkout(self, video_path):
+        """Borrow the open capture for a video as (key, capture); capture is None if it cannot be opened"""
+        key = self._video_key(video_path)
+        capture = None
+        releasable = []
+
+        with self.lock:
+            if key in self.captures:
+                self.captures.move_to_end(key)
+                capture = self.captures[key]
+                capture.users += 1
+
+        if capture is None:
+            # Outside the lock: the probe fallback may have to hash the file
+            keyframes = self._load_keyframes(video_path)
+            opened = OpenCapture(video_path, keyframes)
+
+            with self.lock:
+                if key in self.captures:
+                    capture = self.captures[key]
+                    releasable.append(opened)
+                elif opened.cap.isOpened():
+                    capture = opened
+                    self.captures[key] = capture
+                    while len(self.captures) > self.max_captures:
+                        _, oldest = self.captures.popitem(last=False)
+                        self._evict(oldest, releasable)
+                else:
+                    releasable.append(opened)
+
+                if capture is not None:
+                    capture.users += 1
+
+            for unused in releasable:
+                unused.release()
+            releasable = []
+
+        try:
+            yield key, capture
+        finally:
+            if capture is not None:
+                with self.lock:
+                    capture.users -= 1
+                    if capture.evicted and capture.users == 0:
+                        releasable.append(capture)
+                for unused in releasable:
+                    unused.release()
+
+    def _read_frame(self, capture, frame_number):
+        """Read one frame, decoding forward from the current position when that is cheaper"""
+        with capture.lock:
+            started = time.perf_counter()
+            distance = frame_number - capture.position
+
+            if capture.keyframes:
+                forward = distance >= 0 and capture.position >= capture.seek_start(frame_number)
+            else:
+                forward = 0 <= distance <= self.max_forward_frames
+
+            if forward:
+                for _ in range(distance):
+                    if not capture.cap.grab():
+                        capture.position = capture.frame_count
+                        return None
+            else:
+                capture.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+
+            ret, frame = capture.cap.read()
+            capture.position = frame_number + 1 if ret else capture.frame_count
+            elapsed = time.perf_counter() - started
+
+        with self.lock:
+            self.stats_counters['forward_decodes' if forward else 'seeks'] += 1
+            self.stats_counters['frame_reads'] += 1
+            self.stats_counters['read_seconds'] += elapsed
+            self.stats_counters['max_read_seconds'] = max(self.stats_counters['max_read_seconds'], elapsed)
+        return frame if ret else None
+
+    def get_frame(self, video_path, timestamp):
+        """(frame, frame_number) at a timestamp, or (None, frame_number) past the end"""
+        with self._checkout(video_path) as (_, capture):
+            if capture is None:
+                raise ValueError('Cannot open video file')
+
+            frame_number = int(timestamp * capture.fps)
+            return self._read_frame(capture, frame_number), frame_number
+
+    def analyze_timestamps(self, video_path, timestamps, analyzers=None, size=(800, 600)):
+        """Analyze the frames at several timestamps in one pass over the video
+
+        Timestamps are decoded in ascending order, so a batch costs at most
+        one seek plus forward decoding between neighbours. Returns one dict
+        per requested timestamp, in request order: 'timestamp',
+        'frame_number' and 'analysis' (or 'error').
+        """
+        with self._checkout(video_path) as (key, capture):
+            if capture is None:
+                raise ValueError('Cannot open video file')
+
+            results = {}
+            for timestamp in sorted(set(timestamps)):
+                frame_number = int(timestamp * capture.fps)
+                cache_key = (key, frame_number, tuple(size), tuple(analyzers) if analyzers else None)
+
+                with self.lock:
+                    analysis = self.analyses.get(cache_key)
+                    if analysis is not None:
+                        self.analyses.move_to_end(cache_key)
+                        self.stats_counters['analysis_hits'] += 1
+
+                if analysis is None:
+                    frame = self._read_frame(capture, frame_number)
+                    if frame is None:
+                        results[timestamp] = {'timestamp': timestamp, 'frame_number': frame_number,
+                                              'error': 'Cannot extract frame at specified timestamp'}
+                        continue
+
+                    analysis = analyze_frame_with_opencv_advanced(cv2.resize(frame, size), timestamp, analyzers)
+                    analysis['frame_metadata'] = {
+                        'frame_number': frame_number,
+                        'type': 'user_requested',
+                        'timestamp_formatted': format_timestamp(timestamp)
+                    }
+
+                    # Plain JSON types (no numpy scalars) so results can go straight to jsonify
+                    analysis = json.loads(json.dumps(analysis, default=to_json_value))
+
+                    with self.lock:
+                        self.stats_counters['analysis_misses'] += 1
+                        self.analyses[cache_key] = analysis
+                        while len(self.analyses) > self.cache_size:
+                            self.analyses.popitem(last=False)
+
+                results[timestamp] = {'timestamp': timestamp, 'frame_number': frame_number, 'analysis': analysis}
+
+        return [results[timestamp] for timestamp in timestamps]
+
+    def close(self, video_path=None):
+        """Release the captures for one video (all versions), or every capture"""
+        path = os.path.abspath(video_path) if video_path else None
+        releasable = []
+        with self.lock:
+            for key in list(self.captures):
+                if path is None or key[0] == path:
+                    self._evict(self.captures.pop(key), releasable)
+
+        # Captures still being read are released when they are returned
+        for capture in releasable:
+            capture.release()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.stats_counters, open_captures=len(self.captures), cached_analyses=len(self.analyses))
+
+        # Frame read (seek or forward decode) latency
+        read_seconds = stats.pop('read_seconds')
+        stats['avg_read_ms'] = round(read_seconds / stats['frame_reads'] * 1000, 2) if stats['frame_reads'] else 0.0
+        stats['max_read_ms'] = round(stats.pop('max_read_seconds') * 1000, 2)
+        return stats
@@ -0,0 +1,222 @@
+import json
+import time
+import uuid
+import queue
+import bisect
+import threading
+from datetime import datetime
+if __package__:
+    from .result_cache import to_json_value
+else:
+    from result_cache import to_json_value
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when max_queue_depth jobs are already waiting"""
+
+# Events after which a job's event stream ends
+TERMINAL_EVENTS = ('completed', 'failed')
+
+# Bulky per-frame events only worth replaying while the job runs; once it
+# finishes the result carries the same data, so they are dropped from the log
+LIVE_ONLY_EVENTS = ('frame', 'partial_summary')
+
+class Job:
+    """One queued pipeline run with per-stage status, progress and an event log
+
+    Every stage transition and progress update is also appended to
+    job.events, which iter_events() replays and then follows live, so a
+    client can subscribe at any point (or reconnect) without missing events.
+    When the job finishes, LIVE_ONLY_EVENTS are dropped from the log (event
+    ids stay as they were).
+    """
+
+    def __init__(self, func, params, stages):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.params = params
+        self.status = 'queued'
+        self.stages = {name: {'status': 'pending', 'progress': 0.0} for name in stages}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self.last_event_id = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def _publish(self, event, data):
+        # Caller holds self.lock
+        self.last_event_id += 1
+        self.events.append({'id': self.last_event_id, 'event': event, 'data': data})
+        self.changed.notify_all()
+
+    def _compact(self):
+        # Caller holds self.lock
+        self.events = [event for event in self.events if event['event'] not in LIVE_ONLY_EVENTS]
+
+    def publish(self, event, data):
+        """Append an event (e.g. a per-frame result) to the job's stream"""
+        with self.lock:
+            self._publish(event, data)
+
+    def start_stage(self, name):
+        with self.lock:
+            self.stages.setdefault(name, {})
+            self.stages[name].update({'status': 'running', 'progress': 0.0})
+            self._publish('stage', dict(self.stages[name], stage=name))
+
+    def update_stage(self, name, progress, **details):
+        """Record progress (0.0 - 1.0) and any extra counters for a running stage"""
+        with self.lock:
+            stage = self.stages.setdefault(name, {'status': 'running'})
+            stage['progress'] = round(min(1.0, max(0.0, progress)), 3)
+            stage.update(details)
+            self._publish('progress', dict(stage, stage=name))
+
+    def finish_stage(self, name, **details):
+        with self.lock:
+            stage = self.stages.setdefault(name, {})
+            stage.update({'status': 'completed', 'progress': 1.0})
+            stage.update(details)
+            self._publish('stage', dict(stage, stage=name))
+
+    def iter_events(self, last_event_id=0, keepalive=15):
+        """Yield events after last_event_id as they are published
+
+        Yields None when nothing happened for `keepalive` seconds (so the
+        caller can keep the connection open) and stops after the job's
+        completed/failed event.
+        """
+        position = last_event_id
+        while True:
+            with self.lock:
+                if position >= self.last_event_id:
+                    self.changed.wait(keepalive)
+                new_events = self.events[bisect.bisect_right(self.events, position, key=lambda event: event['id']):]
+                position = self.last_event_id
+
+            if not new_events:
+                yield None
+            for event in new_events:
+                yield event
+                if event['event'] in TERMINAL_EVENTS:
+                    return
+
+    def to_dict(self, include_result=True):
+        with self.lock:
+            job = {
+                'job_id': self.id,
+                'status': self.status,
+                'stages': {name: dict(stage) for name, stage in self.stages.items()},
+                'created_at': datetime.fromtimestamp(self.created_at).isoformat(),
+                'started_at': datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+                'finished_at': datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None
+            }
+            if self.error:
+                job['error'] = self.error
+            if include_result and self.result is not None:
+                job['result'] = self.result
+            return job
+
+class JobQueue:
+    """In-process job queue served by a fixed pool of worker threads
+
+    At most max_workers jobs run at once and at most max_queue_depth wait
+    behind them; further submissions raise QueueFullError so callers can
+    answer 503 instead of piling up work. Finished jobs are kept for
+    result_ttl seconds so clients can poll for the result.
+    """
+
+    def __init__(self, max_workers=2, max_queue_depth=16, result_ttl=3600):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.result_ttl = result_ttl
+        self.pending = queue.Queue(maxsize=max_queue_depth)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.workers = []
+
+    def _start_workers(self):
+        # Started on first submit so importing the app doesn't spawn threads
+        while len(self.workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f"job-worker-{len(self.workers)}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def _prune(self):
+        """Forget finished jobs older than result_ttl"""
+        cutoff = time.time() - self.result_ttl
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at and job.finished_at < cutoff:
+                del self.jobs[job_id]
+
+    def submit(self, func, params, stages=()):
+        """Queue func(job=job, **params) and return the Job without waiting for it"""
+        job = Job(func, params, stages)
+
+        with self.lock:
+            self._prune()
+            self._start_workers()
+            try:
+                self.pending.put_nowait(job)
+            except queue.Full:
+                raise QueueFullError(f"Job queue is full ({self.max_queue_depth} jobs waiting)")
+            self.jobs[job.id] = job
+
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _work(self):
+        while True:
+            job = self.pending.get()
+            with job.lock:
+                job.status = 'running'
+                job.started_at = time.time()
+
+            try:
+                result = job.func(job=job, **job.params)
+                error = result.get('error') if isinstance(result, dict) else None
+            except Exception as e:
+                result, error = None, str(e)
+
+            with job.lock:
+                if error:
+                    job.status = 'failed'
+                    job.error = error
+                    for stage in job.stages.values():
+                        if stage.get('status') == 'running':
+                            stage['status'] = 'failed'
+                    job._publish('failed', {'job_id': job.id, 'error': error})
+                else:
+                    job.status = 'completed'
+                    job.result = result
+                    job._publish('completed', {'job_id': job.id, 'result': result})
+                job._compact()
+                job.finished_at = time.time()
+
+            print(f"Job {job.id} {job.status} in {job.finished_at - job.started_at:.1f}s")
+            self.pending.task_done()
+
+    def stats(self):
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            'max_workers': self.max_workers,
+            'max_queue_depth': self.max_queue_depth,
+            'queued': statuses.count('queued'),
+            'running': statuses.count('running'),
+            'completed': statuses.count('completed'),
+            'failed': statuses.count('failed')
+        }
+
+def format_sse(event):
+    """Server-Sent Events wire format for a job event (None -> keep-alive comment)"""
+    if event is None:
+        return ": keep-alive\n\n"
+    data = json.dumps(event['data'], default=to_json_value)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
@@ -0,0 +1,110 @@
+import os
+import re
+import json
+import bisect
+import tempfile
+import subprocess
+if __package__:
+    from .media_probe import get_media_info
+    from .video_processing import FFMPEG_BINARY
+else:
+    from media_probe import get_media_info
+    from video_processing import FFMPEG_BINARY
+
+# Stored next to the upload: <video>.keyframes.json
+KEYFRAME_INDEX_SUFFIX = '.keyframes.json'
+
+def keyframe_index_path(video_path):
+    return f"{video_path}{KEYFRAME_INDEX_SUFFIX}"
+
+def scan_keyframes(video_path, fps):
+    """Keyframe frame numbers from ffmpeg, decoding only the keyframes
+
+    Used for containers whose index the media probe cannot read (anything
+    but MP4/MOV). Returns None if ffmpeg is unavailable or fails.
+    """
+    try:
+        result = subprocess.run(
+            [FFMPEG_BINARY, '-nostdin', '-hide_banner', '-skip_frame', 'nokey', '-i', video_path,
+             '-map', '0:v:0', '-vf', 'showinfo', '-f', 'null', '-'],
+            capture_output=True, text=True, timeout=300
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Keyframe scan failed: {e}")
+        return None
+
+    if result.returncode != 0 or fps <= 0:
+        return None
+
+    times = [float(t) for t in re.findall(r'pts_time:\s*([-\d.]+)', result.stderr)]
+    if not times:
+        return None
+
+    # The first frame is a keyframe; its pts is the stream's start offset
+    start = min(times)
+    return sorted({round((t - start) * fps) for t in times})
+
+def build_keyframe_index(video_path, content_hash=None):
+    """Keyframe positions and timestamps of a video (from the media probe, else ffmpeg)"""
+    info = get_media_info(video_path, content_hash)
+    if info is None:
+        return None
+
+    keyframes = info.keyframes
+    if keyframes is None:
+        keyframes = scan_keyframes(video_path, info.fps)
+    if not keyframes:
+        return None
+
+    return {
+        'content_hash': info.content_hash,
+        'file_size': info.file_size,
+        'fps': info.fps,
+        'frame_count': info.frame_count,
+        'keyframes': list(keyframes),
+        'timestamps': [round(frame_number / info.fps, 6) for frame_number in keyframes] if info.fps > 0 else None
+    }
+
+def save_keyframe_index(video_path, content_hash=None):
+    """Build the index once (at upload) and store it beside the video; returns it or None"""
+    index = build_keyframe_index(video_path, content_hash)
+    if index is None:
+        return None
+
+    # A unique temp file per writer (deduplicated uploads of one video can
+    # save concurrently); named as a sidecar so the upload sweep removes strays
+    path = keyframe_index_path(video_path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return index
+
+def load_keyframe_index(video_path):
+    """The stored index for a video, or None if missing or stale (file size changed)"""
+    path = keyframe_index_path(video_path)
+    try:
+        with open(path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if index.get('file_size') != os.path.getsize(video_path):
+        return None
+    return index
+
+def remove_keyframe_index(video_path):
+    path = keyframe_index_path(video_path)
+    if os.path.exists(path):
+        os.remove(path)
+
+def preceding_keyframe(keyframes, frame_number):
+    """Last keyframe at or before frame_number (0 if there is none)"""
+    position = bisect.bisect_right(keyframes, frame_number)
+    return keyframes[position - 1] if position else 0
@@ -0,0 +1,232 @@
+import os
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, field
+from typing import List, Optional
+import cv2
+if __package__:
+    from .result_cache import file_content_hash
+    from .upload_store import sniff_container, SNIFF_BYTES
+else:
+    from result_cache import file_content_hash
+    from upload_store import sniff_container, SNIFF_BYTES
+
+# Probed files remembered per content hash
+PROBE_CACHE_SIZE = 256
+
+# Boxes on the path from the top level down to a track's sample tables
+MP4_CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+@dataclass
+class MediaInfo:
+    """Everything later stages need to know about a video, from one probe"""
+    content_hash: str
+    file_size: int
+    container: Optional[str]
+    codec: Optional[str]
+    fps: float
+    frame_count: int
+    width: int
+    height: int
+    duration: float
+    decodable: bool
+    has_audio: Optional[bool] = None  # None: container not parsed (not MP4/MOV)
+    keyframes: Optional[List[int]] = field(default=None, repr=False)  # Frame numbers of sync samples
+
+    def keyframe_timestamps(self):
+        if self.keyframes is None or self.fps <= 0:
+            return None
+        return [frame_number / self.fps for frame_number in self.keyframes]
+
+    def to_dict(self, include_keyframes=False):
+        info = asdict(self)
+        if not include_keyframes:
+            info.pop('keyframes')
+            info['keyframe_count'] = len(self.keyframes) if self.keyframes is not None else None
+        return info
+
+def _iter_boxes(f, start, end):
+    """(type, payload_start, box_end) of the ISO-BMFF boxes between two offsets"""
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        size, kind = struct.unpack('>I4s', f.read(8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size:
+            return
+
+        yield kind, position + header_size, min(position + size, end)
+        position += size
+
+def _read_track(f, start, end, track):
+    """Collect handler type, codec and sync samples of one trak box (recursive)"""
+    for kind, payload, box_end in _iter_boxes(f, start, end):
+        if kind in MP4_CONTAINER_BOXES:
+            _read_track(f, payload, box_end, track)
+        elif kind == b'hdlr':
+            f.seek(payload + 8)  # version/flags, pre_defined
+            track['handler'] = f.read(4)
+        elif kind == b'stsd':
+            f.seek(payload + 12)  # version/flags, entry count, first entry size
+            track['codec'] = f.read(4).decode('latin-1').strip()
+        elif kind == b'stss':
+            f.seek(payload + 4)
+            count = struct.unpack('>I', f.read(4))[0]
+            track['sync_samples'] = struct.unpack(f'>{count}I', f.read(4 * count))
+
+def read_mp4_tracks(video_path):
+    """Tracks of an MP4/MOV file from its box headers only (mdat is skipped, nothing is decoded)
+
+    Each track is a dict with 'handler' (b'vide', b'soun', ...), 'codec'
+    and 'sync_samples' (1-based sample numbers; missing when every sample
+    is a sync sample).
+    """
+    tracks = []
+    file_size = os.path.getsize(video_path)
+
+    with open(video_path, 'rb') as f:
+        for kind, payload, box_end in _iter_boxes(f, 0, file_size):
+            if kind != b'moov':
+                continue
+            for child, child_payload, child_end in _iter_boxes(f, payload, box_end):
+                if child == b'trak':
+                    track = {}
+                    _read_track(f, child_payload, child_end, track)
+                    tracks.append(track)
+
+    return tracks
+
+def sniff_file_container(video_path):
+    with open(video_path, 'rb') as f:
+        return sniff_container(f.read(SNIFF_BYTES))
+
+def fourcc_to_str(value):
+    text = int(value).to_bytes(4, 'little').decode('latin-1').strip('\x00 ')
+    return text or None
+
+class MediaProber:
+    """Opens each video once and remembers the result per content hash
+
+    Content hashes are also remembered per (path, mtime, size), so asking
+    again about an unchanged file costs neither a capture open nor a hash.
+    """
+
+    def __init__(self, cache_size=PROBE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.probes = OrderedDict()
+        self.hashes = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats_counters = {'hits': 0, 'misses': 0}
+
+    def _file_key(self, video_path):
+        stat = os.stat(video_path)
+        return (os.path.abspath(video_path), stat.st_mtime_ns, stat.st_size)
+
+    def _remember(self, cache, key, value):
+        # Caller holds self.lock
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def content_hash(self, video_path, known_hash=None):
+        """Content hash of a file, hashing it only the first time it is seen"""
+        key = self._file_key(video_path)
+        with self.lock:
+            if known_hash is None:
+                known_hash = self.hashes.get(key)
+            if known_hash is not None:
+                self._remember(self.hashes, key, known_hash)
+                return known_hash
+
+        content_hash = file_content_hash(video_path)
+        with self.lock:
+            self._remember(self.hashes, key, content_hash)
+        return content_hash
+
+    def probe(self, video_path, content_hash=None):
+        """MediaInfo for a video, or None when OpenCV cannot open it"""
+        content_hash = self.content_hash(video_path, content_hash)
+
+        with self.lock:
+            info = self.probes.get(content_hash)
+            if info is not None:
+                self.probes.move_to_end(content_hash)
+                self.stats_counters['hits'] += 1
+                return info
+            self.stats_counters['misses'] += 1
+
+        info = probe_media(video_path, content_hash)
+        if info is not None:
+            with self.lock:
+                self._remember(self.probes, content_hash, info)
+        return info
+
+    def stats(self):
+        with self.lock:
+            return dict(self.stats_counters, probed_files=len(self.probes))
+
+def probe_media(video_path, content_hash):
+    """Probe a video with a single capture open (plus a header-only read of MP4/MOV boxes)"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        codec = fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC))
+
+        # A video that opens but yields no frame is corrupted
+        decodable, _ = cap.read()
+    finally:
+        cap.release()
+
+    info = MediaInfo(
+        content_hash=content_hash,
+        file_size=os.path.getsize(video_path),
+        container=sniff_file_container(video_path),
+        codec=codec,
+        fps=fps,
+        frame_count=frame_count,
+        width=width,
+        height=height,
+        duration=frame_count / fps if fps > 0 else 0,
+        decodable=bool(decodable)
+    )
+
+    if info.container in ('mp4', 'mov'):
+        try:
+            tracks = read_mp4_tracks(video_path)
+        except (OSError, struct.error) as e:
+            print(f"Error reading MP4 boxes: {e}")
+            return info
+
+        info.has_audio = any(track.get('handler') == b'soun' for track in tracks)
+        video_track = next((track for track in tracks if track.get('handler') == b'vide'), None)
+        if video_track:
+            info.codec = video_track.get('codec') or info.codec
+            sync_samples = video_track.get('sync_samples')
+            # No stss box: every sample is a keyframe
+            info.keyframes = ([sample - 1 for sample in sync_samples] if sync_samples is not None
+                              else list(range(frame_count)))
+
+    return info
+
+# Shared by every stage in the process
+media_prober = MediaProber()
+
+def get_media_info(video_path, content_hash=None):
+    """Memoized MediaInfo for a video (see MediaProber)"""
+    return media_prober.probe(video_path, content_hash)
+
+def get_content_hash(video_path, known_hash=None):
+    return media_prober.content_hash(video_path, known_hash)
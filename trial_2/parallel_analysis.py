@@ -0,0 +1,112 @@
+import os
+import cv2
+import numpy as np
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+if __package__:
+    from .enhanced_visual_analysis import analyze_frame_with_opencv_advanced
+else:
+    from enhanced_visual_analysis import analyze_frame_with_opencv_advanced
+
+# One pool per worker count, reused across requests (process start-up is slow)
+_pools = {}
+_pools_lock = threading.Lock()
+
+def init_worker():
+    """Keep OpenCV single-threaded inside each pool process"""
+    cv2.setNumThreads(1)
+
+def get_analysis_pool(workers):
+    """Return the shared process pool for this worker count"""
+    with _pools_lock:
+        if workers not in _pools:
+            # spawn avoids forking the threaded Flask server
+            context = multiprocessing.get_context('spawn')
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker)
+        return _pools[workers]
+
+def shutdown_analysis_pools():
+    """Stop all pool processes (used on server shutdown and in scripts)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+        _pools.clear()
+
+def get_default_workers():
+    """Worker count from ANALYSIS_WORKERS, defaulting to all cores"""
+    return int(os.environ.get('ANALYSIS_WORKERS', os.cpu_count() or 1))
+
+def analyze_shared_frame(shm_name, shape, dtype, timestamp, analyzers):
+    """Worker: analyze a frame that lives in a shared memory block"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        analysis = analyze_frame_with_opencv_advanced(frame, timestamp, analyzers)
+        del frame
+        return analysis
+    finally:
+        shm.close()
+
+def frame_to_shared_memory(frame):
+    """Copy a frame into a new shared memory block"""
+    shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+    np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)[:] = frame
+    return shm
+
+def release_shared_memory(shm):
+    """Free a block created by frame_to_shared_memory"""
+    shm.close()
+    shm.unlink()
+
+def analyze_frames_parallel(frames_data, analyzers=None, workers=None):
+    """Analyze frames across a process pool, yielding results in input order
+
+    Frames are handed to workers through shared memory instead of being
+    pickled. At most 2 * workers frames are in flight, so a lazy frame
+    source is still consumed a few frames at a time. Yields
+    (frame_info, analysis) pairs in the same order as frames_data.
+    """
+    workers = workers or get_default_workers()
+    pool = get_analysis_pool(workers)
+    pending = deque()
+
+    def collect_oldest():
+        frame_info, shm, future = pending.popleft()
+        try:
+            return frame_info, future.result()
+        finally:
+            release_shared_memory(shm)
+
+    try:
+        for frame_info in frames_data:
+            frame = frame_info['frame']
+            shm = frame_to_shared_memory(frame)
+
+            try:
+                future = pool.submit(analyze_shared_frame, shm.name, frame.shape, frame.dtype.str,
+                                     frame_info['timestamp'], analyzers)
+            except Exception:
+                release_shared_memory(shm)
+                raise
+
+            pending.append((frame_info, shm, future))
+
+            if len(pending) >= 2 * workers:
+                yield collect_oldest()
+
+        while pending:
+            yield collect_oldest()
+
+    finally:
+        # Consumer stopped early or a worker failed: free remaining blocks
+        while pending:
+            frame_info, shm, future = pending.popleft()
+            future.cancel()
+            try:
+                future.exception()
+            except Exception:
+                pass
+            release_shared_memory(shm)
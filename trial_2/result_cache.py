@@ -0,0 +1,206 @@
+import os
+import json
+import shutil
+import time
+import hashlib
+import threading
+
+def file_content_hash(file_path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's content (same bytes -> same hash, whatever the name)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def make_cache_key(content_hash, **params):
+    """Cache key for a content hash plus the parameters that shape the result"""
+    payload = json.dumps({'content': content_hash, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def to_json_value(value):
+    """json.dump fallback for numpy scalars and other stragglers"""
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+class ResultCache:
+    """Content-addressed on-disk cache for pipeline stage results
+
+    Entries live at <cache_dir>/<stage>/<key>.json so each stage (transcript,
+    visual analysis, summary) is stored and looked up separately; binary
+    artifacts (e.g. sprite sheet images) go through set_file/get_file. The cache
+    is bounded by total size (least recently used entries are evicted first)
+    and entries older than ttl_seconds are treated as misses and removed.
+    """
+
+    def __init__(self, cache_dir, max_bytes=500 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+
+        # path -> [size, created, last_access]
+        self.entries = {}
+        self.total_bytes = 0
+        self._scan()
+
+    def _scan(self):
+        """Rebuild the index from disk so the LRU survives restarts"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                self.entries[path] = [stat.st_size, stat.st_mtime, stat.st_atime]
+                self.total_bytes += stat.st_size
+
+    def _path(self, stage, key, ext='json'):
+        return os.path.join(self.cache_dir, stage, f"{key}.{ext}")
+
+    def _lookup(self, stage, path):
+        """Index entry for a live cache file, counting the hit or miss"""
+        entry = self.entries.get(path)
+        if entry and time.time() - entry[1] > self.ttl_seconds:
+            self._remove(path)
+            self.evictions += 1
+            entry = None
+
+        if entry is None:
+            self.misses[stage] = self.misses.get(stage, 0) + 1
+        return entry
+
+    def _write(self, path, data):
+        """Atomically write bytes and account for them (caller holds the lock)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._account(path, len(data))
+
+    def _account(self, path, size):
+        """Record a newly written entry and evict if over budget (caller holds the lock)"""
+        if path in self.entries:
+            self.total_bytes -= self.entries[path][0]
+
+        now = time.time()
+        self.entries[path] = [size, now, now]
+        self.total_bytes += size
+        self._evict()
+
+    def _remove(self, path):
+        size = self.entries.pop(path, [0])[0]
+        self.total_bytes -= size
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop expired entries, then least recently used until under max_bytes"""
+        now = time.time()
+        for path, (_, created, _) in list(self.entries.items()):
+            if now - created > self.ttl_seconds:
+                self._remove(path)
+                self.evictions += 1
+
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        for path in sorted(self.entries, key=lambda p: self.entries[p][2]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+            self.evictions += 1
+
+    def get(self, stage, key):
+        """Cached value for (stage, key), or None on a miss"""
+        path = self._path(stage, key)
+
+        with self.lock:
+            entry = self._lookup(stage, path)
+            if entry is None:
+                return None
+
+            try:
+                with open(path) as f:
+                    value = json.load(f)
+            except Exception as e:
+                print(f"Error reading cache entry {path}: {e}")
+                self._remove(path)
+                self.misses[stage] = self.misses.get(stage, 0) + 1
+                return None
+
+            entry[2] = time.time()
+            self.hits[stage] = self.hits.get(stage, 0) + 1
+            return value
+
+    def set(self, stage, key, value):
+        """Store a JSON-serializable value for (stage, key)"""
+        path = self._path(stage, key)
+
+        try:
+            data = json.dumps(value, default=to_json_value).encode('utf-8')
+        except Exception as e:
+            print(f"Error serializing cache entry for {stage}: {e}")
+            return
+
+        with self.lock:
+            self._write(path, data)
+
+    def get_file(self, stage, key, ext):
+        """Path of a cached binary artifact, or None on a miss"""
+        path = self._path(stage, key, ext)
+
+        with self.lock:
+            entry = self._lookup(stage, path)
+            if entry is None:
+                return None
+
+            entry[2] = time.time()
+            self.hits[stage] = self.hits.get(stage, 0) + 1
+            return path
+
+    def set_file(self, stage, key, data, ext):
+        """Store bytes (e.g. an encoded image) for (stage, key) and return the file path"""
+        path = self._path(stage, key, ext)
+
+        with self.lock:
+            self._write(path, data)
+        return path
+
+    def move_file(self, stage, key, source_path, ext):
+        """Move an existing file (e.g. a transcode output) into the cache and return its new path"""
+        path = self._path(stage, key, ext)
+
+        with self.lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            shutil.move(source_path, tmp_path)
+            os.replace(tmp_path, path)
+            self._account(path, os.path.getsize(path))
+        return path
+
+    def stats(self):
+        """Hit/miss counters per stage plus current size"""
+        with self.lock:
+            return {
+                'hits': dict(self.hits),
+                'misses': dict(self.misses),
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds
+            }
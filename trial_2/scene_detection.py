@@ -0,0 +1,148 @@
+import cv2
+import numpy as np
+from collections import deque
+
+# Every decoded frame is shrunk once to this size; detectors only see the thumbnail
+DETECTION_SIZE = (64, 36)
+
+class SceneDetector:
+    """Base scene-change detector working on tiny per-frame thumbnails
+
+    detect(frame, timestamp) returns the change score (0-1) when the frame
+    starts a new scene and None otherwise. sensitivity (0-1) moves the
+    threshold: higher finds more, subtler changes. At most max_changes
+    scene changes are reported per window_seconds, so flashing or strobing
+    content cannot flood the frame list.
+    """
+
+    def __init__(self, sensitivity=0.5, max_changes=3, window_seconds=10.0):
+        self.sensitivity = min(1.0, max(0.0, float(sensitivity)))
+        self.max_changes = max_changes
+        self.window_seconds = window_seconds
+        self.recent_changes = deque()
+        self.previous = None
+
+    def thumbnail(self, frame):
+        """The single resize each frame gets for detection"""
+        return cv2.resize(frame, DETECTION_SIZE, interpolation=cv2.INTER_AREA)
+
+    def features(self, thumbnail):
+        raise NotImplementedError
+
+    def score(self, previous, current):
+        raise NotImplementedError
+
+    def is_change(self, score):
+        raise NotImplementedError
+
+    @property
+    def warmup_frames(self):
+        """Frames to feed before a range start so detection there matches a full pass"""
+        return 1
+
+    def candidate(self, frame):
+        """Change score if this frame differs enough from the previous one (no cap applied)"""
+        current = self.features(self.thumbnail(frame))
+        previous, self.previous = self.previous, current
+
+        if previous is None:
+            return None
+
+        score = float(self.score(previous, current))
+        return score if self.is_change(score) else None
+
+    def accept(self, timestamp):
+        """Apply the per-window cap: record and return True if another change fits"""
+        while self.recent_changes and timestamp - self.recent_changes[0] > self.window_seconds:
+            self.recent_changes.popleft()
+
+        if len(self.recent_changes) >= self.max_changes:
+            return False
+
+        self.recent_changes.append(timestamp)
+        return True
+
+    def detect(self, frame, timestamp):
+        score = self.candidate(frame)
+        if score is None or not self.accept(timestamp):
+            return None
+        return score
+
+class PixelDiffDetector(SceneDetector):
+    """Fraction of grayscale pixels that changed by more than 30 levels"""
+
+    def features(self, thumbnail):
+        return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+
+    def score(self, previous, current):
+        return np.count_nonzero(cv2.absdiff(current, previous) > 30) / current.size
+
+    def is_change(self, score):
+        # sensitivity 0.5 -> 30% of pixels, the original full-size rule
+        return score > 0.5 - 0.4 * self.sensitivity
+
+class HistogramDetector(SceneDetector):
+    """Bhattacharyya distance between hue/saturation histograms
+
+    Histograms ignore where things are in the frame, so camera motion and
+    moving objects score low while cuts to a different shot score high.
+    """
+
+    def features(self, thumbnail):
+        hsv = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [16, 8], [0, 180, 0, 256])
+        return cv2.normalize(hist, hist)
+
+    def score(self, previous, current):
+        return cv2.compareHist(previous, current, cv2.HISTCMP_BHATTACHARYYA)
+
+    def is_change(self, score):
+        return score > 0.6 - 0.4 * self.sensitivity
+
+class AdaptiveThresholdDetector(SceneDetector):
+    """Mean grayscale difference compared against the video's own recent motion
+
+    A frame is a scene change when its difference stands out from the
+    running mean of the last history_size differences by a sensitivity
+    dependent number of standard deviations, so busy footage needs a
+    bigger jump than a static talk.
+    """
+
+    def __init__(self, sensitivity=0.5, max_changes=3, window_seconds=10.0, history_size=30, min_score=0.05):
+        super().__init__(sensitivity, max_changes, window_seconds)
+        self.history = deque(maxlen=history_size)
+        self.min_score = min_score
+
+    @property
+    def warmup_frames(self):
+        return self.history.maxlen + 1
+
+    def features(self, thumbnail):
+        return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+
+    def score(self, previous, current):
+        return np.mean(cv2.absdiff(current, previous)) / 255.0
+
+    def is_change(self, score):
+        history = self.history
+        threshold = self.min_score
+        if len(history) >= 5:
+            # sensitivity 0.5 -> 4 standard deviations above recent motion
+            deviations = 6.0 - 4.0 * self.sensitivity
+            threshold = max(threshold, np.mean(history) + deviations * np.std(history))
+
+        history.append(score)
+        return score > threshold
+
+# Scene detection methods selectable by name
+SCENE_DETECTORS = {
+    'histogram': HistogramDetector,
+    'adaptive': AdaptiveThresholdDetector,
+    'pixel': PixelDiffDetector
+}
+
+def create_scene_detector(method='adaptive', sensitivity=0.5, max_changes=3, window_seconds=10.0):
+    """Build a detector by name (see SCENE_DETECTORS)"""
+    if method not in SCENE_DETECTORS:
+        raise ValueError(f"Unknown scene detection method: {method}")
+    return SCENE_DETECTORS[method](sensitivity, max_changes, window_seconds)
@@ -0,0 +1,181 @@
+import copy
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+if __package__:
+    from .video_processing import get_sample_frame_numbers, iter_frames, read_frame_at, SEEK_SAMPLING_MIN_INTERVAL
+    from .media_probe import get_media_info
+    from .scene_detection import create_scene_detector
+    from .parallel_analysis import init_worker, get_default_workers
+else:
+    from video_processing import get_sample_frame_numbers, iter_frames, read_frame_at, SEEK_SAMPLING_MIN_INTERVAL
+    from media_probe import get_media_info
+    from scene_detection import create_scene_detector
+    from parallel_analysis import init_worker, get_default_workers
+
+# Below this many seconds per segment, process start-up and seeking cost
+# more than decoding the whole video in one pass
+SEGMENT_MIN_SECONDS = 30
+
+# Decoding has its own pool so frame analysis never queues behind it
+_decode_pool = None
+_decode_pool_lock = threading.Lock()
+
+def get_decode_pool():
+    """The process pool segments are decoded on (created once, get_default_workers() processes)"""
+    global _decode_pool
+    with _decode_pool_lock:
+        if _decode_pool is None:
+            # spawn avoids forking the threaded Flask server
+            context = multiprocessing.get_context('spawn')
+            _decode_pool = ProcessPoolExecutor(max_workers=get_default_workers(), mp_context=context,
+                                               initializer=init_worker)
+        return _decode_pool
+
+def shutdown_decode_pool():
+    global _decode_pool
+    with _decode_pool_lock:
+        if _decode_pool is not None:
+            _decode_pool.shutdown()
+            _decode_pool = None
+
+def plan_segments(total_frames, fps, segments):
+    """Split [0, total_frames) into up to `segments` contiguous frame ranges"""
+    if fps > 0:
+        segments = min(segments, max(1, int(total_frames / fps // SEGMENT_MIN_SECONDS)))
+    segments = max(1, min(segments, total_frames))
+
+    bounds = [total_frames * i // segments for i in range(segments + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(segments) if bounds[i] < bounds[i + 1]]
+
+def decode_segment(video_path, start_frame, end_frame, scene_detector):
+    """Worker: run scene detection over one frame range with its own capture
+
+    Returns every raw scene-change candidate in the range as
+    (frame_number, score); the per-window cap and max_frames are left to
+    the caller, which sees the candidates of all segments in timeline
+    order. No pixels are sent back. The capture starts
+    scene_detector.warmup_frames before the range so the first frames are
+    compared against their real predecessors (and adaptive thresholds see
+    the same recent history) exactly as in a single pass.
+    """
+    cap = cv2.VideoCapture(video_path)
+    candidates = []
+
+    try:
+        if not cap.isOpened():
+            return candidates
+
+        frame_number = max(0, start_frame - scene_detector.warmup_frames)
+        if frame_number > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+
+        while frame_number < end_frame:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            change_score = scene_detector.candidate(frame)
+            if frame_number >= start_frame and change_score is not None:
+                candidates.append((frame_number, change_score))
+
+            frame_number += 1
+
+        return candidates
+
+    finally:
+        cap.release()
+
+def select_frames(futures, ranges, targets, fps, scene_detector, max_frames):
+    """Merge segment results in timeline order and apply the caps as a single pass does
+
+    Yields frame dicts without pixels: regular samples and the scene
+    changes the detector's window cap accepts, max_frames in total.
+    """
+    emitted = 0
+    for future, (start, end) in zip(futures, ranges):
+        records = [{'frame_number': frame_number, 'type': 'regular'}
+                   for frame_number in targets if start <= frame_number < end]
+        records += [{'frame_number': frame_number, 'type': 'scene_change', 'change_percentage': score}
+                    for frame_number, score in future.result()]
+        # A scene change on a sampled frame comes right after the regular sample
+        records.sort(key=lambda record: (record['frame_number'], record['type'] == 'scene_change'))
+
+        for record in records:
+            if emitted >= max_frames:
+                return
+            record['timestamp'] = record['frame_number'] / fps if fps > 0 else 0
+            if record['type'] == 'scene_change' and not scene_detector.accept(record['timestamp']):
+                continue
+
+            yield record
+            emitted += 1
+
+def read_selected_frames(cap, records, size):
+    """Decode just the selected frames, in order, grabbing forward over short gaps and seeking over long ones"""
+    position = 0
+    last_frame_number, frame_resized = None, None
+
+    for record in records:
+        frame_number = record['frame_number']
+
+        if frame_number != last_frame_number:
+            if frame_number < position or frame_number - position >= SEEK_SAMPLING_MIN_INTERVAL:
+                ret, frame = read_frame_at(cap, frame_number)
+            else:
+                while position < frame_number and cap.grab():
+                    position += 1
+                ret, frame = cap.read()
+            if not ret:
+                return
+
+            position = frame_number + 1
+            last_frame_number, frame_resized = frame_number, cv2.resize(frame, size)
+
+        yield dict(record, frame=frame_resized)
+
+def iter_frames_segmented(video_path, max_frames=10, size=(640, 480), scene_changes=False, scene_detector=None,
+                          segments=None):
+    """iter_frames() with scene detection run in parallel timeline segments
+
+    Scene detection has to decode every frame, so the video is split into
+    up to `segments` frame ranges (fewer for short videos, see
+    SEGMENT_MIN_SECONDS), each scanned by a decode-pool process with its
+    own capture that seeks straight to the range. Workers only report
+    candidate frame numbers; the window cap and max_frames are applied
+    here across all segments, and only the selected frames are decoded
+    again, so the frames yielded (in timestamp order) are the same as
+    iter_frames'. Without scene detection there is nothing to parallelize
+    and iter_frames is used directly.
+    """
+    segments = segments or get_default_workers()
+    info = get_media_info(video_path)
+    if info is None:
+        return
+    total_frames, fps = info.frame_count, info.fps
+
+    ranges = plan_segments(total_frames, fps, segments)
+    if not scene_changes or len(ranges) < 2:
+        yield from iter_frames(video_path, max_frames, size, scene_changes=scene_changes, scene_detector=scene_detector)
+        return
+
+    scene_detector = scene_detector or create_scene_detector()
+    targets, _ = get_sample_frame_numbers(total_frames, max_frames)
+    pool = get_decode_pool()
+
+    # Each worker gets a fresh copy of the detector; this one only tracks the cap
+    futures = [pool.submit(decode_segment, video_path, start, end, copy.deepcopy(scene_detector))
+               for start, end in ranges]
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return
+        records = select_frames(futures, ranges, targets, fps, scene_detector, max_frames)
+        yield from read_selected_frames(cap, records, size)
+
+    finally:
+        cap.release()
+        for future in futures:
+            future.cancel()
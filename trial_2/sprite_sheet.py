@@ -0,0 +1,99 @@
+import math
+import cv2
+import numpy as np
+if __package__:
+    from .video_processing import iter_frames
+    from .media_probe import get_media_info
+else:
+    from video_processing import iter_frames
+    from media_probe import get_media_info
+
+SPRITE_THUMB_SIZE = (160, 120)  # Same 4:3 shape as the analysis frames
+SPRITE_COLUMNS = 10
+SPRITE_JPEG_QUALITY = 80
+
+def make_thumbnail(frame, thumb_size=SPRITE_THUMB_SIZE):
+    return cv2.resize(frame, thumb_size, interpolation=cv2.INTER_AREA)
+
+def collect_thumbnails(frames_data, thumbnails, thumb_size=SPRITE_THUMB_SIZE):
+    """Pass frames through unchanged, keeping a (timestamp, thumbnail) of each
+
+    Lets the analysis pipeline feed a sprite sheet from the frames it has
+    already decoded instead of decoding the video a second time.
+    """
+    for frame_info in frames_data:
+        thumbnails.append((frame_info['timestamp'], make_thumbnail(frame_info['frame'], thumb_size)))
+        yield frame_info
+
+def get_video_duration(video_path):
+    info = get_media_info(video_path)
+    return info.duration if info else None
+
+def build_sprite_sheet(thumbnails, columns=SPRITE_COLUMNS, duration=None):
+    """Tile (timestamp, thumbnail) pairs into one JPEG mosaic
+
+    Returns (jpeg_bytes, index). The index lists each tile's timestamp and
+    pixel rectangle in the mosaic, in timestamp order. duration, when
+    known, ends the last WebVTT cue.
+    """
+    # A scene change can land on a regular sample; keep one tile per timestamp
+    thumbnails = list({timestamp: thumbnail for timestamp, thumbnail in sorted(thumbnails, key=lambda item: item[0])}.items())
+    if not thumbnails:
+        return None, None
+
+    thumb_h, thumb_w = thumbnails[0][1].shape[:2]
+    columns = min(columns, len(thumbnails))
+    rows = math.ceil(len(thumbnails) / columns)
+
+    sheet = np.zeros((rows * thumb_h, columns * thumb_w, 3), dtype=np.uint8)
+    frames = []
+
+    for i, (timestamp, thumbnail) in enumerate(thumbnails):
+        x, y = (i % columns) * thumb_w, (i // columns) * thumb_h
+        sheet[y:y + thumb_h, x:x + thumb_w] = thumbnail[:thumb_h, :thumb_w]
+        frames.append({'timestamp': float(timestamp), 'x': x, 'y': y, 'w': thumb_w, 'h': thumb_h})
+
+    ok, encoded = cv2.imencode('.jpg', sheet, [cv2.IMWRITE_JPEG_QUALITY, SPRITE_JPEG_QUALITY])
+    if not ok:
+        return None, None
+
+    index = {
+        'count': len(frames),
+        'columns': columns,
+        'rows': rows,
+        'thumb_width': thumb_w,
+        'thumb_height': thumb_h,
+        'duration': duration,
+        'frames': frames
+    }
+    return encoded.tobytes(), index
+
+def generate_sprite_sheet(video_path, count=20, thumb_size=SPRITE_THUMB_SIZE, columns=SPRITE_COLUMNS):
+    """Sample `count` evenly spaced thumbnails in one decoding pass and tile them"""
+    thumbnails = [(frame_info['timestamp'], frame_info['frame'])
+                  for frame_info in iter_frames(video_path, max_frames=count, size=thumb_size)]
+    return build_sprite_sheet(thumbnails, columns, get_video_duration(video_path))
+
+def format_vtt_timestamp(seconds):
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+def sprite_sheet_vtt(index, image_url):
+    """WebVTT thumbnail track: each cue points at its tile with #xywh"""
+    frames = index['frames']
+    lines = ['WEBVTT', '']
+
+    for i, tile in enumerate(frames):
+        start = tile['timestamp']
+        if i + 1 < len(frames):
+            end = frames[i + 1]['timestamp']
+        else:
+            end = index.get('duration') or start + 1
+        end = max(end, start + 0.001)
+
+        lines.append(f"{format_vtt_timestamp(start)} --> {format_vtt_timestamp(end)}")
+        lines.append(f"{image_url}#xywh={tile['x']},{tile['y']},{tile['w']},{tile['h']}")
+        lines.append('')
+
+    return '\n'.join(lines)
@@ -0,0 +1,52 @@
+import io
+import os
+import time
+from upload_store import UploadStore
+
+# Smallest header sniff_container accepts as MP4
+MP4_BYTES = b'\x00\x00\x00\x18ftypisom' + b'\x00' * 100
+
+def make_store(tmp_path, **options):
+    options.setdefault('sweep_interval', 0)
+    return UploadStore(str(tmp_path), max_bytes=1024 * 1024, **options)
+
+def test_expired_session_is_swept_on_lookup(tmp_path):
+    store = make_store(tmp_path, session_ttl=60)
+    stale = store.start_session('stale.mp4', len(MP4_BYTES))
+    fresh = store.start_session('fresh.mp4', len(MP4_BYTES))
+    stale.updated_at -= 120
+
+    assert store.get_session(fresh.id) is fresh
+    assert store.get_session(stale.id) is None
+    assert not os.path.exists(stale.partial_path)
+    assert os.path.exists(fresh.partial_path)
+
+def test_expired_upload_is_swept_on_touch(tmp_path):
+    store = make_store(tmp_path, upload_ttl=60)
+    old = store.save_stream(io.BytesIO(MP4_BYTES), 'old.mp4')
+    new = store.save_stream(io.BytesIO(MP4_BYTES + b'\x01'), 'new.mp4')
+    sidecar = f"{old['filepath']}.keyframes.json"
+    open(sidecar, 'w').close()
+    past = time.time() - 120
+    os.utime(old['filepath'], (past, past))
+
+    store.touch(new['filepath'])
+
+    assert not os.path.exists(old['filepath'])
+    assert not os.path.exists(sidecar)
+    assert os.path.exists(new['filepath'])
+
+def test_sweep_is_throttled(tmp_path):
+    store = make_store(tmp_path, session_ttl=60, sweep_interval=3600)
+    session = store.start_session('video.mp4', len(MP4_BYTES))
+    session.updated_at -= 120
+
+    # The sweep already ran when the session started
+    assert store.get_session(session.id) is session
+
+def test_upload_name_is_its_content_hash(tmp_path):
+    store = make_store(tmp_path)
+    stored = store.save_stream(io.BytesIO(MP4_BYTES), 'video.mp4')
+
+    assert store.content_hash(stored['filepath']) == stored['content_hash']
+    assert store.content_hash(str(tmp_path / 'elsewhere' / os.path.basename(stored['filepath']))) is None
@@ -0,0 +1,270 @@
+import os
+import re
+import glob
+import time
+import uuid
+import hashlib
+import threading
+
+# Container signatures checked against the first bytes of an upload (enough
+# to reach the DocType in a Matroska/WebM EBML header)
+SNIFF_BYTES = 64
+
+# Finished uploads: <sha256>.<container>
+STORED_UPLOAD_PATTERN = re.compile(r'^[0-9a-f]{64}\.\w+$')
+
+class UploadError(Exception):
+    """Raised for an upload that is rejected (bad container, too large, wrong offset)"""
+
+class UploadOffsetError(UploadError):
+    """Raised when a chunk does not start where the resumable upload left off"""
+
+def sniff_container(header):
+    """Container format from a file's first bytes, or None if it is not a video we accept"""
+    if header[4:8] == b'ftyp':
+        return 'mov' if header[8:12] == b'qt  ' else 'mp4'
+    if header[4:8] in (b'moov', b'mdat', b'wide', b'free', b'skip'):
+        # Old QuickTime files start straight with an atom, no ftyp
+        return 'mov'
+    if header.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'webm' if b'webm' in header else 'mkv'
+    if header[:4] == b'RIFF' and header[8:12] == b'AVI ':
+        return 'avi'
+    if header[:3] == b'FLV':
+        return 'flv'
+    return None
+
+class UploadSession:
+    """A resumable upload: bytes received so far plus the running content hash"""
+
+    def __init__(self, upload_id, filename, total_size, partial_path):
+        self.id = upload_id
+        self.filename = filename
+        self.total_size = total_size
+        self.partial_path = partial_path
+        self.updated_at = time.time()
+        self.offset = 0
+        self.container = None
+        self.header = b''
+        self.digest = hashlib.sha256()
+        self.lock = threading.Lock()
+
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'filename': self.filename,
+            'total_size': self.total_size,
+            'offset': self.offset,
+            'complete': self.offset >= self.total_size
+        }
+
+class UploadStore:
+    """Writes uploads to disk in chunks, hashing and sniffing them on the fly
+
+    Nothing is buffered in memory beyond one chunk: the SHA-256 and the
+    container check are computed while the bytes are written. Finished
+    uploads are stored as <upload_dir>/<sha256>.<container>, so the same
+    video uploaded twice (under any name) is stored once. Large files can be
+    sent as a resumable session of chunks; a session whose client drops
+    out can continue from session.offset. Sessions idle for longer than
+    session_ttl seconds are discarded.
+
+    A stored upload may be shared by several clients and jobs, so nothing
+    deletes it after processing; instead stored uploads (with the sidecar
+    files kept beside them) that were not uploaded again or touched for
+    upload_ttl seconds are swept away. The sweep runs (at most every
+    sweep_interval seconds) whenever an upload finishes or starts, a
+    session is looked up or a stored upload is touched.
+    """
+
+    def __init__(self, upload_dir, max_bytes, chunk_size=1024 * 1024, session_ttl=24 * 3600, upload_ttl=24 * 3600,
+                 sweep_interval=60):
+        self.upload_dir = upload_dir
+        self.partial_dir = os.path.join(upload_dir, 'partial')
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.session_ttl = session_ttl
+        self.upload_ttl = upload_ttl
+        self.sweep_interval = sweep_interval
+        self.last_sweep = 0
+        self.sessions = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+    def _write_stream(self, stream, f, session, limit):
+        """Copy stream into f chunk by chunk, updating session's offset, hash and container"""
+        while True:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                break
+
+            if session.offset + len(chunk) > limit:
+                raise UploadError('File is larger than the allowed upload size')
+
+            if session.container is None:
+                session.header = (session.header + chunk)[:SNIFF_BYTES]
+                if len(session.header) >= SNIFF_BYTES or session.offset + len(chunk) >= limit:
+                    session.container = sniff_container(session.header)
+                    if session.container is None:
+                        raise UploadError('Unsupported or unrecognized video container')
+
+            f.write(chunk)
+            session.digest.update(chunk)
+            session.offset += len(chunk)
+
+    def _finish(self, session):
+        """Move a complete upload to its content-addressed path (or drop it as a duplicate)"""
+        if session.container is None:
+            os.remove(session.partial_path)
+            raise UploadError('Unsupported or unrecognized video container')
+
+        content_hash = session.digest.hexdigest()
+        filepath = os.path.join(self.upload_dir, f"{content_hash}.{session.container}")
+
+        with self.lock:
+            self._sweep()
+            deduplicated = os.path.exists(filepath)
+            if deduplicated:
+                os.remove(session.partial_path)
+                os.utime(filepath)  # Uploaded again: restart its TTL
+            else:
+                os.replace(session.partial_path, filepath)
+
+        return {
+            'filename': session.filename,
+            'filepath': filepath,
+            'content_hash': content_hash,
+            'container': session.container,
+            'size': session.offset,
+            'deduplicated': deduplicated
+        }
+
+    def save_stream(self, stream, filename):
+        """Store a whole upload read from a file-like stream"""
+        session = UploadSession(uuid.uuid4().hex, filename, None, os.path.join(self.partial_dir, f"{uuid.uuid4().hex}.part"))
+
+        try:
+            with open(session.partial_path, 'wb') as f:
+                self._write_stream(stream, f, session, self.max_bytes)
+        except Exception:
+            if os.path.exists(session.partial_path):
+                os.remove(session.partial_path)
+            raise
+
+        if session.offset == 0:
+            os.remove(session.partial_path)
+            raise UploadError('Uploaded file is empty')
+
+        return self._finish(session)
+
+    def _expire_sessions(self):
+        # Caller holds self.lock
+        now = time.time()
+        for upload_id, session in list(self.sessions.items()):
+            if now - session.updated_at > self.session_ttl:
+                self.sessions.pop(upload_id)
+                if os.path.exists(session.partial_path):
+                    os.remove(session.partial_path)
+
+    def _expire_uploads(self):
+        # Caller holds self.lock
+        cutoff = time.time() - self.upload_ttl
+        for name in os.listdir(self.upload_dir):
+            if not STORED_UPLOAD_PATTERN.match(name):
+                continue
+            filepath = os.path.join(self.upload_dir, name)
+            try:
+                if os.path.getmtime(filepath) >= cutoff:
+                    continue
+                for sidecar_path in glob.glob(f"{glob.escape(filepath)}.*"):
+                    os.remove(sidecar_path)
+                os.remove(filepath)
+            except OSError as e:
+                print(f"Error expiring upload {name}: {e}")
+
+    def content_hash(self, filepath):
+        """The hash a stored upload was saved under (its name), or None for any other file"""
+        name = os.path.basename(filepath)
+        if os.path.dirname(os.path.abspath(filepath)) != os.path.abspath(self.upload_dir):
+            return None
+        return name.split('.')[0] if STORED_UPLOAD_PATTERN.match(name) else None
+
+    def _sweep(self):
+        # Caller holds self.lock
+        now = time.time()
+        if now - self.last_sweep < self.sweep_interval:
+            return
+        self.last_sweep = now
+        self._expire_sessions()
+        self._expire_uploads()
+
+    def touch(self, filepath):
+        """Restart a stored upload's TTL (call when processing starts)"""
+        with self.lock:
+            try:
+                os.utime(filepath)
+            except OSError:
+                pass
+            self._sweep()
+
+    def start_session(self, filename, total_size):
+        """Open a resumable upload of total_size bytes"""
+        if total_size <= 0:
+            raise UploadError('Upload size must be positive')
+        if total_size > self.max_bytes:
+            raise UploadError('File is larger than the allowed upload size')
+
+        upload_id = uuid.uuid4().hex
+        session = UploadSession(upload_id, filename, total_size, os.path.join(self.partial_dir, f"{upload_id}.part"))
+        open(session.partial_path, 'wb').close()
+
+        with self.lock:
+            self._sweep()
+            self.sessions[upload_id] = session
+        return session
+
+    def get_session(self, upload_id):
+        with self.lock:
+            self._sweep()
+            return self.sessions.get(upload_id)
+
+    def append_chunk(self, upload_id, offset, stream):
+        """Append the bytes of stream at offset; returns (session, stored file info or None)
+
+        offset must equal the bytes already received, so a client resuming
+        after an error first asks for the session's offset. The stored file
+        info is returned once the last byte has arrived.
+        """
+        session = self.get_session(upload_id)
+        if session is None:
+            raise KeyError(upload_id)
+
+        with session.lock:
+            if offset != session.offset:
+                raise UploadOffsetError(f'Expected offset {session.offset}, got {offset}')
+
+            # Each chunk is written before offset moves on, so after a dropped
+            # connection the session resumes cleanly from session.offset
+            try:
+                with open(session.partial_path, 'ab') as f:
+                    self._write_stream(stream, f, session, session.total_size)
+            except UploadError:
+                if session.container is None:
+                    self.abort_session(upload_id)
+                raise
+            finally:
+                session.updated_at = time.time()
+
+            if session.offset < session.total_size:
+                return session, None
+
+            with self.lock:
+                self.sessions.pop(upload_id, None)
+            return session, self._finish(session)
+
+    def abort_session(self, upload_id):
+        with self.lock:
+            session = self.sessions.pop(upload_id, None)
+        if session and os.path.exists(session.partial_path):
+            os.remove(session.partial_path)
+        return session is not None
@@ -1,85 +1,178 @@
 
 import cv2
 import os
+import subprocess
 import numpy as np
-from moviepy import (
-    VideoFileClip,
-    ImageClip,
-    TextClip,
-    CompositeVideoClip,
-    AudioFileClip,
-    concatenate_videoclips
-)
 import tempfile
-
-def get_video_info(video_path):
-    """Get basic video information"""
+if __package__:
+    from .scene_detection import create_scene_detector
+    from .media_probe import get_media_info
+    from .result_cache import make_cache_key
+else:
+    from scene_detection import create_scene_detector
+    from media_probe import get_media_info
+    from result_cache import make_cache_key
+
+FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+
+# Analysis proxy: small, low frame rate and a keyframe every second, so
+# decoding, scene detection and seeking all touch far fewer pixels
+ANALYSIS_PROXY_SIZE = 480  # Short side, so portrait videos are not squeezed
+ANALYSIS_PROXY_FPS = 10
+
+def get_video_info(video_path, content_hash=None):
+    """Get basic video information (from the memoized media probe)"""
     try:
-        cap = cv2.VideoCapture(video_path)
-
-        if not cap.isOpened():
+        info = get_media_info(video_path, content_hash)
+        if info is None:
             return None
 
-        fps = cap.get(cv2.CAV_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        duration = frame_count / fps if fps > 0 else 0
-
-        cap.release()
-
-        return {
-            'duration': duration,
-            'fps': fps,
-            'frame_count': frame_count,
-            'width': width,
-            'height': height,
-            'file_size': os.path.getsize(video_path) if os.path.exists(video_path) else 0
-        }
+        return info.to_dict()
 
     except Exception as e:
         print(f"Error getting video info: {e}")
         return None
 
-def extract_frames(video_path, max_frames=10):
-    """Extract frames from video for analysis"""
-    try:
-        cap = cv2.VideoCapture(video_path)
+# Sampling intervals (in frames) above which seeking beats decoding through.
+# Seeking lands on the preceding keyframe and decodes forward, so it only pays
+# off once the gap between samples is longer than a typical GOP.
+SEEK_SAMPLING_MIN_INTERVAL = 120
+
+def get_sample_frame_numbers(total_frames, max_frames):
+    """Frame numbers of evenly spaced samples (same spacing as the read loop)"""
+    interval = max(1, total_frames // max_frames)
+    return list(range(0, total_frames, interval))[:max_frames], interval
+
+def read_frame_at(cap, frame_number):
+    """Seek to a frame number and decode just that frame"""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+    return cap.read()
+
+def iter_frames(video_path, max_frames=10, size=(640, 480), sampling='auto', scene_changes=False, scene_detector=None,
+                segments=1):
+    """Lazily yield sampled frames one at a time
+
+    Each item is a dict with 'frame' (resized BGR array), 'timestamp',
+    'frame_number' and 'type' ('regular' or 'scene_change', the latter also
+    carrying the detector's 0-1 score as 'change_percentage'). Only the
+    frame being yielded is held in
+    memory, so callers can analyze while the video is still being decoded.
+
+    sampling:
+        'seek'       - jump straight to each target frame (sparse samples)
+        'grab'       - grab() every frame, retrieve() only the targets
+        'sequential' - read() and convert every frame (original behaviour)
+        'auto'       - 'seek' for wide intervals, 'grab' otherwise
+
+    scene_changes=True decodes every frame to compare neighbours, so the
+    sampling mode is ignored in that case. scene_detector picks the
+    detection method and sensitivity (see scene_detection); by default an
+    adaptive-threshold detector is used. Frames are only resized to `size`
+    when they are yielded.
+
+    segments > 1 decodes long videos in that many parallel ranges (see
+    segmented_decoding); the frames yielded are the same.
+    """
+    if segments and segments > 1:
+        if __package__:
+            from .segmented_decoding import iter_frames_segmented
+        else:
+            from segmented_decoding import iter_frames_segmented
+        yield from iter_frames_segmented(video_path, max_frames, size, scene_changes, scene_detector, segments)
+        return
+
+    cap = cv2.VideoCapture(video_path)
 
+    try:
         if not cap.isOpened():
-            return []
+            return
 
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         fps = cap.get(cv2.CAP_PROP_FPS)
 
         # Calculate interval to get evenly spaced frames
-        interval = max(1, total_frames // max_frames)
-
-        frames_with_times = []
+        targets, interval = get_sample_frame_numbers(total_frames, max_frames)
+
+        if scene_changes:
+            sampling = 'sequential'
+            scene_detector = scene_detector or create_scene_detector()
+        elif sampling == 'auto':
+            sampling = 'seek' if interval >= SEEK_SAMPLING_MIN_INTERVAL else 'grab'
+
+        if sampling == 'seek':
+            for frame_number in targets:
+                ret, frame = read_frame_at(cap, frame_number)
+                if not ret:
+                    break
+
+                yield {
+                    'frame': cv2.resize(frame, size),
+                    'timestamp': frame_number / fps if fps > 0 else 0,
+                    'frame_number': frame_number,
+                    'type': 'regular'
+                }
+            return
+
+        emitted = 0
         frame_count = 0
 
-        while cap.isOpened() and len(frames_with_times) < max_frames:
+        while cap.isOpened() and emitted < max_frames:
+            is_target = frame_count % interval == 0
+
+            if sampling == 'grab' and not is_target:
+                # Advance the decoder without copying/converting the frame
+                if not cap.grab():
+                    break
+                frame_count += 1
+                continue
+
             ret, frame = cap.read()
             if not ret:
                 break
 
-            if frame_count % interval == 0:
-                timestamp = frame_count / fps if fps > 0 else 0
-                # Resize frame to manageable size
-                frame_resized = cv2.resize(frame, (640, 480))
-                frames_with_times.append((frame_resized, timestamp))
+            timestamp = frame_count / fps if fps > 0 else 0
+            frame_resized = None
+
+            # Add regular interval frames
+            if is_target:
+                frame_resized = cv2.resize(frame, size)
+                yield {
+                    'frame': frame_resized,
+                    'timestamp': timestamp,
+                    'frame_number': frame_count,
+                    'type': 'regular'
+                }
+                emitted += 1
+
+            # Detect scene changes on a tiny thumbnail of every frame
+            if scene_changes:
+                change_score = scene_detector.detect(frame, timestamp)
+
+                if change_score is not None and emitted < max_frames:
+                    yield {
+                        'frame': frame_resized if frame_resized is not None else cv2.resize(frame, size),
+                        'timestamp': timestamp,
+                        'frame_number': frame_count,
+                        'type': 'scene_change',
+                        'change_percentage': change_score
+                    }
+                    emitted += 1
 
             frame_count += 1
 
-        cap.release()
-        return frames_with_times
-
     except Exception as e:
         print(f"Error extracting frames: {e}")
-        return []
 
-def validate_video_file(video_path):
-    """Validate if file is a proper video file"""
+    finally:
+        cap.release()
+
+def extract_frames(video_path, max_frames=10, sampling='auto'):
+    """Extract frames from video for analysis"""
+    return [(frame_info['frame'], frame_info['timestamp'])
+            for frame_info in iter_frames(video_path, max_frames, sampling=sampling)]
+
+def validate_video_file(video_path, content_hash=None):
+    """Validate if file is a proper video file (from the memoized media probe)"""
     try:
         if not os.path.exists(video_path):
             return False, "File does not exist"
@@ -91,68 +184,142 @@ def validate_video_file(video_path):
         if file_ext not in valid_extensions:
             return False, f"Unsupported file format: {file_ext}"
 
-        # Try to open with OpenCV
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            cap.release()
+        # Open once; get_video_info() and later stages reuse the same probe
+        info = get_media_info(video_path, content_hash)
+        if info is None:
             return False, "Cannot open video file"
 
         # Check if video has frames
-        ret, frame = cap.read()
-        cap.release()
-
-        if not ret:
+        if not info.decodable:
             return False, "Video file appears to be corrupted"
 
         # Check file size (limit to 100MB for free processing)
-        file_size = os.path.getsize(video_path)
         max_size = 100 * 1024 * 1024  # 100MB
 
-        if file_size > max_size:
-            return False, f"File too large: {file_size / (1024*1024):.1f}MB (max: 100MB)"
+        if info.file_size > max_size:
+            return False, f"File too large: {info.file_size / (1024*1024):.1f}MB (max: 100MB)"
 
         return True, "Valid video file"
 
     except Exception as e:
         return False, f"Validation error: {e}"
 
-def compress_video_if_needed(video_path, max_size_mb=50):
-    """Compress video if it's too large for processing"""
+def run_ffmpeg(args, timeout=600):
+    """Run ffmpeg quietly; returns True on success"""
     try:
+        result = subprocess.run([FFMPEG_BINARY, '-nostdin', '-v', 'error', '-y'] + args,
+                                capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"ffmpeg failed: {e}")
+        return False
+
+    if result.returncode != 0:
+        print(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+        return False
+    return True
+
+def analysis_proxy_path(video_path):
+    return f"{os.path.splitext(video_path)[0]}_proxy.mp4"
+
+def create_analysis_proxy(video_path, output_path=None, size=ANALYSIS_PROXY_SIZE, fps=ANALYSIS_PROXY_FPS):
+    """Transcode a low-resolution, low-fps, keyframe-dense copy for analysis
+
+    Audio is dropped and x264 runs with its fastest presets, so this costs
+    about one decode of the original. Videos whose short side is already
+    at or below size are only reduced in frame rate. The compression and
+    rescaling blur fine detail, so sharpness-based quality scores measured
+    on a proxy are not comparable to the original's; the apps only use it
+    when ANALYSIS_PROXY is set. Returns the proxy path, or None if ffmpeg
+    fails.
+    """
+    output_path = output_path or analysis_proxy_path(video_path)
+    info = get_media_info(video_path)
+    if info is None:
+        return None
+
+    # Scale the short side, never upscale; -2 keeps the other side even for yuv420p
+    short_side = min(size, min(info.width, info.height) // 2 * 2) if info.width and info.height else size
+    scale = f"scale=-2:{short_side}" if info.width >= info.height else f"scale={short_side}:-2"
+    target_fps = min(fps, info.fps) if info.fps > 0 else fps
+
+    ok = run_ffmpeg([
+        '-i', video_path, '-an', '-sn',
+        '-vf', f"{scale},fps={target_fps}",
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-tune', 'fastdecode', '-crf', '28',
+        '-g', str(max(1, int(round(target_fps)))), '-pix_fmt', 'yuv420p',
+        output_path
+    ])
+    return output_path if ok and os.path.exists(output_path) else None
+
+def analysis_proxy_key(content_hash):
+    return make_cache_key(content_hash, size=ANALYSIS_PROXY_SIZE, fps=ANALYSIS_PROXY_FPS)
+
+def get_cached_analysis_proxy(video_path, content_hash, result_cache):
+    """Analysis proxy for a video, built once per content hash and kept in result_cache
+
+    Returns the cached proxy path, or None if it cannot be built.
+    """
+    key = analysis_proxy_key(content_hash)
+    proxy_path = result_cache.get_file('analysis_proxy', key, 'mp4')
+    if proxy_path is not None:
+        return proxy_path
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        proxy_path = create_analysis_proxy(video_path, os.path.join(tmp_dir, 'proxy.mp4'))
+        if proxy_path is None:
+            return None
+        proxy_path = result_cache.move_file('analysis_proxy', key, proxy_path, 'mp4')
+
+    # A proxy larger than the whole cache budget is evicted straight away
+    return proxy_path if os.path.exists(proxy_path) else None
+
+def compress_video_if_needed(video_path, max_size_mb=50, mode='size'):
+    """Compress video if it's too large for processing
+
+    mode='size' transcodes files over max_size_mb to a bitrate that fits
+    the limit, scaling the frame down by the same ratio. mode='analysis_proxy'
+    always produces the analysis proxy (see create_analysis_proxy), which
+    is all the analysis stages need.
+    """
+    try:
+        if mode == 'analysis_proxy':
+            return create_analysis_proxy(video_path) or video_path
+
         file_size_mb = os.path.getsize(video_path) / (1024 * 1024)
 
         if file_size_mb <= max_size_mb:
             return video_path  # No compression needed
 
+        info = get_media_info(video_path)
+        if info is None or info.duration <= 0:
+            return video_path
+
         # Create compressed version
         base_name = os.path.splitext(video_path)[0]
         compressed_path = f"{base_name}_compressed.mp4"
 
-        # Use moviepy to compress
-        video = VideoFileClip(video_path)
-
-        # Calculate target resolution to achieve size limit
+        # Calculate target resolution and bitrate to achieve size limit
         compression_ratio = max_size_mb / file_size_mb
-        new_width = int(video.w * (compression_ratio ** 0.5))
-        new_height = int(video.h * (compression_ratio ** 0.5))
+        new_height = int(info.height * (compression_ratio ** 0.5))
 
         # Ensure dimensions are even (required for some codecs)
-        new_width = new_width - (new_width % 2)
-        new_height = new_height - (new_height % 2)
-
-        video_resized = video.resize((new_width, new_height))
-        video_resized.write_videofile(
-            compressed_path,
-            codec='libx264',
-            audio_codec='aac',
-            verbose=False,
-            logger=None
-        )
-
-        video.close()
-        video_resized.close()
-
-        return compressed_path
+        new_height = max(2, new_height - (new_height % 2))
+
+        audio_kbps = 96
+        video_kbps = max(100, int(max_size_mb * 8 * 1024 * 0.95 / info.duration) - audio_kbps)
+
+        ok = run_ffmpeg([
+            '-i', video_path,
+            '-vf', f"scale=-2:{new_height}",
+            '-c:v', 'libx264', '-preset', 'veryfast',
+            '-b:v', f"{video_kbps}k", '-maxrate', f"{video_kbps}k", '-bufsize', f"{video_kbps * 2}k",
+            '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-b:a', f"{audio_kbps}k",
+            '-movflags', '+faststart',
+            compressed_path
+        ])
+
+        return compressed_path if ok else video_path
 
     except Exception as e:
         print(f"Compression error: {e}")
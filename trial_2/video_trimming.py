@@ -0,0 +1,104 @@
+import os
+import bisect
+if __package__:
+    from .video_processing import run_ffmpeg
+    from .media_probe import get_media_info
+    from .keyframe_index import load_keyframe_index, build_keyframe_index
+else:
+    from video_processing import run_ffmpeg
+    from media_probe import get_media_info
+    from keyframe_index import load_keyframe_index, build_keyframe_index
+
+def get_keyframe_timestamps(video_path):
+    """Keyframe timestamps from the stored index (see keyframe_index), else a fresh probe"""
+    index = load_keyframe_index(video_path) or build_keyframe_index(video_path)
+    return index['timestamps'] if index else None
+
+def plan_clip(keyframe_times, start, exact=False):
+    """How to cut a clip beginning at start: (mode, clip start, copy seek time)
+
+    A stream copy has to begin on a keyframe, so its start moves back to
+    the preceding keyframe (the clip gains up to one GOP at the front).
+    ffmpeg's copy seek compares packet decode times, which run ahead of
+    the keyframe's timestamp when there are B-frames, so the copy seek is
+    placed halfway back to the previous keyframe (None for the first GOP:
+    no seek at all). Only when exact is set and start is not already a
+    keyframe does the clip get re-encoded. Without keyframe times a copy's
+    real start is not known in advance, so the clip start is None.
+    """
+    if not keyframe_times:
+        return ('reencode', start, None) if exact else ('copy', None, start or None)
+
+    position = bisect.bisect_right(keyframe_times, start + 1e-3) - 1
+    keyframe = keyframe_times[position] if position >= 0 else 0.0
+
+    if exact and abs(keyframe - start) > 1e-3:
+        return 'reencode', start, None
+
+    seek = (keyframe_times[position - 1] + keyframe) / 2 if position > 0 else None
+    return 'copy', keyframe, seek
+
+def measured_start(clip_path, end):
+    """Where a copied clip actually starts, from its duration (it ends at end)"""
+    info = get_media_info(clip_path)
+    return max(0.0, round(end - info.duration, 3)) if info and info.duration else None
+
+def cut_clips(video_path, ranges, output_dir=None, exact=False, ext=None):
+    """Cut several (start, end) ranges out of a video with a single ffmpeg run
+
+    Every clip is an output of the same ffmpeg process, so the input is
+    read and demuxed once however many clips there are. Clips are stream
+    copied (no decoding or encoding) with their start snapped back to a
+    keyframe; with exact=True, clips whose start is not on a keyframe are
+    re-encoded so they begin on the requested frame (ffmpeg then decodes
+    the input up to those clips). Returns one dict per
+    range ('path', 'start', 'end', 'mode', 'requested_start'), or None if
+    ffmpeg fails. Clips keep the input's container unless ext is given.
+    """
+    if not ranges:
+        return []
+
+    keyframe_times = get_keyframe_timestamps(video_path)
+    output_dir = output_dir or os.path.dirname(os.path.abspath(video_path))
+    base_name, input_ext = os.path.splitext(os.path.basename(video_path))
+    ext = ext or input_ext
+    os.makedirs(output_dir, exist_ok=True)
+
+    args = ['-i', video_path]
+    clips = []
+    for i, (start, end) in enumerate(ranges):
+        start, end = max(0.0, float(start)), float(end)
+        if end <= start:
+            raise ValueError(f"Invalid clip range: {start}-{end}")
+
+        mode, cut_start, seek = plan_clip(keyframe_times, start, exact)
+        path = os.path.join(output_dir, f"{base_name}_clip{i + 1}_{start:.2f}-{end:.2f}{ext}")
+
+        if mode == 'copy':
+            args += ['-map', '0'] + (['-ss', f"{seek:.3f}"] if seek else []) + [
+                     '-to', f"{end:.3f}", '-c', 'copy', '-avoid_negative_ts', 'make_zero', path]
+        else:
+            args += ['-map', '0:v:0', '-map', '0:a?', '-ss', f"{cut_start:.3f}", '-to', f"{end:.3f}",
+                     '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18', '-pix_fmt', 'yuv420p',
+                     '-c:a', 'aac', path]
+
+        clips.append({'path': path, 'start': cut_start, 'end': end, 'mode': mode, 'requested_start': start})
+
+    if not run_ffmpeg(args):
+        return None
+
+    for clip in clips:
+        if clip['start'] is None:
+            clip['start'] = measured_start(clip['path'], clip['end'])
+    return clips
+
+def trim_video(video_path, output_path, start, end, exact=False):
+    """Cut one range to output_path (stream copy unless exact needs a re-encode); returns the clip dict"""
+    clips = cut_clips(video_path, [(start, end)], os.path.dirname(os.path.abspath(output_path)), exact,
+                      os.path.splitext(output_path)[1])
+    if not clips:
+        return None
+
+    os.replace(clips[0]['path'], output_path)
+    clips[0]['path'] = output_path
+    return clips[0]
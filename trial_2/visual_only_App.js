@@ -16,6 +16,7 @@ function App() {
   });
   const [summaryData, setSummaryData] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState({ stage: null, framesAnalyzed: 0, timeline: [] });
 
   const handleVideoUpload = (videoData) => {
     setUploadedVideo(videoData);
@@ -30,9 +31,12 @@ function App() {
 
   const processVideo = async (preferences) => {
     setLoading(true);
+    setProgress({ stage: null, framesAnalyzed: 0, timeline: [] });
 
     try {
-      const response = await fetch('http://localhost:5000/process-visual', {
+      // Queue the job, then follow it over Server-Sent Events instead of
+      // holding one long request open
+      const response = await fetch('http://localhost:5000/jobs', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -43,18 +47,66 @@ function App() {
         })
       });
 
-      const data = await response.json();
+      const job = await response.json();
 
-      if (data.success) {
-        setSummaryData(data);
-      } else {
+      if (!job.success) {
+        console.error('Processing failed:', job.error);
+        alert('Processing failed: ' + job.error);
+        setLoading(false);
+        return;
+      }
+
+      // EventSource reconnects by itself and resumes from the last event
+      const events = new EventSource(`http://localhost:5000/jobs/${job.job_id}/events`);
+
+      events.addEventListener('stage', (event) => {
+        const data = JSON.parse(event.data);
+        setProgress((prev) => ({ ...prev, stage: data.stage }));
+      });
+
+      events.addEventListener('progress', (event) => {
+        const data = JSON.parse(event.data);
+        setProgress((prev) => ({ ...prev, framesAnalyzed: data.frames_analyzed || prev.framesAnalyzed }));
+      });
+
+      events.addEventListener('timeline', (event) => {
+        // The SSE id is unique; timestamps repeat when a scene change is also a sample
+        const timelineEvent = { ...JSON.parse(event.data), id: event.lastEventId };
+        setProgress((prev) => ({ ...prev, timeline: [...prev.timeline, timelineEvent] }));
+      });
+
+      events.addEventListener('completed', (event) => {
+        events.close();
+        setSummaryData(JSON.parse(event.data).result);
+        setLoading(false);
+      });
+
+      events.addEventListener('failed', (event) => {
+        events.close();
+        const data = JSON.parse(event.data);
         console.error('Processing failed:', data.error);
         alert('Processing failed: ' + data.error);
-      }
+        setLoading(false);
+      });
+
+      // Dropped connections reconnect by themselves; give up once the job
+      // itself is gone (expired, or the server restarted)
+      events.onerror = async () => {
+        try {
+          const status = await fetch(`http://localhost:5000/jobs/${job.job_id}`);
+          if (status.ok && events.readyState !== EventSource.CLOSED) {
+            return;
+          }
+        } catch (error) {
+          // Server unreachable
+        }
+        events.close();
+        alert('Lost track of the processing job. Please try again.');
+        setLoading(false);
+      };
     } catch (error) {
       console.error('Error processing video:', error);
       alert('Error processing video: ' + error.message);
-    } finally {
       setLoading(false);
     }
   };
@@ -113,12 +165,23 @@ function App() {
                 <h3>Analyzing your video visually...</h3>
                 <p>Processing frames and detecting visual patterns</p>
                 <div className="processing-steps">
-                  <div className="processing-step">📹 Extracting key frames...</div>
-                  <div className="processing-step">🎨 Analyzing colors and composition...</div>
-                  <div className="processing-step">🏃 Detecting activity and motion...</div>
-                  <div className="processing-step">📊 Assessing visual quality...</div>
-                  <div className="processing-step">📝 Generating visual summary...</div>
+                  <div className={`processing-step ${progress.stage === 'visual_analysis' ? 'active' : ''}`}>
+                    📹 Analyzing key frames... ({progress.framesAnalyzed}/{userPreferences.detail_level})
+                  </div>
+                  <div className={`processing-step ${progress.stage === 'summary' ? 'active' : ''}`}>
+                    📝 Generating visual summary...
+                  </div>
                 </div>
+                {progress.timeline.length > 0 && (
+                  <div className="processing-timeline">
+                    {progress.timeline.map((event) => (
+                      <div key={event.id} className="processing-step">
+                        {event.timestamp_formatted} • {event.scene_type} • {event.activity_level} activity
+                        {event.frame_type === 'scene_change' ? ' • scene change' : ''}
+                      </div>
+                    ))}
+                  </div>
+                )}
               </div>
             ) : (
               summaryData && (
@@ -1,15 +1,25 @@
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context, send_file
 from flask_cors import CORS
 import os
+import re
 import cv2
 import numpy as np
 from werkzeug.utils import secure_filename
 import tempfile
 import json
-from enhanced_visual_analysis import analyze_frames, extract_comprehensive_frames
-from visual_only_summarization import create_visual_only_summary
-from video_processing import validate_video_file, get_video_info
+import itertools
+from enhanced_visual_analysis import analyze_frames, iter_comprehensive_frames, build_timeline_event, VisualAggregator, aggregate_visual_analysis, ANALYSIS_VERSION
+from visual_only_summarization import create_visual_only_summary, get_required_analyzers, SUMMARIZER_VERSION
+from video_processing import validate_video_file, get_video_info, get_cached_analysis_proxy, analysis_proxy_key, ANALYSIS_PROXY_SIZE, ANALYSIS_PROXY_FPS
+from parallel_analysis import get_default_workers
+from result_cache import ResultCache, make_cache_key
+from media_probe import get_content_hash, media_prober
+from job_queue import JobQueue, QueueFullError, format_sse
+from frame_server import FrameServer
+from keyframe_index import save_keyframe_index, load_keyframe_index
+from upload_store import UploadStore, UploadError, UploadOffsetError
+from sprite_sheet import collect_thumbnails, build_sprite_sheet, generate_sprite_sheet, sprite_sheet_vtt, get_video_duration, SPRITE_THUMB_SIZE
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
@@ -17,18 +27,105 @@ CORS(app)  # Enable CORS for React frontend
 # Configuration
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['ANALYSIS_WORKERS'] = get_default_workers()  # Processes for frame analysis (1 = serial)
+app.config['ANALYSIS_PROXY'] = os.environ.get('ANALYSIS_PROXY', 'false').lower() == 'true'  # Analyze a small ffmpeg proxy (quality scores then rate the proxy)
+app.config['DECODE_SEGMENTS'] = int(os.environ.get('DECODE_SEGMENTS', app.config['ANALYSIS_WORKERS']))  # Parallel decode ranges for long videos
+app.config['RESULT_CACHE_DIR'] = os.environ.get('RESULT_CACHE_DIR', 'cache')
+app.config['RESULT_CACHE_MAX_MB'] = int(os.environ.get('RESULT_CACHE_MAX_MB', 500))
+app.config['RESULT_CACHE_TTL_HOURS'] = int(os.environ.get('RESULT_CACHE_TTL_HOURS', 7 * 24))
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))  # Videos processed at once
+app.config['JOB_QUEUE_DEPTH'] = int(os.environ.get('JOB_QUEUE_DEPTH', 16))  # Waiting jobs before 503
+app.config['JOB_RESULT_TTL'] = int(os.environ.get('JOB_RESULT_TTL', 3600))  # Seconds finished jobs are kept
+app.config['FRAME_SERVER_CAPTURES'] = int(os.environ.get('FRAME_SERVER_CAPTURES', 4))  # Videos kept open for /analyze-frame
+app.config['FRAME_SERVER_CACHE_SIZE'] = int(os.environ.get('FRAME_SERVER_CACHE_SIZE', 256))  # Analyzed frames kept
+app.config['UPLOAD_CHUNK_SIZE'] = int(os.environ.get('UPLOAD_CHUNK_SIZE', 1024 * 1024))  # Bytes written (and hashed) per read
+app.config['UPLOAD_SESSION_TTL'] = int(os.environ.get('UPLOAD_SESSION_TTL', 24 * 3600))  # Seconds an idle resumable upload is kept
+app.config['UPLOAD_TTL'] = int(os.environ.get('UPLOAD_TTL', 24 * 3600))  # Seconds a stored upload is kept after its last use
+app.config['SPRITE_SHEET_FRAMES'] = int(os.environ.get('SPRITE_SHEET_FRAMES', 20))  # Thumbnails per sprite sheet
 ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm'}
 
 # Create upload directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Uploads stored once per content hash, written and hashed chunk by chunk
+upload_store = UploadStore(
+    app.config['UPLOAD_FOLDER'],
+    max_bytes=app.config['MAX_CONTENT_LENGTH'],
+    chunk_size=app.config['UPLOAD_CHUNK_SIZE'],
+    session_ttl=app.config['UPLOAD_SESSION_TTL'],
+    upload_ttl=app.config['UPLOAD_TTL']
+)
+
+# Analysis and summary results keyed by video content + parameters
+result_cache = ResultCache(
+    app.config['RESULT_CACHE_DIR'],
+    max_bytes=app.config['RESULT_CACHE_MAX_MB'] * 1024 * 1024,
+    ttl_seconds=app.config['RESULT_CACHE_TTL_HOURS'] * 3600
+)
+
+# Open captures and recent frame analyses for /analyze-frame
+frame_server = FrameServer(
+    max_captures=app.config['FRAME_SERVER_CAPTURES'],
+    cache_size=app.config['FRAME_SERVER_CACHE_SIZE']
+)
+
+# Background processing for /jobs
+job_queue = JobQueue(
+    max_workers=app.config['JOB_WORKERS'],
+    max_queue_depth=app.config['JOB_QUEUE_DEPTH'],
+    result_ttl=app.config['JOB_RESULT_TTL']
+)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def sprite_sheet_key(video_hash, **params):
+    """Cache key of a sprite sheet: the video plus what picked its tiles (count, or the analysis run) and their size"""
+    return make_cache_key(video_hash, thumb_size=list(SPRITE_THUMB_SIZE), **params)
+
+def sprite_sheet_urls(sprite_key):
+    return {
+        'image_url': f'/sprite-sheet/{sprite_key}.jpg',
+        'vtt_url': f'/sprite-sheet/{sprite_key}.vtt',
+        'index_url': f'/sprite-sheet/{sprite_key}.json'
+    }
+
+def store_sprite_sheet(sprite_key, image, index):
+    """Cache a sprite sheet image and its index under its sprite key"""
+    result_cache.set_file('sprite_sheet', sprite_key, image, 'jpg')
+    result_cache.set('sprite_index', sprite_key, index)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def stored_upload_response(stored):
+    """Validate a stored upload and build the /upload style response for it"""
+    filepath = stored['filepath']
+
+    # Validate video file (the upload's hash is already known, so this is one capture open)
+    is_valid, message = validate_video_file(filepath, stored['content_hash'])
+    if not is_valid:
+        # Left for the upload TTL sweep: the same content may be in use by another request
+        return jsonify({'error': f'Invalid video file: {message}'}), 400
+
+    # Get video information (memoized by the validation probe)
+    video_info = get_video_info(filepath, stored['content_hash'])
+
+    # Keyframe index beside the upload, so /analyze-frame seeks cost at most one GOP
+    if load_keyframe_index(filepath) is None:
+        save_keyframe_index(filepath, stored['content_hash'])
+
+    # Return file info for processing
+    return jsonify({
+        'message': 'Video uploaded successfully',
+        'filename': stored['filename'],
+        'filepath': filepath,
+        'content_hash': stored['content_hash'],
+        'deduplicated': stored['deduplicated'],
+        'video_info': video_info
+    }), 200
+
 @app.route('/upload', methods=['POST'])
 def upload_video():
     try:
@@ -42,115 +139,333 @@ def upload_video():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Please upload a video file.'}), 400
 
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # Save uploaded file (hashed and sniffed while it is written)
+        stored = upload_store.save_stream(file.stream, secure_filename(file.filename))
+        return stored_upload_response(stored)
 
-        # Validate video file
-        is_valid, message = validate_video_file(filepath)
-        if not is_valid:
-            os.remove(filepath)  # Clean up invalid file
-            return jsonify({'error': f'Invalid video file: {message}'}), 400
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # Get video information
-        video_info = get_video_info(filepath)
+@app.route('/upload/stream', methods=['POST', 'PUT'])
+def upload_video_stream():
+    """Upload a video sent as the raw request body (no multipart buffering)
 
-        # Return file info for processing
-        return jsonify({
-            'message': 'Video uploaded successfully',
-            'filename': filename,
-            'filepath': filepath,
-            'video_info': video_info
-        }), 200
+    The file name comes from the 'filename' query argument or the
+    X-Filename header.
+    """
+    try:
+        filename = secure_filename(request.args.get('filename') or request.headers.get('X-Filename', ''))
+        if not filename:
+            return jsonify({'error': 'No file name given'}), 400
 
+        if not allowed_file(filename):
+            return jsonify({'error': 'Invalid file type. Please upload a video file.'}), 400
+
+        stored = upload_store.save_stream(request.stream, filename)
+        return stored_upload_response(stored)
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/process-visual', methods=['POST'])
-def process_video_visual_only():
+@app.route('/uploads', methods=['POST'])
+def start_resumable_upload():
+    """Open a resumable upload: {filename, size} -> upload_id to PUT chunks to"""
     try:
         data = request.json
-        filepath = data.get('filepath')
-        user_preferences = data.get('preferences', {})
+        filename = secure_filename(data.get('filename', ''))
 
-        if not filepath or not os.path.exists(filepath):
-            return jsonify({'error': 'Video file not found'}), 400
+        if not filename or not allowed_file(filename):
+            return jsonify({'error': 'Invalid file type. Please upload a video file.'}), 400
 
-        print("Starting visual-only analysis...")
+        session = upload_store.start_session(filename, int(data.get('size', 0)))
+        return jsonify(dict(session.to_dict(), upload_url=f'/uploads/{session.id}', success=True)), 201
 
-        # Step 1: Extract comprehensive frames for detailed visual analysis
-        print("Step 1: Extracting key frames from video...")
-        max_frames = user_preferences.get('detail_level', 15)  # Default 15 frames
-        frames_data = extract_comprehensive_frames(filepath, max_frames=max_frames)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        if not frames_data:
-            return jsonify({'error': 'Failed to extract frames from video'}), 500
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def get_resumable_upload(upload_id):
+    """Bytes received so far; a client resumes by sending the rest from 'offset'"""
+    session = upload_store.get_session(upload_id)
+    if session is None:
+        return jsonify({'error': 'Upload not found'}), 404
 
-        print(f"Extracted {len(frames_data)} frames for analysis")
+    return jsonify(session.to_dict()), 200
 
-        # Step 2: Perform comprehensive visual analysis
-        print("Step 2: Analyzing visual content...")
-        visual_analysis = analyze_frames(frames_data)
+@app.route('/uploads/<upload_id>', methods=['PUT', 'PATCH'])
+def append_resumable_upload(upload_id):
+    """Append the request body at the Upload-Offset header (or 'offset' argument)
 
-        if 'error' in visual_analysis:
-            return jsonify({'error': f'Visual analysis failed: {visual_analysis["error"]}'}), 500
+    Returns the new offset, or the usual /upload response once the last
+    chunk has arrived. A wrong offset gets 409 with the expected one.
+    """
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.args.get('offset', 0)))
+        session, stored = upload_store.append_chunk(upload_id, offset, request.stream)
+
+        if stored is None:
+            return jsonify(session.to_dict()), 200
+        return stored_upload_response(stored)
+
+    except KeyError:
+        return jsonify({'error': 'Upload not found'}), 404
+    except UploadOffsetError as e:
+        return jsonify(dict(upload_store.get_session(upload_id).to_dict(), error=str(e))), 409
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def abort_resumable_upload(upload_id):
+    if not upload_store.abort_session(upload_id):
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify({'success': True}), 200
+
+VISUAL_PIPELINE_STAGES = ['visual_analysis', 'summary']
+
+def run_visual_pipeline(filepath, user_preferences, job=None):
+    """Analyze a video and build its summary (shared by /process-visual and /jobs)
+
+    With a job, stage transitions, per-frame progress, each frame's result
+    (plus its timeline entry) and a running partial summary are published
+    on it as they happen.
+    Returns the response payload, or a dict with 'error'.
+    """
+    print("Starting visual-only analysis...")
+    upload_store.touch(filepath)  # Keep the upload through processing
+
+    max_frames = user_preferences.get('detail_level', 15)  # Default 15 frames
+    scene_method = user_preferences.get('scene_detection', 'adaptive')
+    scene_sensitivity = float(user_preferences.get('scene_sensitivity', 0.5))
+    analyzers = get_required_analyzers(user_preferences)
+
+    # Same video content + same parameters -> reuse earlier results
+    if job:
+        job.start_stage('visual_analysis')
+    content_hash = get_content_hash(filepath, upload_store.content_hash(filepath))
+    proxy_settings = [ANALYSIS_PROXY_SIZE, ANALYSIS_PROXY_FPS] if app.config['ANALYSIS_PROXY'] else None
+    analysis_key = make_cache_key(content_hash, max_frames=max_frames, analyzers=analyzers,
+                                  scene_method=scene_method, scene_sensitivity=scene_sensitivity,
+                                  proxy=proxy_settings, version=ANALYSIS_VERSION)
+    visual_analysis = result_cache.get('visual_analysis', analysis_key)
+    sprite_key = sprite_sheet_key(content_hash, analysis_key=analysis_key)
+    cache_status = {'visual_analysis': 'hit' if visual_analysis is not None else 'miss'}
+
+    if visual_analysis is None:
+        # Decoding, scene detection and thumbnails all run on the low-res proxy
+        source_path = filepath
+        if proxy_settings:
+            print("Step 0: Preparing analysis proxy...")
+            source_path = get_cached_analysis_proxy(filepath, content_hash, result_cache) or filepath
+
+        # Step 1: Extract comprehensive frames for detailed visual analysis
+        print("Step 1: Extracting key frames from video...")
+        frames_data = iter_comprehensive_frames(source_path, max_frames=max_frames, scene_method=scene_method,
+                                                scene_sensitivity=scene_sensitivity,
+                                                segments=app.config['DECODE_SEGMENTS'])
+
+        # Keep a thumbnail of every sampled frame for the sprite sheet (no second decode)
+        thumbnails = []
+        frames_data = collect_thumbnails(frames_data, thumbnails)
+
+        # Frames are decoded lazily; peek at the first one to fail fast
+        first_frame = next(frames_data, None)
+        if first_frame is None:
+            return {'error': 'Failed to extract frames from video'}
+
+        aggregator = VisualAggregator()
+
+        def report_frame(index, analysis):
+            if job:
+                job.publish('frame', {'index': index, 'timestamp': analysis.get('timestamp'), 'analysis': analysis})
+                timeline_event = build_timeline_event(analysis)
+                if timeline_event:
+                    job.publish('timeline', timeline_event)
+
+                # Timeline entries already went out one by one
+                partial_summary = aggregator.snapshot()
+                partial_summary.pop('timeline_analysis', None)
+                job.publish('partial_summary', partial_summary)
+
+                job.update_stage('visual_analysis', (index + 1) / max_frames, frames_analyzed=index + 1)
+
+        # Step 2: Perform visual analysis (overlaps with decoding), running
+        # only the analyzers the requested summary will read
+        print(f"Step 2: Analyzing visual content ({', '.join(analyzers)})...")
+        visual_analysis = analyze_frames(itertools.chain([first_frame], frames_data), analyzers,
+                                         workers=app.config['ANALYSIS_WORKERS'], on_frame=report_frame,
+                                         aggregator=aggregator)
 
-        # Step 3: Create final visual summary based on user preferences
-        print("Step 3: Creating visual summary...")
+        if 'error' in visual_analysis:
+            return {'error': f'Visual analysis failed: {visual_analysis["error"]}'}
+
+        result_cache.set('visual_analysis', analysis_key, visual_analysis)
+
+        # The analyzed frames (regular samples plus scene changes), not an even count
+        if result_cache.get_file('sprite_sheet', sprite_key, 'jpg') is None:
+            image, index = build_sprite_sheet(thumbnails, duration=get_video_duration(filepath))
+            if image is not None:
+                store_sprite_sheet(sprite_key, image, index)
+    else:
+        print("Steps 1-2: Reusing cached visual analysis")
+        if job:
+            for timeline_event in visual_analysis.get('timeline_analysis', []):
+                job.publish('timeline', timeline_event)
+
+    if job:
+        job.finish_stage('visual_analysis', frames_analyzed=visual_analysis.get('total_frames_analyzed', 0))
+
+    # Step 3: Create final visual summary based on user preferences
+    print("Step 3: Creating visual summary...")
+    if job:
+        job.start_stage('summary')
+    summary_key = make_cache_key(content_hash, analysis_key=analysis_key, preferences=user_preferences,
+                                 version=SUMMARIZER_VERSION)
+    final_summary = result_cache.get('summary', summary_key)
+    cache_status['summary'] = 'hit' if final_summary is not None else 'miss'
+
+    if final_summary is None:
         final_summary = create_visual_only_summary(
             visual_analysis, 
             user_preferences
         )
+        if not final_summary.get('error'):
+            result_cache.set('summary', summary_key, final_summary)
+    if job:
+        job.finish_stage('summary')
+
+    # The upload is content-addressed and may be shared with other requests,
+    # so it stays (with its keyframe index) until the upload store expires it
+
+    return {
+        'visual_analysis': visual_analysis,
+        'final_summary': final_summary,
+        'processing_mode': 'visual_only',
+        'frames_analyzed': visual_analysis.get('total_frames_analyzed', 0),
+        'analyzers_run': analyzers,
+        'cache': cache_status,
+        'video_hash': content_hash,
+        'sprite_sheet': sprite_sheet_urls(sprite_key) if result_cache.get_file('sprite_sheet', sprite_key, 'jpg') else None,
+        'success': True
+    }
+
+@app.route('/process-visual', methods=['POST'])
+def process_video_visual_only():
+    try:
+        data = request.json
+        filepath = data.get('filepath')
+        user_preferences = data.get('preferences', {})
+
+        if not filepath or not os.path.exists(filepath):
+            return jsonify({'error': 'Video file not found'}), 400
+
+        result = run_visual_pipeline(filepath, user_preferences)
+        if 'error' in result:
+            return jsonify(result), 500
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        print(f"Processing error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a visual-only processing job and return its ID immediately"""
+    try:
+        data = request.json
+        filepath = data.get('filepath')
+        user_preferences = data.get('preferences', {})
+
+        if not filepath or not os.path.exists(filepath):
+            return jsonify({'error': 'Video file not found'}), 400
 
-        # Clean up uploaded file
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        job = job_queue.submit(run_visual_pipeline,
+                               {'filepath': filepath, 'user_preferences': user_preferences},
+                               VISUAL_PIPELINE_STAGES)
 
         return jsonify({
-            'visual_analysis': visual_analysis,
-            'final_summary': final_summary,
-            'processing_mode': 'visual_only',
-            'frames_analyzed': len(frames_data),
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/jobs/{job.id}',
             'success': True
-        }), 200
+        }), 202
 
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
-        print(f"Processing error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, per-stage progress and (once finished) the result of a job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify(job.to_dict()), 200
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-Sent Events stream of a job's stage, frame and timeline events
+
+    Events already published are replayed first, so subscribing late or
+    reconnecting (EventSource sends Last-Event-ID) never loses progress and
+    never needs the job to be resubmitted. The stream ends with a
+    'completed' (carrying the result) or 'failed' event.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0
+    try:
+        last_event_id = int(last_event_id)
+    except ValueError:
+        last_event_id = 0
+
+    def generate():
+        for event in job.iter_events(last_event_id):
+            yield format_sse(event)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let a proxy hold events back
+    })
+
 @app.route('/analyze-frame', methods=['POST'])
 def analyze_single_frame():
-    """Endpoint to analyze a single frame at specific timestamp"""
+    """Endpoint to analyze the frame at one timestamp, or at a list of 'timestamps'"""
     try:
         data = request.json
         filepath = data.get('filepath')
+        timestamps = data.get('timestamps')
         timestamp = data.get('timestamp', 0)
 
         if not filepath or not os.path.exists(filepath):
             return jsonify({'error': 'Video file not found'}), 400
 
-        # Extract frame at specific timestamp
-        cap = cv2.VideoCapture(filepath)
-        if not cap.isOpened():
-            return jsonify({'error': 'Cannot open video file'}), 400
-
-        # Seek to timestamp
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_number = int(timestamp * fps)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        # Batch lookup: one pass over the video for all timestamps
+        if timestamps is not None:
+            frames = frame_server.analyze_timestamps(filepath, [float(t) for t in timestamps])
+            return jsonify({
+                'frames': frames,
+                'success': True
+            }), 200
 
-        ret, frame = cap.read()
-        cap.release()
+        # Extract and analyze the frame at the specific timestamp
+        result = frame_server.analyze_timestamps(filepath, [float(timestamp)])[0]
+        if 'error' in result:
+            return jsonify({'error': result['error']}), 400
 
-        if not ret:
-            return jsonify({'error': 'Cannot extract frame at specified timestamp'}), 400
-
-        # Analyze this specific frame
-        frame_resized = cv2.resize(frame, (800, 600))
-        frames_data = [{'frame': frame_resized, 'timestamp': timestamp, 'frame_number': frame_number, 'type': 'user_requested'}]
-
-        analysis = analyze_frames(frames_data)
+        analysis = aggregate_visual_analysis([result['analysis']])
 
         return jsonify({
             'frame_analysis': analysis,
@@ -158,9 +473,68 @@ def analyze_single_frame():
             'success': True
         }), 200
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/sprite-sheet', methods=['POST'])
+def create_sprite_sheet():
+    """Sprite sheet (one mosaic of timeline thumbnails) and its index for a video
+
+    Built in one decoding pass and cached per video content hash, tile
+    count and tile size. index['count'] is the number of tiles actually
+    in the sheet (fewer than count for very short videos). The sheet the
+    analysis pipeline returns is a different one: its tiles are the frames
+    that were analyzed.
+    """
+    try:
+        data = request.json
+        filepath = data.get('filepath')
+        count = max(1, int(data.get('count', app.config['SPRITE_SHEET_FRAMES'])))
+
+        if not filepath or not os.path.exists(filepath):
+            return jsonify({'error': 'Video file not found'}), 400
+
+        video_hash = get_content_hash(filepath, upload_store.content_hash(filepath))
+        sprite_key = sprite_sheet_key(video_hash, count=count)
+        index = result_cache.get('sprite_index', sprite_key)
+        cached = index is not None and result_cache.get_file('sprite_sheet', sprite_key, 'jpg') is not None
+
+        if not cached:
+            # Decode the analysis proxy instead when the pipeline already made one
+            source_path = result_cache.get_file('analysis_proxy', analysis_proxy_key(video_hash), 'mp4') or filepath
+            image, index = generate_sprite_sheet(source_path, count=count)
+            if image is None:
+                return jsonify({'error': 'Failed to extract frames from video'}), 500
+            store_sprite_sheet(sprite_key, image, index)
+
+        return jsonify(dict(sprite_sheet_urls(sprite_key), video_hash=video_hash, sprite_key=sprite_key, index=index,
+                            cached=cached, success=True)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/sprite-sheet/<sprite_key>.<fmt>', methods=['GET'])
+def get_sprite_sheet(sprite_key, fmt):
+    """Cached sprite sheet as the image (jpg), a WebVTT thumbnail track (vtt) or its index (json)"""
+    if not re.fullmatch(r'[0-9a-f]{64}', sprite_key) or fmt not in ('jpg', 'vtt', 'json'):
+        return jsonify({'error': 'Sprite sheet not found'}), 404
+
+    if fmt == 'jpg':
+        image_path = result_cache.get_file('sprite_sheet', sprite_key, 'jpg')
+        if image_path is None:
+            return jsonify({'error': 'Sprite sheet not found'}), 404
+        return send_file(os.path.abspath(image_path), mimetype='image/jpeg', max_age=86400)
+
+    index = result_cache.get('sprite_index', sprite_key)
+    if index is None:
+        return jsonify({'error': 'Sprite sheet not found'}), 404
+
+    if fmt == 'vtt':
+        return Response(sprite_sheet_vtt(index, sprite_sheet_urls(sprite_key)['image_url']), mimetype='text/vtt')
+    return jsonify(index), 200
+
 @app.route('/video-info', methods=['POST'])
 def get_video_information():
     """Get basic information about uploaded video"""
@@ -181,9 +555,15 @@ def get_video_information():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters and size of the result cache"""
+    return jsonify({'cache': result_cache.stats(), 'frame_server': frame_server.stats(),
+                    'media_probe': media_prober.stats()}), 200
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'mode': 'visual_only'}), 200
+    return jsonify({'status': 'healthy', 'mode': 'visual_only', 'jobs': job_queue.stats()}), 200
 
 if __name__ == '__main__':
     print("🎬 Starting Visual-Only Video Summarizer...")
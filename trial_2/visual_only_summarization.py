@@ -2,13 +2,20 @@
 from datetime import datetime
 import json
 
+# Bump when summary wording/structure changes (invalidates cached summaries)
+SUMMARIZER_VERSION = '2'
+
+# Style used when the preferences don't name one (analyzer selection and
+# rendering must agree on it)
+DEFAULT_SUMMARY_STYLE = 'paragraph'
+
 def create_visual_only_summary(visual_analysis, user_preferences):
     """Create final summary based only on visual analysis"""
     try:
         # Extract user preferences
         summary_length = user_preferences.get('length', 'medium')
         focus_areas = user_preferences.get('focus', ['visual_elements'])
-        summary_style = user_preferences.get('style', 'bullet_points')
+        summary_style = user_preferences.get('style', DEFAULT_SUMMARY_STYLE)
         detail_level = user_preferences.get('detail_level', 'medium')
 
         # Determine max length based on user preference
@@ -50,6 +57,33 @@ def create_visual_only_summary(visual_analysis, user_preferences):
             'processing_mode': 'visual_only'
         }
 
+# Per-frame analyzers every summary reads: the narrative, timeline and key
+# moments are built from scene type, activity, quality, colors and text
+BASE_ANALYZERS = ['colors', 'text', 'activity', 'scene_type', 'quality']
+
+# Extra analyzers needed only when a focus area or style asks for them
+FOCUS_ANALYZERS = {
+    'composition': ['composition'],
+}
+STYLE_ANALYZERS = {
+    'technical_report': ['composition'],
+}
+
+def get_required_analyzers(user_preferences):
+    """Analyzer names the summary for these preferences will actually use"""
+    focus_areas = user_preferences.get('focus', ['visual_elements'])
+    summary_style = user_preferences.get('style', DEFAULT_SUMMARY_STYLE)
+
+    required = list(BASE_ANALYZERS)
+    extras = [name for focus in focus_areas for name in FOCUS_ANALYZERS.get(focus, [])]
+    extras += STYLE_ANALYZERS.get(summary_style, [])
+
+    for name in extras:
+        if name not in required:
+            required.append(name)
+
+    return required
+
 def generate_visual_narrative(visual_analysis, max_length):
     """Generate narrative description of visual content"""
     try:
@@ -124,7 +158,7 @@ def apply_visual_preferences(base_summary, visual_analysis, preferences):
     """Customize summary based on user preferences for visual content"""
     try:
         focus_areas = preferences.get('focus', [])
-        style = preferences.get('style', 'paragraph')
+        style = preferences.get('style', DEFAULT_SUMMARY_STYLE)
         detail_level = preferences.get('detail_level', 'medium')
 
         enhanced_summary = base_summary
@@ -216,9 +250,21 @@ def get_quality_analysis(visual_analysis):
 def get_composition_analysis(visual_analysis):
     """Get composition analysis details"""
     try:
-        timeline = visual_analysis.get('timeline_analysis', [])
-        # This would need more detailed composition data from the analysis
-        return "Composition analysis includes framing, symmetry, and visual balance assessment across key frames"
+        composition = visual_analysis.get('video_characteristics', {}).get('composition')
+        if not composition:
+            return "Composition analysis data not available"
+
+        total = sum(composition['balance'].values())
+        details = []
+
+        for balance, count in composition['balance'].items():
+            details.append(f"• {balance.title()} framing: {(count / total) * 100:.1f}% of frames")
+
+        focus_areas = [area.replace('_', ' ') for area in composition['focus_areas']]
+        details.append(f"• Brightest (likely focus) regions: {', '.join(focus_areas)}")
+        details.append(f"• Average Symmetry Score: {composition['average_symmetry']:.2f}")
+
+        return '\n'.join(details)
     except:
         return "Composition analysis data not available"
 
@@ -330,7 +376,10 @@ def format_as_technical_report(summary, visual_analysis):
             "• Visual content analysis completed successfully",
             "• Scene classification and activity detection performed",
             "• Quality assessment and composition analysis included",
-            "• Key moments and scene changes identified"
+            "• Key moments and scene changes identified",
+            "",
+            "COMPOSITION:",
+            get_composition_analysis(visual_analysis)
         ]
 
         return '\n'.join(report_parts)